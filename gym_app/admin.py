@@ -1,6 +1,24 @@
-from django.contrib import admin
+import io
+
+from django import forms
+from django.contrib import admin, messages
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import User, MembershipPlan, FlexibleAccess, UserMembership, Payment, WalkInPayment, Analytics, Attendance
+from django.core.exceptions import PermissionDenied
+from django.db import IntegrityError
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils import timezone
+from .models import User, MembershipPlan, FlexibleAccess, UserMembership, Payment, WalkInBatch, WalkInPayment, WalkInPassCode, Analytics, Attendance, Task, RevenueEntry, RevenueDailySummary, CohortRetention, ExpiryNotice
+from . import ledger
+from .importers import import_members_csv, DEFAULT_BATCH_SIZE, MEMBER_CSV_COLUMNS
+
+
+class MemberImportForm(forms.Form):
+    """Upload form for the bulk member import"""
+    
+    csv_file = forms.FileField(label='CSV file')
+    batch_size = forms.IntegerField(min_value=1, max_value=5000, initial=DEFAULT_BATCH_SIZE)
+    dry_run = forms.BooleanField(required=False, help_text='Validate only, nothing is saved')
 
 
 # Update the UserAdmin in gym_app/admin.py
@@ -62,6 +80,56 @@ class UserAdmin(BaseUserAdmin):
         
         self.message_user(request, f'Generated PINs for {count} member(s)')
     generate_pins_action.short_description = 'Generate Kiosk PINs for selected members'
+    
+    def get_urls(self):
+        urls = [
+            path(
+                'import-csv/',
+                self.admin_site.admin_view(self.import_csv_view),
+                name='gym_app_user_import_csv',
+            ),
+        ]
+        return urls + super().get_urls()
+    
+    def import_csv_view(self, request):
+        """Bulk import members from an uploaded CSV file"""
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+        
+        result = None
+        form = MemberImportForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            # Stream the upload instead of reading it into memory
+            stream = io.TextIOWrapper(form.cleaned_data['csv_file'].file, encoding='utf-8-sig', newline='')
+            try:
+                result = import_members_csv(
+                    stream,
+                    batch_size=form.cleaned_data['batch_size'],
+                    dry_run=form.cleaned_data['dry_run'],
+                    performed_by=request.user,
+                    request=request,
+                )
+            except (ValueError, UnicodeDecodeError) as e:
+                messages.error(request, f'Import failed: {e}')
+            except IntegrityError as e:
+                # A row clashed with an account created while the import ran;
+                # the batches before it are saved, the failing batch is not
+                form.add_error(None, f'Import stopped by a conflicting record: {e}. Earlier batches were saved.')
+            else:
+                level = messages.WARNING if result.errors else messages.SUCCESS
+                verb = 'would be imported' if form.cleaned_data['dry_run'] else 'imported'
+                self.message_user(request, f'{result.users} of {result.rows} member(s) {verb}.', level)
+        
+        context = {
+            **self.admin_site.each_context(request),
+            'title': 'Import members from CSV',
+            'opts': self.model._meta,
+            'form': form,
+            'columns': MEMBER_CSV_COLUMNS,
+            'result': result,
+            'dry_run': result is not None and form.cleaned_data['dry_run'],
+        }
+        return TemplateResponse(request, 'admin/gym_app/user/import_csv.html', context)
 
 @admin.register(MembershipPlan)
 class MembershipPlanAdmin(admin.ModelAdmin):
@@ -129,14 +197,30 @@ class UserMembershipAdmin(admin.ModelAdmin):
     days_remaining.short_description = 'Days Left'
 
 
+class RevenueLedgerMixin:
+    """Keep the revenue ledger in step with sales added or edited in the admin (deletes: see signals.py)"""
+    
+    # Fields a ledger line is made from; editing any of them re-posts the sale
+    ledger_fields = set()
+    
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if not change:
+            ledger.record([obj], staff=request.user)
+        elif self.ledger_fields & set(form.changed_data):
+            ledger.correct(obj, staff=request.user)
+
+
 @admin.register(Payment)
-class PaymentAdmin(admin.ModelAdmin):
+class PaymentAdmin(RevenueLedgerMixin, admin.ModelAdmin):
     """Admin interface for Member Payments"""
     
+    ledger_fields = {'amount', 'method', 'payment_date', 'membership'}
+    
     list_display = ['user', 'amount', 'method', 'payment_date', 'reference_no', 'membership']
-    list_filter = ['method', 'payment_date']
+    list_filter = ['method', 'business_date']
     search_fields = ['user__username', 'user__email', 'reference_no', 'user__first_name', 'user__last_name']
-    date_hierarchy = 'payment_date'
+    date_hierarchy = 'business_date'
     
     fieldsets = (
         ('Payment Details', {
@@ -150,14 +234,44 @@ class PaymentAdmin(admin.ModelAdmin):
     readonly_fields = ['created_at', 'updated_at']
 
 
+class WalkInPaymentInline(admin.TabularInline):
+    model = WalkInPayment
+    extra = 0
+    fields = ['customer_name', 'mobile_no', 'pass_type', 'amount']
+    readonly_fields = fields
+    can_delete = False
+
+
+class WalkInPassCodeInline(admin.StackedInline):
+    model = WalkInPassCode
+    fields = ['code', 'valid_from', 'valid_until']
+    readonly_fields = ['code']
+    can_delete = False
+
+
+@admin.register(WalkInBatch)
+class WalkInBatchAdmin(admin.ModelAdmin):
+    """Admin interface for group walk-in sales"""
+    
+    list_display = ['id', 'label', 'pass_count', 'total_amount', 'method', 'sold_by', 'created_at']
+    list_filter = ['method', 'created_at']
+    search_fields = ['label', 'reference_no']
+    date_hierarchy = 'created_at'
+    readonly_fields = ['pass_count', 'total_amount', 'sold_by', 'created_at']
+    inlines = [WalkInPaymentInline]
+
+
 @admin.register(WalkInPayment)
-class WalkInPaymentAdmin(admin.ModelAdmin):
+class WalkInPaymentAdmin(RevenueLedgerMixin, admin.ModelAdmin):
     """Admin interface for Walk-in Payments"""
     
-    list_display = ['customer_name', 'pass_type', 'amount', 'method', 'payment_date', 'mobile_no']
-    list_filter = ['method', 'payment_date', 'pass_type']
-    search_fields = ['customer_name', 'mobile_no', 'reference_no']
-    date_hierarchy = 'payment_date'
+    ledger_fields = {'amount', 'method', 'payment_date', 'pass_type'}
+    
+    list_display = ['customer_name', 'pass_type', 'amount', 'method', 'payment_date', 'mobile_no', 'batch']
+    list_filter = ['method', 'business_date', 'pass_type']
+    search_fields = ['customer_name', 'mobile_no', 'reference_no', 'pass_code__code']
+    inlines = [WalkInPassCodeInline]
+    date_hierarchy = 'business_date'
     
     fieldsets = (
         ('Customer Info', {
@@ -174,6 +288,82 @@ class WalkInPaymentAdmin(admin.ModelAdmin):
     readonly_fields = ['created_at', 'updated_at']
 
 
+@admin.register(RevenueEntry)
+class RevenueEntryAdmin(admin.ModelAdmin):
+    """Read-only view of the append-only revenue ledger"""
+    
+    list_display = ['id', 'kind', 'source', 'source_id', 'amount', 'method', 'business_date', 'staff', 'created_at']
+    list_filter = ['kind', 'source', 'method', 'business_date']
+    list_select_related = ['staff']
+    search_fields = ['source_id', 'staff__username']
+    date_hierarchy = 'business_date'
+    
+    def has_add_permission(self, request):
+        """Ledger lines are written by sales"""
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(RevenueDailySummary)
+class RevenueDailySummaryAdmin(admin.ModelAdmin):
+    """Read-only view of the daily revenue summaries"""
+    
+    list_display = ['business_date', 'source', 'method', 'count', 'total']
+    list_filter = ['source', 'method']
+    date_hierarchy = 'business_date'
+    
+    def has_add_permission(self, request):
+        """Summaries are maintained by the ledger"""
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(CohortRetention)
+class CohortRetentionAdmin(admin.ModelAdmin):
+    """Read-only view of the cached retention cohorts"""
+    
+    list_display = ['cohort', 'offset', 'members', 'retained', 'renewed', 'churned', 'as_of']
+    list_filter = ['cohort']
+    
+    def has_add_permission(self, request):
+        """Cohorts are refreshed by expire_memberships"""
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ExpiryNotice)
+class ExpiryNoticeAdmin(admin.ModelAdmin):
+    """Expiry reminders sent to members; deleting one lets the next run send it again"""
+    
+    list_display = ['user', 'channel', 'end_date', 'sent_at']
+    list_filter = ['channel', 'end_date']
+    list_select_related = ['user']
+    search_fields = ['user__username', 'user__email']
+    date_hierarchy = 'sent_at'
+    
+    def has_add_permission(self, request):
+        """Notices are recorded by notify_expiring"""
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(Analytics)
 class AnalyticsAdmin(admin.ModelAdmin):
     """Admin interface for Analytics"""
@@ -201,14 +391,16 @@ class AnalyticsAdmin(admin.ModelAdmin):
 class AttendanceAdmin(admin.ModelAdmin):
     """Admin interface for Attendance tracking"""
     
-    list_display = ['user', 'check_in', 'check_out', 'duration_display', 'status']
+    list_display = ['visitor_name', 'check_in', 'check_out', 'duration_display', 'status']
     list_filter = ['check_in', 'check_out']
-    search_fields = ['user__username', 'user__email', 'user__first_name', 'user__last_name']
+    list_select_related = ['user', 'walk_in']
+    search_fields = ['user__username', 'user__email', 'user__first_name', 'user__last_name', 'walk_in__customer_name']
     date_hierarchy = 'check_in'
+    raw_id_fields = ['walk_in']
     
     fieldsets = (
-        ('Member', {
-            'fields': ('user',)
+        ('Visitor', {
+            'fields': ('user', 'walk_in')
         }),
         ('Time', {
             'fields': ('check_in', 'check_out', 'duration_minutes')
@@ -234,6 +426,31 @@ class AttendanceAdmin(admin.ModelAdmin):
 
 
 
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    """Admin interface for the background task queue"""
+    
+    list_display = ['name', 'status', 'attempts', 'max_attempts', 'run_after', 'created_at', 'finished_at']
+    list_filter = ['status', 'name']
+    search_fields = ['name', 'last_error']
+    date_hierarchy = 'created_at'
+    readonly_fields = ['name', 'kwargs', 'attempts', 'created_at', 'started_at', 'finished_at', 'last_error']
+    
+    actions = ['retry_tasks']
+    
+    def has_add_permission(self, request):
+        """Tasks are queued by the application"""
+        return False
+    
+    def retry_tasks(self, request, queryset):
+        """Queue failed tasks again with a fresh set of attempts"""
+        count = queryset.exclude(status='running').update(
+            status='pending', attempts=0, run_after=timezone.now(), finished_at=None,
+        )
+        self.message_user(request, f'{count} task(s) queued again.', messages.SUCCESS)
+    retry_tasks.short_description = 'Retry selected tasks'
+
+
 
 # Customize admin site headers
 admin.site.site_header = "Gym Management System"
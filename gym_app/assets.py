@@ -0,0 +1,121 @@
+"""
+CSS bundles.
+
+Every page loads a single stylesheet: its layout's shared CSS (the public
+``base.css``, the sidebar shell or the kiosk styles) followed by the page's
+own file. ``build_css`` concatenates and minifies each bundle into
+``CSS_BUNDLE_ROOT/gym_app/dist/<name>.min.css``; ``collectstatic`` then gives
+it a content-hashed name and precompressed variants (see ``storage.py``), so
+browsers, and the kiosk tablets in particular, download it once per release.
+
+The ``{% css_bundle %}`` tag links the built bundle when
+``CSS_BUNDLES_ENABLED`` is set (production) and the individual source files
+otherwise, so CSS edits show up immediately during development.
+"""
+
+import os
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+
+
+PUBLIC = 'gym_app/css/base/base.css'
+SIDEBAR = 'gym_app/css/pages/base_sidebar.css'
+
+
+def _page(layout, name):
+    return [layout, f'gym_app/css/pages/{name}.css']
+
+
+# name -> static paths, in cascade order
+CSS_BUNDLES = {
+    # Layouts on their own (pages without a stylesheet of their own)
+    'public': [PUBLIC],
+    'app': [SIDEBAR],
+
+    # Kiosk screens (standalone, no layout)
+    'kiosk_login': ['gym_app/css/pages/kiosk_login.css'],
+    'kiosk_success': ['gym_app/css/pages/kiosk_success.css'],
+
+    # Public layout pages
+    'about': _page(PUBLIC, 'about'),
+    'dashboard_member': _page(PUBLIC, 'dashboard_member'),
+    'home': _page(PUBLIC, 'home'),
+    'login': _page(PUBLIC, 'login'),
+    'membership_plans': _page(PUBLIC, 'membership_plans'),
+    'register': _page(PUBLIC, 'register'),
+    'subscribe_plan': _page(PUBLIC, 'subscribe_plan'),
+
+    # Sidebar layout pages
+    'audit_trail': _page(SIDEBAR, 'audit_trail'),
+    'create_staff': _page(SIDEBAR, 'create_staff'),
+    'dashboard_admin': _page(SIDEBAR, 'dashboard_admin'),
+    'dashboard_staff': _page(SIDEBAR, 'dashboard_staff'),
+    'manage_plans': _page(SIDEBAR, 'manage_plans'),
+    'member_detail': _page(SIDEBAR, 'member_detail'),
+    'members_list': _page(SIDEBAR, 'members_list'),
+    'reports': _page(SIDEBAR, 'reports'),
+    'revenue_report': _page(SIDEBAR, 'reports') + ['gym_app/css/pages/revenue_report.css'],
+    'retention_report': _page(SIDEBAR, 'reports') + ['gym_app/css/pages/revenue_report.css'],
+    'walkin_batch': _page(SIDEBAR, 'walkin_purchase') + ['gym_app/css/pages/walkin_batch.css'],
+    'walkin_batch_receipt': _page(SIDEBAR, 'walkin_batch_receipt'),
+    'walkin_confirm': _page(SIDEBAR, 'walkin_confirm'),
+    'walkin_purchase': _page(SIDEBAR, 'walkin_purchase'),
+}
+
+BUNDLE_DIR = 'gym_app/dist'
+
+_COMMENTS = re.compile(r'/\*.*?\*/', re.DOTALL)
+_WHITESPACE = re.compile(r'\s+')
+_AROUND_PUNCTUATION = re.compile(r'\s*([{};,>])\s*')
+_AFTER_COLON = re.compile(r':\s+')
+_LAST_SEMICOLON = re.compile(r';}')
+
+
+def bundle_path(name):
+    """Static path of a built bundle"""
+    return f'{BUNDLE_DIR}/{name}.min.css'
+
+
+def minify_css(css):
+    """
+    Whitespace and comment stripping.
+
+    Only removes what cannot change meaning: spaces around ``{ } ; , >``,
+    after ``:`` and the last ``;`` of a block. Spaces before ``:`` are kept
+    (``.a :hover`` differs from ``.a:hover``), as are those inside
+    ``calc()`` and other values.
+    """
+    css = _COMMENTS.sub('', css)
+    css = _WHITESPACE.sub(' ', css)
+    css = _AROUND_PUNCTUATION.sub(r'\1', css)
+    css = _AFTER_COLON.sub(':', css)
+    css = _LAST_SEMICOLON.sub('}', css)
+    return css.strip()
+
+
+def read_source(path):
+    found = finders.find(path)
+    if found is None:
+        raise FileNotFoundError(f'Static file "{path}" not found')
+    with open(found, encoding='utf-8') as f:
+        return f.read()
+
+
+def build_bundles(names=None, output_root=None):
+    """
+    Write the minified bundles. Returns ``[(name, source bytes, output bytes)]``.
+    """
+    output_root = output_root or settings.CSS_BUNDLE_ROOT
+    results = []
+    for name in names or CSS_BUNDLES:
+        sources = [read_source(path) for path in CSS_BUNDLES[name]]
+        css = '\n'.join(minify_css(source) for source in sources) + '\n'
+
+        target = os.path.join(output_root, *bundle_path(name).split('/'))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, 'w', encoding='utf-8') as f:
+            f.write(css)
+        results.append((name, sum(len(source.encode()) for source in sources), len(css.encode())))
+    return results
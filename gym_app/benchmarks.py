@@ -0,0 +1,227 @@
+"""
+Benchmark harness for the hot views.
+
+Seeds a throwaway test database at one or more scales with
+``generate_load_data``, drives the views through the Django test client and
+records query count, wall time and peak allocations per call. Reports are
+plain JSON so they can be stored and compared against a baseline.
+
+Used by the ``benchmark_views`` management command.
+"""
+
+import platform
+import statistics
+import time
+import tracemalloc
+from datetime import date
+
+import django
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from .models import User, MembershipPlan, UserMembership, Attendance
+
+
+# Members generated per named scale (other rows scale with it)
+SCALES = {
+    'tiny': 100,
+    'small': 1000,
+    'medium': 5000,
+    'large': 20000,
+}
+
+# name -> (role of the logged-in user, HTTP method, path, data)
+SCENARIOS = {
+    'kiosk_login': ('anonymous', 'post', '/kiosk/', 'kiosk_pin'),
+    'dashboard_admin': ('admin', 'get', '/dashboard/', None),
+    'dashboard_staff': ('staff', 'get', '/dashboard/', None),
+    'dashboard_member': ('member', 'get', '/dashboard/', None),
+    'members_list_search': ('staff', 'get', '/members/', {'search': 'santos'}),
+    'reports_view': ('admin', 'get', '/reports/', None),
+    'audit_trail_view': ('admin', 'get', '/audit-trail/', {'days': '30', 'user': 'load'}),
+    'attendance_report': ('staff', 'get', '/attendance/', {'user': 'cruz'}),
+}
+
+# name -> function(fixtures) run before every call, so each repeat takes the
+# same path (the kiosk would otherwise alternate check-in and check-out)
+RESETS = {
+    'kiosk_login': lambda fixtures: Attendance.objects.filter(user=fixtures.users['member']).delete(),
+}
+
+# Wall-time changes smaller than this are treated as noise
+NOISE_FLOOR_MS = 2.0
+
+
+class BenchmarkFixtures:
+    """Accounts the scenarios log in as, created on top of the generated data"""
+
+    def __init__(self):
+        self.users = {
+            'admin': User.objects.create_user(
+                username='bench_admin', email='bench_admin@example.com', password=None,
+                role='admin', is_staff=True, is_superuser=True,
+            ),
+            'staff': User.objects.create_user(
+                username='bench_staff', email='bench_staff@example.com', password=None,
+                role='staff', is_staff=True,
+            ),
+            'member': User.objects.create_user(
+                username='bench_member', email='bench_member@example.com', password=None,
+                first_name='Bench', last_name='Member', role='member',
+            ),
+        }
+        member = self.users['member']
+        plan = MembershipPlan.objects.order_by('duration_days').last()
+        UserMembership.objects.create(user=member, plan=plan, start_date=date.today(), status='active')
+        self.kiosk_pin = member.generate_kiosk_pin()
+
+
+def _client_for(fixtures, role):
+    client = Client()
+    if role != 'anonymous':
+        client.force_login(fixtures.users[role])
+    return client
+
+
+def _call(client, method, path, data, fixtures):
+    if data == 'kiosk_pin':
+        data = {'kiosk_pin': fixtures.kiosk_pin}
+    return getattr(client, method)(path, data or {})
+
+
+def _check(name, method, path, response):
+    if response.status_code >= 400:
+        raise RuntimeError(f'{name}: {method.upper()} {path} returned {response.status_code}')
+
+
+def run_scenario(fixtures, name, repeat=5):
+    """Measure one scenario and return its metrics dict"""
+    role, method, path, data = SCENARIOS[name]
+    client = _client_for(fixtures, role)
+    reset = RESETS.get(name, lambda fixtures: None)
+
+    # Warm-up call fills template and URL caches
+    reset(fixtures)
+    response = _call(client, method, path, data, fixtures)
+    _check(name, method, path, response)
+
+    wall_ms, queries = [], []
+    for _ in range(repeat):
+        reset(fixtures)
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            response = _call(client, method, path, data, fixtures)
+            wall_ms.append((time.perf_counter() - started) * 1000)
+        _check(name, method, path, response)
+        queries.append(len(ctx.captured_queries))
+
+    # Allocation tracking slows everything down, so measure it in its own pass
+    reset(fixtures)
+    tracemalloc.start()
+    response = _call(client, method, path, data, fixtures)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    _check(name, method, path, response)
+
+    return {
+        'status': response.status_code,
+        'queries': max(queries),
+        'wall_ms_median': round(statistics.median(wall_ms), 3),
+        'wall_ms_min': round(min(wall_ms), 3),
+        'wall_ms_max': round(max(wall_ms), 3),
+        'peak_alloc_kb': round(peak / 1024, 1),
+    }
+
+
+def seed(members, seed_value=42, stdout=None):
+    """Fill the (test) database for one scale"""
+    call_command('flush', interactive=False, verbosity=0)
+    call_command(
+        'generate_load_data', members=members, days=365, seed=seed_value,
+        walkins_per_day=max(5, members / 100), stdout=stdout,
+    )
+    return BenchmarkFixtures()
+
+
+def run_benchmarks(scales, scenarios=None, repeat=5, seed_value=42, stdout=None, log=None):
+    """
+    Seed a fresh test database for each scale and run every scenario.
+
+    The configured database is never touched: a test database is created
+    for the run and destroyed afterwards.
+    """
+    scenarios = scenarios or list(SCENARIOS)
+    report = {
+        'meta': {
+            'generated_at': timezone.now().isoformat(),
+            'django': django.get_version(),
+            'python': platform.python_version(),
+            'database': connection.vendor,
+            'repeat': repeat,
+            'seed': seed_value,
+        },
+        'results': {},
+    }
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        for scale in scales:
+            members = SCALES[scale] if scale in SCALES else int(scale)
+            if log:
+                log(f'🌱 Seeding scale "{scale}" ({members:,} members)...')
+            started = time.perf_counter()
+            fixtures = seed(members, seed_value, stdout=stdout)
+            seeded_in = time.perf_counter() - started
+
+            results = {}
+            for name in scenarios:
+                results[name] = run_scenario(fixtures, name, repeat=repeat)
+                if log:
+                    r = results[name]
+                    log(f'   {name:<22} {r["queries"]:>4} queries  {r["wall_ms_median"]:>9.2f} ms  '
+                        f'{r["peak_alloc_kb"]:>9.1f} KB')
+            report['results'][str(scale)] = {
+                'members': members,
+                'seed_seconds': round(seeded_in, 2),
+                'scenarios': results,
+            }
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+    return report
+
+
+def compare_reports(current, baseline, tolerance=0.25):
+    """
+    Compare two reports and return a list of regression messages.
+
+    A scenario regresses when it runs more queries than the baseline, or
+    when its median wall time grows by more than ``tolerance`` (and by more
+    than the noise floor).
+    """
+    regressions = []
+    for scale, data in current['results'].items():
+        base_scale = baseline.get('results', {}).get(scale)
+        if not base_scale:
+            continue
+        for name, metrics in data['scenarios'].items():
+            base = base_scale['scenarios'].get(name)
+            if not base:
+                continue
+            if metrics['queries'] > base['queries']:
+                regressions.append(
+                    f'[{scale}] {name}: queries {base["queries"]} → {metrics["queries"]}'
+                )
+            limit = base['wall_ms_median'] * (1 + tolerance)
+            if (metrics['wall_ms_median'] > limit
+                    and metrics['wall_ms_median'] - base['wall_ms_median'] > NOISE_FLOOR_MS):
+                regressions.append(
+                    f'[{scale}] {name}: median {base["wall_ms_median"]:.2f} ms → '
+                    f'{metrics["wall_ms_median"]:.2f} ms (limit {limit:.2f} ms)'
+                )
+    return regressions
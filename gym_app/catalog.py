@@ -0,0 +1,215 @@
+"""
+Plan and pass catalog.
+
+The catalog version is a counter kept in the default cache. It changes
+whenever a ``MembershipPlan`` or ``FlexibleAccess`` row is saved or deleted
+(see ``signals.py``), whether from ``manage_plans_view``, the Django admin or
+a shell. Cached pages and template fragments that show plans include the
+version in their key, so a bump makes every stale copy unreachable at once
+instead of having to find and delete them.
+
+``catalog`` keeps both tables in process memory as immutable snapshots,
+indexed by id, so views can list plans and resolve a plan id or price
+without a query. The local signal handler drops it immediately; other
+server processes notice the version bump on their next lookup.
+"""
+
+import threading
+import time
+from decimal import Decimal
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404
+
+
+CATALOG_VERSION_KEY = 'gym:catalog:version'
+
+
+def _initial_version():
+    # Starting from the clock rather than 1 means a version key evicted or
+    # lost with a cache restart can never come back as an old value and
+    # resurrect pages cached under it.
+    return int(time.time() * 1000)
+
+
+def get_catalog_version():
+    """Current catalog version"""
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOG_VERSION_KEY, _initial_version(), timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    """Invalidate everything cached against the current catalog"""
+    try:
+        return cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        version = _initial_version()
+        cache.set(CATALOG_VERSION_KEY, version, timeout=None)
+        return version
+
+
+def catalog_cache_timeout():
+    """How long catalog-keyed pages and fragments are kept, in seconds"""
+    return getattr(settings, 'CATALOG_CACHE_TIMEOUT', 60 * 60)
+
+
+# ---------- In-process snapshots ----------
+
+class _Snapshot:
+    """Read-only copy of one catalog row"""
+
+    __slots__ = ('id', 'name', 'duration_days', 'price', 'description', 'is_active')
+    model_name = None
+
+    def __init__(self, id, name, duration_days, price, description, is_active):
+        set_field = object.__setattr__
+        set_field(self, 'id', id)
+        set_field(self, 'name', name)
+        set_field(self, 'duration_days', duration_days)
+        set_field(self, 'price', Decimal(price))
+        set_field(self, 'description', description)
+        set_field(self, 'is_active', is_active)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'{type(self).__name__} is read-only')
+
+    __delattr__ = __setattr__
+
+    @property
+    def pk(self):
+        return self.id
+
+    @classmethod
+    def from_instance(cls, obj):
+        return cls(obj.id, obj.name, obj.duration_days, obj.price, obj.description, obj.is_active)
+
+    def as_model(self):
+        """Model instance for use as a foreign key value, built without a query"""
+        obj = apps.get_model('gym_app', self.model_name)(
+            id=self.id, name=self.name, duration_days=self.duration_days,
+            price=self.price, description=self.description, is_active=self.is_active,
+        )
+        obj._state.adding = False
+        return obj
+
+    def __eq__(self, other):
+        return type(other) is type(self) and other.id == self.id
+
+    def __hash__(self):
+        return hash((type(self), self.id))
+
+    def __str__(self):
+        return f"{self.name} - ₱{self.price} ({self.duration_days} days)"
+
+    def __repr__(self):
+        return f'<{type(self).__name__} {self.id}: {self.name}>'
+
+
+class PlanSnapshot(_Snapshot):
+    __slots__ = ()
+    model_name = 'MembershipPlan'
+
+
+class PassSnapshot(_Snapshot):
+    __slots__ = ()
+    model_name = 'FlexibleAccess'
+
+
+class _CatalogState:
+    __slots__ = ('version', 'plans', 'passes', 'active_plans', 'active_passes', 'all_plans', 'all_passes')
+
+    def __init__(self, version, plans, passes):
+        self.version = version
+        self.plans = {plan.id: plan for plan in plans}
+        self.passes = {pass_type.id: pass_type for pass_type in passes}
+        # Same orderings the views used to ask the database for
+        self.all_plans = tuple(sorted(plans, key=lambda plan: (-plan.duration_days, plan.id)))
+        self.all_passes = tuple(sorted(passes, key=lambda pass_type: (pass_type.duration_days, pass_type.id)))
+        self.active_plans = tuple(sorted(
+            (plan for plan in plans if plan.is_active), key=lambda plan: (plan.price, plan.id),
+        ))
+        self.active_passes = tuple(pass_type for pass_type in self.all_passes if pass_type.is_active)
+
+
+class Catalog:
+    """Membership plans and walk-in passes held in memory"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state = None
+
+    def _current(self):
+        version = get_catalog_version()
+        state = self._state
+        if state is not None and state.version == version:
+            return state
+        with self._lock:
+            state = self._state
+            if state is None or state.version != version:
+                state = self._state = self._load(version)
+        return state
+
+    @staticmethod
+    def _load(version):
+        from .models import MembershipPlan, FlexibleAccess
+        plans = [PlanSnapshot.from_instance(plan) for plan in MembershipPlan.objects.all()]
+        passes = [PassSnapshot.from_instance(pass_type) for pass_type in FlexibleAccess.objects.all()]
+        return _CatalogState(version, plans, passes)
+
+    def invalidate(self):
+        self._state = None
+
+    def active_plans(self):
+        """Active membership plans, cheapest first"""
+        return self._current().active_plans
+
+    def active_passes(self):
+        """Active walk-in passes, shortest first"""
+        return self._current().active_passes
+
+    def all_plans(self):
+        """Every membership plan, longest first"""
+        return self._current().all_plans
+
+    def all_passes(self):
+        """Every walk-in pass, shortest first"""
+        return self._current().all_passes
+
+    def get_plan(self, plan_id, active_only=True):
+        plan = self._current().plans.get(_as_id(plan_id))
+        if plan is None or (active_only and not plan.is_active):
+            return None
+        return plan
+
+    def get_pass(self, pass_id, active_only=True):
+        pass_type = self._current().passes.get(_as_id(pass_id))
+        if pass_type is None or (active_only and not pass_type.is_active):
+            return None
+        return pass_type
+
+    def plan_or_404(self, plan_id, active_only=True):
+        plan = self.get_plan(plan_id, active_only)
+        if plan is None:
+            raise Http404('No membership plan matches the given query.')
+        return plan
+
+    def pass_or_404(self, pass_id, active_only=True):
+        pass_type = self.get_pass(pass_id, active_only)
+        if pass_type is None:
+            raise Http404('No walk-in pass matches the given query.')
+        return pass_type
+
+
+def _as_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+catalog = Catalog()
@@ -0,0 +1,302 @@
+"""
+Member retention by join cohort.
+
+A member's cohort is the month their first plan started. For every cohort
+and every month since, ``curves`` counts the members who were still covered
+by a plan, who started a renewal, and who lapsed (their last plan ended that
+month and they have not started another). It is one pass over the members'
+plan intervals, sorted by member; with NumPy installed the pass is done on
+arrays instead of in a Python loop.
+
+The curves are cached in ``CohortRetention`` and ``refresh`` (run nightly by
+``expire_memberships``) keeps them current incrementally: cohorts holding a
+member whose plans were saved since the last refresh are recomputed, and
+members whose curves only moved with the calendar (a plan started or ended,
+or ran into a new month) have their change applied to their cohort. A
+deleted plan, or a first plan moved to another month, leaves no saved plan
+behind in the old cohort, so the membership signals mark it with
+``StaleCohort`` (``mark_stale``) and it is recomputed too.
+"""
+
+from collections import defaultdict
+from datetime import date
+from itertools import groupby
+
+from django.db import transaction
+from django.db.models import Max, Min, Q
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import UserMembership, CohortRetention, StaleCohort
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+CURVES = {
+    'retained': 'Still Members',
+    'renewed': 'Renewed',
+    'churned': 'Lapsed',
+}
+
+
+def month_index(day):
+    """Months since year 0, so that month arithmetic is integer arithmetic"""
+    return day.year * 12 + day.month - 1
+
+
+def month_start(index):
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _started(today):
+    return UserMembership.objects.exclude(status='cancelled').filter(start_date__lte=today)
+
+
+def plans(today, user_ids=None):
+    """(user_id, start_date, end_date) of every plan started by ``today``, by member and start"""
+    queryset = _started(today)
+    if user_ids is not None:
+        queryset = queryset.filter(user_id__in=user_ids)
+    return queryset.order_by('user_id', 'start_date', 'id').values_list('user_id', 'start_date', 'end_date')
+
+
+def curves(rows, today):
+    """
+    Cohort curves of ``rows`` (see ``plans``) as of ``today``:
+    {cohort month index: [members, {offset: [retained, renewed, churned]}]}.
+    """
+    # (member, start month, end month, ended before today)
+    rows = [
+        (user_id, month_index(start_date), month_index(end_date), end_date < today)
+        for user_id, start_date, end_date in rows
+    ]
+    if not rows:
+        return {}
+    if numpy is not None:
+        return _curves_numpy(rows, month_index(today))
+    return _curves_python(rows, month_index(today))
+
+
+def _curves_python(rows, current):
+    result = {}
+    for user_id, member_plans in groupby(rows, key=lambda row: row[0]):
+        member_plans = list(member_plans)
+        cohort = member_plans[0][1]
+        covered, renewed = set(), set()
+        for number, (_, start, end, ended) in enumerate(member_plans):
+            covered.update(range(start, min(end, current) + 1))
+            if number:
+                renewed.add(start)
+
+        entry = result.setdefault(cohort, [0, defaultdict(lambda: [0, 0, 0])])
+        entry[0] += 1
+        for month in covered:
+            entry[1][month - cohort][0] += 1
+        for month in renewed:
+            entry[1][month - cohort][1] += 1
+        if all(ended for _, _, _, ended in member_plans):
+            entry[1][max(end for _, _, end, _ in member_plans) - cohort][2] += 1
+    return result
+
+
+def _curves_numpy(rows, current):
+    user_ids, starts, ends, ended = numpy.array(rows, dtype=numpy.int64).T
+
+    # Rows are sorted by member: a member's first row is their first plan
+    first = numpy.ones(len(rows), dtype=bool)
+    first[1:] = user_ids[1:] != user_ids[:-1]
+    first_rows = numpy.flatnonzero(first)
+    member = numpy.cumsum(first) - 1
+    cohorts = starts[first_rows]
+    base = int(cohorts.min())
+    span = current - base + 1
+
+    # Every (member, month) a plan covers, counted once per member
+    lengths = numpy.maximum(numpy.minimum(ends, current) - starts + 1, 0)
+    plan = numpy.repeat(numpy.arange(len(rows)), lengths)
+    months = starts[plan] + numpy.arange(plan.size) - numpy.repeat(numpy.cumsum(lengths) - lengths, lengths)
+    covered = numpy.unique(member[plan] * span + (months - base))
+
+    renewals = numpy.unique(member[~first] * span + (starts[~first] - base))
+
+    lapsed = numpy.flatnonzero(numpy.logical_and.reduceat(ended.astype(bool), first_rows))
+    last_month = numpy.maximum.reduceat(ends, first_rows)[lapsed]
+
+    # Members by (cohort, offset), both counted from ``base``
+    def tally(members, month):
+        cohort = cohorts[members] - base
+        return numpy.bincount(cohort * span + (month - base - cohort), minlength=span * span)
+
+    counts = numpy.stack([
+        tally(covered // span, covered % span + base),
+        tally(renewals // span, renewals % span + base),
+        tally(lapsed, last_month),
+    ], axis=1)
+    sizes = numpy.bincount(cohorts - base, minlength=span)
+
+    result = {}
+    for point in numpy.flatnonzero(counts.any(axis=1)).tolist():
+        cohort, offset = divmod(point, span)
+        entry = result.setdefault(cohort + base, [int(sizes[cohort]), defaultdict(lambda: [0, 0, 0])])
+        entry[1][offset] = counts[point].tolist()
+    for cohort in numpy.flatnonzero(sizes).tolist():
+        result.setdefault(cohort + base, [int(sizes[cohort]), defaultdict(lambda: [0, 0, 0])])
+    return result
+
+
+def edited_cohorts(since, today):
+    """Months of the cohorts holding a member whose plans were saved since ``since``"""
+    edited = UserMembership.objects.filter(updated_at__gte=since, start_date__lte=today)
+    # The edited plan's month covers a cancelled or moved first plan
+    cohorts = {month_index(day) for day in edited.order_by().values_list('start_date', flat=True).distinct()}
+    cohorts.update(
+        month_index(joined)
+        for joined in _started(today).filter(user_id__in=edited.values('user_id'))
+        .values('user_id').annotate(joined=Min('start_date')).values_list('joined', flat=True)
+    )
+    return cohorts
+
+
+def mark_stale(user_id, day):
+    """
+    Have the next refresh recompute the cohort of ``day`` (the start of a
+    plan being deleted or moved) and the member's current cohort
+    """
+    joined = UserMembership.objects.exclude(status='cancelled').filter(user_id=user_id).aggregate(
+        joined=Min('start_date')
+    )['joined']
+    months = {month_index(start) for start in (day, joined) if start is not None}
+    StaleCohort.objects.bulk_create([StaleCohort(cohort=month_start(month)) for month in months], ignore_conflicts=True)
+
+
+def moved_plans(since, last_day, today):
+    """
+    Plans of members not edited since ``since`` whose curves moved with the
+    calendar alone: a plan started or ended after ``last_day``, or ran into
+    a new month.
+    """
+    moved = Q(start_date__gt=last_day) | Q(end_date__gte=last_day, end_date__lt=today)
+    if month_index(today) > month_index(last_day):
+        moved |= Q(end_date__gte=month_start(month_index(last_day) + 1))
+    members = _started(today).filter(moved).exclude(
+        user_id__in=UserMembership.objects.filter(updated_at__gte=since).values('user_id')
+    ).values('user_id')
+    return plans(today, members)
+
+
+def _cached():
+    """The cached curves, in the shape ``curves`` returns"""
+    cached = {}
+    for point in CohortRetention.objects.order_by():
+        entry = cached.setdefault(month_index(point.cohort), [point.members, defaultdict(lambda: [0, 0, 0])])
+        entry[1][point.offset] = [point.retained, point.renewed, point.churned]
+    return cached
+
+
+def _add(result, change, sign=1):
+    for cohort, (size, counts) in change.items():
+        entry = result.setdefault(cohort, [0, defaultdict(lambda: [0, 0, 0])])
+        entry[0] += sign * size
+        for offset, values in counts.items():
+            entry[1][offset] = [total + sign * value for total, value in zip(entry[1][offset], values)]
+
+
+def refresh(today=None, full=False):
+    """
+    Bring the cached curves up to date as of ``today``. Returns the number
+    of cohorts rewritten.
+
+    Cohorts holding a member whose plans were saved since the last refresh,
+    and the ones marked stale, are recomputed. Members whose curves only
+    moved with the calendar are counted again as of today and as of the last
+    refresh, and the difference is applied to their cohort. Everything is recomputed when ``full`` or on
+    the first run.
+    """
+    if today is None:
+        today = date.today()
+    now = timezone.now()
+    last = CohortRetention.objects.aggregate(as_of=Max('as_of'), refreshed_at=Max('refreshed_at'))
+    # Marks for cohorts that have not started yet wait until they have
+    marked = dict(StaleCohort.objects.filter(cohort__lte=today).values_list('id', 'cohort'))
+
+    if full or last['as_of'] is None:
+        result = curves(plans(today), today)
+        touched = set(result)
+        stale = CohortRetention.objects.all()
+    else:
+        since, last_day = last['refreshed_at'], last['as_of']
+        result = _cached()
+        touched = edited_cohorts(since, today)
+        touched.update(month_index(cohort) for cohort in marked.values())
+        if touched:
+            joined = _started(today).values('user_id').annotate(
+                cohort=TruncMonth(Min('start_date'))
+            ).filter(cohort__in=[month_start(cohort) for cohort in touched]).values('user_id')
+            recomputed = curves(plans(today, joined), today)
+            for cohort in touched:
+                result.pop(cohort, None)
+            _add(result, recomputed)
+
+        moved = []
+        for user_id, member_plans in groupby(moved_plans(since, last_day, today), key=lambda row: row[0]):
+            member_plans = list(member_plans)
+            if month_index(member_plans[0][1]) not in touched:
+                moved += member_plans
+        now_curves = curves(moved, today)
+        then_curves = curves([row for row in moved if row[1] <= last_day], last_day)
+        _add(result, now_curves)
+        _add(result, then_curves, sign=-1)
+        touched.update(now_curves, then_curves)
+        if month_index(today) > month_index(last_day):
+            # Every cohort gets a point for the new month
+            touched.update(result)
+        stale = CohortRetention.objects.filter(cohort__in=[month_start(cohort) for cohort in touched])
+
+    current = month_index(today)
+    points = [
+        CohortRetention(
+            cohort=month_start(cohort), offset=offset, members=size,
+            retained=counts.get(offset, (0, 0, 0))[0],
+            renewed=counts.get(offset, (0, 0, 0))[1],
+            churned=counts.get(offset, (0, 0, 0))[2],
+            as_of=today, refreshed_at=now,
+        )
+        for cohort, (size, counts) in result.items() if cohort in touched and size > 0
+        for offset in range(current - cohort + 1)
+    ]
+
+    with transaction.atomic():
+        stale.delete()
+        StaleCohort.objects.filter(id__in=marked).delete()
+        CohortRetention.objects.bulk_create(points, batch_size=500)
+        # Untouched cohorts did not move, so they are current as of today too
+        CohortRetention.objects.update(as_of=today, refreshed_at=now)
+    return len(touched)
+
+
+def retention_table(today=None, curve='retained', months=12):
+    """
+    The cohorts that joined in the last ``months`` months, newest first, with
+    the share (percent) of their members counted by ``curve`` in each month
+    since joining. Returns (rows, offsets, as_of); one query.
+    """
+    if today is None:
+        today = date.today()
+    points = CohortRetention.objects.filter(
+        cohort__gte=month_start(month_index(today) - months + 1)
+    ).order_by('-cohort', 'offset')
+
+    rows, as_of = {}, None
+    for point in points:
+        row = rows.setdefault(point.cohort, {'cohort': point.cohort, 'members': point.members, 'values': []})
+        row['values'].append(
+            round(100 * getattr(point, curve) / point.members, 1) if point.members else None
+        )
+        as_of = max(as_of, point.as_of) if as_of else point.as_of
+    offsets = list(range(max((len(row['values']) for row in rows.values()), default=0)))
+    for row in rows.values():
+        row['values'] += [None] * (len(offsets) - len(row['values']))
+    return list(rows.values()), offsets, as_of
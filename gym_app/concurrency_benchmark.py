@@ -0,0 +1,249 @@
+"""
+Concurrency benchmark: WSGI threads against ASGI tasks.
+
+Seeds a throwaway test database with ``generate_load_data`` and then runs
+many clients at once: kiosk tablets checking members in and out with their
+PINs, and front-desk terminals polling the dashboard metric endpoints.
+
+Under WSGI every client is a thread with its own test ``Client``, the way a
+threaded server (gunicorn ``gthread``, ``runserver``) handles connections.
+Under ASGI every client is a task with an ``AsyncClient`` on one event
+loop, the way a single uvicorn or daphne worker does. Requests go through
+the full handler and middleware stack but not through sockets, so the
+numbers compare the two serving models and not the network.
+
+SQLite test databases normally live in memory, where concurrent writers
+fail instead of waiting, so the run uses a temporary database file.
+
+Used by the ``benchmark_concurrency`` management command.
+"""
+
+import asyncio
+import os
+import platform
+import statistics
+import tempfile
+import threading
+import time
+from datetime import date
+
+import django
+from asgiref.sync import sync_to_async
+from django.db import connection, connections
+from django.test import AsyncClient, Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from .benchmarks import SCALES, seed
+from .models import User
+
+
+MODES = ('wsgi', 'asgi')
+
+# Endpoints a terminal polls, in turn
+TERMINAL_PATHS = ['/dashboard/summary/', '/dashboard/attendance/']
+
+
+class ConcurrencyFixtures:
+    """Kiosk PINs and the terminal account, on top of the generated data"""
+
+    def __init__(self, kiosks):
+        today = date.today()
+        self.pins = list(
+            User.objects.filter(
+                role='member', kiosk_pin__isnull=False,
+                memberships__status='active', memberships__end_date__gte=today,
+            ).distinct().order_by('id').values_list('kiosk_pin', flat=True)[:kiosks]
+        )
+        if not self.pins:
+            raise RuntimeError('The generated data has no members with an active plan and a PIN')
+        self.staff = User.objects.create_user(
+            username='bench_terminal', email='bench_terminal@example.com', password=None,
+            role='staff', is_staff=True,
+        )
+
+    def pin_for(self, client_number):
+        return self.pins[client_number % len(self.pins)]
+
+
+class Timings:
+    """Latencies and failures per client kind, safe to share between threads"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = {'kiosk': [], 'terminal': []}
+        self.errors = {'kiosk': 0, 'terminal': 0}
+
+    def add(self, kind, seconds, status):
+        with self._lock:
+            self.latencies[kind].append(seconds * 1000)
+            if status >= 400:
+                self.errors[kind] += 1
+
+    def add_error(self, kind):
+        with self._lock:
+            self.errors[kind] += 1
+
+
+def _percentiles(values):
+    if len(values) < 2:
+        value = values[0] if values else 0.0
+        return {'p50': value, 'p95': value, 'p99': value}
+    cuts = statistics.quantiles(values, n=100, method='inclusive')
+    return {'p50': round(cuts[49], 3), 'p95': round(cuts[94], 3), 'p99': round(cuts[98], 3)}
+
+
+def _kiosk_request(client, pin):
+    return client.post('/kiosk/', {'kiosk_pin': pin})
+
+
+# ---------- WSGI: one thread per client ----------
+
+def _wsgi_client(kind, number, fixtures, requests, timings, start):
+    try:
+        client = Client()
+        if kind == 'terminal':
+            client.force_login(fixtures.staff)
+        start.wait()
+        for i in range(requests):
+            started = time.perf_counter()
+            try:
+                if kind == 'kiosk':
+                    response = _kiosk_request(client, fixtures.pin_for(number))
+                else:
+                    response = client.get(TERMINAL_PATHS[i % len(TERMINAL_PATHS)])
+            except Exception:
+                timings.add_error(kind)
+                continue
+            timings.add(kind, time.perf_counter() - started, response.status_code)
+    finally:
+        connections.close_all()
+
+
+def run_wsgi(fixtures, kiosks, terminals, requests):
+    timings = Timings()
+    clients = [('kiosk', n) for n in range(kiosks)] + [('terminal', n) for n in range(terminals)]
+    start = threading.Barrier(len(clients) + 1)
+    threads = [
+        threading.Thread(target=_wsgi_client, args=(kind, n, fixtures, requests, timings, start))
+        for kind, n in clients
+    ]
+    for thread in threads:
+        thread.start()
+    start.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return timings, time.perf_counter() - started
+
+
+# ---------- ASGI: one task per client ----------
+
+async def _asgi_client(kind, number, client, fixtures, requests, timings):
+    for i in range(requests):
+        started = time.perf_counter()
+        try:
+            if kind == 'kiosk':
+                response = await _kiosk_request(client, fixtures.pin_for(number))
+            else:
+                response = await client.get(TERMINAL_PATHS[i % len(TERMINAL_PATHS)])
+        except Exception:
+            timings.add_error(kind)
+            continue
+        timings.add(kind, time.perf_counter() - started, response.status_code)
+
+
+def run_asgi(fixtures, kiosks, terminals, requests):
+    timings = Timings()
+
+    async def main():
+        # Log every terminal in before the clock starts
+        clients = []
+        for kind, count in (('kiosk', kiosks), ('terminal', terminals)):
+            for n in range(count):
+                client = AsyncClient()
+                if kind == 'terminal':
+                    await client.aforce_login(fixtures.staff)
+                clients.append((kind, n, client))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            _asgi_client(kind, n, client, fixtures, requests, timings) for kind, n, client in clients
+        ))
+        elapsed = time.perf_counter() - started
+        await sync_to_async(connections.close_all)()
+        return elapsed
+
+    return timings, asyncio.run(main())
+
+
+RUNNERS = {'wsgi': run_wsgi, 'asgi': run_asgi}
+
+
+def summarize(timings, elapsed):
+    total = sum(len(values) for values in timings.latencies.values())
+    return {
+        'requests': total,
+        'errors': sum(timings.errors.values()),
+        'seconds': round(elapsed, 3),
+        'throughput_rps': round(total / elapsed, 1) if elapsed else None,
+        'kinds': {
+            kind: {'requests': len(values), 'errors': timings.errors[kind], **_percentiles(values)}
+            for kind, values in timings.latencies.items() if values
+        },
+    }
+
+
+def run_concurrency_benchmark(scale='tiny', modes=MODES, kiosks=20, terminals=5, requests=20,
+                              seed_value=42, stdout=None, log=None):
+    """
+    Seed a file-backed test database and run each serving mode against it.
+
+    The configured database is never touched.
+    """
+    members = SCALES[scale] if scale in SCALES else int(scale)
+    report = {
+        'meta': {
+            'generated_at': timezone.now().isoformat(),
+            'django': django.get_version(),
+            'python': platform.python_version(),
+            'cpus': os.cpu_count(),
+            'database': connection.vendor,
+            'scale': scale,
+            'members': members,
+            'kiosks': kiosks,
+            'terminals': terminals,
+            'requests_per_client': requests,
+        },
+        'results': {},
+    }
+
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    old_test_name = test_settings.get('NAME')
+    temp_dir = None
+    if connection.vendor == 'sqlite' and not old_test_name:
+        temp_dir = tempfile.TemporaryDirectory()
+        test_settings['NAME'] = os.path.join(temp_dir.name, 'concurrency.sqlite3')
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        if log:
+            log(f'🌱 Seeding scale "{scale}" ({members:,} members)...')
+        seed(members, seed_value, stdout=stdout)
+        fixtures = ConcurrencyFixtures(kiosks)
+        connections.close_all()
+
+        for mode in modes:
+            if log:
+                log(f'   {mode}: {kiosks} kiosks + {terminals} terminals x {requests} requests...')
+            timings, elapsed = RUNNERS[mode](fixtures, kiosks, terminals, requests)
+            report['results'][mode] = summarize(timings, elapsed)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+        if temp_dir is not None:
+            test_settings['NAME'] = old_test_name
+            temp_dir.cleanup()
+
+    return report
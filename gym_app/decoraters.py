@@ -1,7 +1,11 @@
 from django.shortcuts import redirect
 from django.contrib import messages
+from django.core.cache import cache
+from django.http import HttpResponse
 from functools import wraps
 
+from .catalog import get_catalog_version, catalog_cache_timeout
+
 
 def admin_required(view_func):
     """Decorator to restrict access to admin users only"""
@@ -48,4 +52,31 @@ def member_required(view_func):
             return redirect('dashboard')
         
         return view_func(request, *args, **kwargs)
-    return wrapper
\ No newline at end of file
+    return wrapper
+
+def cache_anonymous_page(key_prefix):
+    """
+    Cache the whole response for anonymous visitors, keyed by catalog version.
+
+    Logged-in users, non-GET requests and requests with pending flash messages
+    always go through the view. A cache hit does not touch the database.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if (request.method != 'GET' or request.user.is_authenticated
+                    or len(messages.get_messages(request))):
+                return view_func(request, *args, **kwargs)
+
+            key = f'gym:page:{key_prefix}:{get_catalog_version()}:{request.path}'
+            cached = cache.get(key)
+            if cached is not None:
+                content, content_type = cached
+                return HttpResponse(content, content_type=content_type)
+
+            response = view_func(request, *args, **kwargs)
+            if response.status_code == 200 and not getattr(response, 'streaming', False):
+                cache.set(key, (response.content, response['Content-Type']), catalog_cache_timeout())
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,177 @@
+"""
+Live front-desk events.
+
+An in-process event bus fed by the kiosk and payment views: check-ins,
+check-outs and sales are published as they happen and pushed to the
+dashboards over server-sent events (``views.events_stream``), which keep a
+running tally in the browser instead of re-running counts on every refresh.
+
+Events carry an increasing id and the last ``EVENT_BUFFER_SIZE`` are kept,
+so a page can ask for everything after the id it was rendered with (or the
+browser can resume with ``Last-Event-ID`` after a reconnect) without gaps.
+
+The bus lives in one process. Under the ASGI server (see
+``gym_project/asgi.py``) one worker holds every stream open cheaply; under
+WSGI each open stream occupies a server thread. With several workers each
+only sees its own events, and the pages keep the counts they were rendered
+with.
+"""
+
+import asyncio
+import itertools
+import json
+import queue
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+
+class Event:
+    __slots__ = ('id', 'type', 'data')
+
+    def __init__(self, id, type, data):
+        self.id = id
+        self.type = type
+        self.data = data
+
+    def encode(self):
+        """The event in ``text/event-stream`` framing"""
+        payload = json.dumps(self.data, cls=DjangoJSONEncoder)
+        return f'id: {self.id}\nevent: {self.type}\ndata: {payload}\n\n'
+
+
+class EventBus:
+    """
+    Fan-out of events to subscribers.
+
+    ``publish`` may be called from any thread (sync views run in worker
+    threads). A subscriber is a ``deliver(event)`` callable that must not
+    block: it only hands the event to the queue of its stream.
+    """
+
+    def __init__(self, buffer_size=None):
+        self._lock = threading.Lock()
+        # Start from the clock so ids keep increasing across restarts and a
+        # reconnecting browser's Last-Event-ID never hides new events
+        self._ids = itertools.count(int(time.time() * 1000))
+        self._buffer = deque(maxlen=buffer_size or getattr(settings, 'EVENT_BUFFER_SIZE', 500))
+        self._subscribers = set()
+
+    @property
+    def last_id(self):
+        with self._lock:
+            return self._buffer[-1].id if self._buffer else 0
+
+    def publish(self, type, **data):
+        now = timezone.now()
+        data.setdefault('at', now)
+        data.setdefault('date', timezone.localdate(now))
+        with self._lock:
+            event = Event(next(self._ids), type, data)
+            self._buffer.append(event)
+            subscribers = list(self._subscribers)
+        for deliver in subscribers:
+            try:
+                deliver(event)
+            except RuntimeError:
+                # Event loop already closed; the stream is going away
+                pass
+        return event
+
+    def since(self, last_id):
+        """Buffered events after ``last_id``"""
+        with self._lock:
+            return [event for event in self._buffer if event.id > last_id]
+
+    def subscribe(self, deliver):
+        with self._lock:
+            self._subscribers.add(deliver)
+
+    def unsubscribe(self, deliver):
+        with self._lock:
+            self._subscribers.discard(deliver)
+
+    @property
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+
+bus = EventBus()
+
+
+def publish_on_commit(type, **data):
+    """Publish once the current transaction commits (immediately outside one)"""
+    transaction.on_commit(lambda: bus.publish(type, **data))
+
+
+# ---------- text/event-stream ----------
+#
+# Both streams subscribe before reading the buffer, so no event published in
+# between is lost, and skip anything at or below the last id already sent.
+# A comment line every ``EVENT_STREAM_HEARTBEAT`` seconds keeps proxies from
+# closing an idle connection.
+
+RETRY = 'retry: 3000\n\n'
+KEEP_ALIVE = ': keep-alive\n\n'
+
+
+def _heartbeat():
+    return getattr(settings, 'EVENT_STREAM_HEARTBEAT', 15)
+
+
+async def stream(last_id=0, heartbeat=None):
+    """Event stream for ASGI: one asyncio queue per connection"""
+    heartbeat = heartbeat or _heartbeat()
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
+
+    def deliver(event):
+        loop.call_soon_threadsafe(events.put_nowait, event)
+
+    bus.subscribe(deliver)
+    try:
+        yield RETRY
+        for event in bus.since(last_id):
+            last_id = event.id
+            yield event.encode()
+        while True:
+            try:
+                event = await asyncio.wait_for(events.get(), heartbeat)
+            except asyncio.TimeoutError:
+                yield KEEP_ALIVE
+                continue
+            if event.id > last_id:
+                last_id = event.id
+                yield event.encode()
+    finally:
+        bus.unsubscribe(deliver)
+
+
+def stream_sync(last_id=0, heartbeat=None):
+    """Event stream for WSGI: holds one server thread per connection"""
+    heartbeat = heartbeat or _heartbeat()
+    events = queue.SimpleQueue()
+    deliver = events.put_nowait
+    bus.subscribe(deliver)
+    try:
+        yield RETRY
+        for event in bus.since(last_id):
+            last_id = event.id
+            yield event.encode()
+        while True:
+            try:
+                event = events.get(timeout=heartbeat)
+            except queue.Empty:
+                yield KEEP_ALIVE
+                continue
+            if event.id > last_id:
+                last_id = event.id
+                yield event.encode()
+    finally:
+        bus.unsubscribe(deliver)
@@ -0,0 +1,85 @@
+"""
+Password hashing for bulk user creation.
+
+``create_user`` hashes one password at a time on the calling thread, which
+makes imports and seeding CPU-bound on a single core. ``PasswordHasherPool``
+spreads ``make_password`` calls over a ``ProcessPoolExecutor`` instead;
+small batches are hashed in-process where the pool start-up would cost more
+than it saves.
+
+How expensive each hash is depends on ``PASSWORD_HASHERS``; see
+``PASSWORD_HASHER_PROFILE`` in settings for the fast test/sample-data profile.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+
+
+# Below this many passwords a pool is not worth starting
+MIN_PARALLEL_BATCH = 8
+
+DEFAULT_CHUNKSIZE = 32
+
+
+def _init_worker(settings_module):
+    """Configure Django in pool workers started with the "spawn" method"""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+
+
+def _hash(password):
+    # None produces an unusable password, same as set_unusable_password()
+    return make_password(password)
+
+
+class PasswordHasherPool:
+    """
+    Hash passwords across worker processes.
+
+    Usage:
+        with PasswordHasherPool() as pool:
+            hashes = pool.hash_many(['secret1', 'secret2', None])
+
+    ``workers=0`` disables the pool and hashes on the calling thread.
+    """
+
+    def __init__(self, workers=None, chunksize=DEFAULT_CHUNKSIZE):
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        self.chunksize = chunksize
+        self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', 'gym_project.settings'),),
+            )
+        return self._executor
+
+    def hash_many(self, passwords):
+        """Return encoded hashes for ``passwords`` in the same order"""
+        passwords = list(passwords)
+        if self.workers <= 1 or len(passwords) < MIN_PARALLEL_BATCH:
+            return [_hash(password) for password in passwords]
+        return list(self._get_executor().map(_hash, passwords, chunksize=self.chunksize))
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+def hash_passwords(passwords, workers=None):
+    """One-off helper: hash a list of raw passwords in parallel"""
+    with PasswordHasherPool(workers=workers) as pool:
+        return pool.hash_many(passwords)
@@ -0,0 +1,320 @@
+"""
+Bulk member import from CSV.
+
+Rows are streamed from the file and processed in batches: each batch is
+validated with a handful of set-based lookups, passwords are hashed in a
+process pool (see ``gym_app.hashing``), and users, memberships and payments are written with
+``bulk_create`` inside one transaction per batch, together with their
+revenue ledger lines (``gym_app.ledger``). A single summary audit
+entry is written at the end instead of one per member.
+"""
+
+import csv
+from datetime import date, datetime, timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from . import ledger
+from .hashing import PasswordHasherPool
+from .models import User, MembershipPlan, UserMembership, MembershipCoverage, Payment, AuditLog
+
+
+MEMBER_CSV_COLUMNS = [
+    'username', 'email', 'first_name', 'last_name', 'password',
+    'mobile_no', 'address', 'birthdate',
+    'plan', 'start_date', 'payment_method', 'amount', 'reference_no',
+]
+
+DEFAULT_BATCH_SIZE = 500
+
+PAYMENT_METHODS = {value for value, label in Payment.PAYMENT_METHOD_CHOICES}
+
+
+class ImportResult:
+    """Counters and row errors collected while importing"""
+
+    def __init__(self):
+        self.rows = 0
+        self.users = 0
+        self.memberships = 0
+        self.payments = 0
+        self.pins = 0
+        self.errors = []
+
+    def add_error(self, line_no, message):
+        self.errors.append((line_no, message))
+
+    def as_dict(self):
+        return {
+            'rows': self.rows,
+            'users': self.users,
+            'memberships': self.memberships,
+            'payments': self.payments,
+            'pins': self.pins,
+            'errors': len(self.errors),
+        }
+
+
+def _parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+class MemberImporter:
+    """Validate and insert member rows from a CSV stream in batches"""
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE, hash_workers=None, dry_run=False):
+        self.batch_size = batch_size
+        self.hash_workers = hash_workers
+        self.dry_run = dry_run
+        self.result = ImportResult()
+        self.today = date.today()
+
+        # Usernames/emails already claimed by earlier rows in this file
+        self._seen_usernames = set()
+        self._seen_emails = set()
+
+        # Plans are looked up by id or (case-insensitive) name
+        self._plans = {}
+        for plan in MembershipPlan.objects.all():
+            self._plans[str(plan.id)] = plan
+            self._plans[plan.name.strip().lower()] = plan
+
+    def run(self, stream, performed_by=None, request=None):
+        """Import every row of ``stream`` (a text file object) and return the result"""
+        reader = csv.DictReader(stream)
+        missing = {'username', 'email'} - set(reader.fieldnames or [])
+        if missing:
+            raise ValueError(f'CSV is missing required column(s): {", ".join(sorted(missing))}')
+
+        with PasswordHasherPool(workers=self.hash_workers) as hasher:
+            batch = []
+            # Line 1 is the header row
+            for line_no, row in enumerate(reader, start=2):
+                batch.append((line_no, row))
+                if len(batch) >= self.batch_size:
+                    self._process_batch(batch, hasher, performed_by)
+                    batch = []
+            if batch:
+                self._process_batch(batch, hasher, performed_by)
+
+        if not self.dry_run and self.result.users:
+            AuditLog.log(
+                action='data_import',
+                user=performed_by,
+                description=f'Imported {self.result.users} member(s) from CSV',
+                severity='info',
+                request=request,
+                model_name='User',
+                **self.result.as_dict()
+            )
+
+        return self.result
+
+    # ---------- Validation ----------
+
+    def _clean_row(self, line_no, row):
+        """Normalise one CSV row, returning a dict or ``None`` if it is invalid"""
+        row = {key.strip(): (value or '').strip() for key, value in row.items() if key}
+        username = row.get('username', '')
+        email = row.get('email', '').lower()
+
+        if not username:
+            self.result.add_error(line_no, 'Username is required.')
+            return None
+        try:
+            User.username_validator(username)
+        except ValidationError:
+            self.result.add_error(line_no, f'Invalid username: {username}')
+            return None
+
+        try:
+            validate_email(email)
+        except ValidationError:
+            self.result.add_error(line_no, f'Invalid email: {email or "(blank)"}')
+            return None
+
+        if username.lower() in self._seen_usernames:
+            self.result.add_error(line_no, f'Duplicate username in file: {username}')
+            return None
+        if email in self._seen_emails:
+            self.result.add_error(line_no, f'Duplicate email in file: {email}')
+            return None
+
+        cleaned = {
+            'line_no': line_no,
+            'username': username,
+            'email': email,
+            'first_name': row.get('first_name', ''),
+            'last_name': row.get('last_name', ''),
+            'password': row.get('password') or None,
+            'mobile_no': row.get('mobile_no') or None,
+            'address': row.get('address') or None,
+            'birthdate': None,
+            'plan': None,
+            'start_date': self.today,
+            'payment_method': None,
+            'amount': None,
+            'reference_no': row.get('reference_no') or None,
+        }
+
+        try:
+            if row.get('birthdate'):
+                cleaned['birthdate'] = _parse_date(row['birthdate'])
+            if row.get('start_date'):
+                cleaned['start_date'] = _parse_date(row['start_date'])
+        except ValueError:
+            self.result.add_error(line_no, 'Dates must use the YYYY-MM-DD format.')
+            return None
+
+        if row.get('plan'):
+            plan = self._plans.get(row['plan'].lower())
+            if plan is None:
+                self.result.add_error(line_no, f'Unknown membership plan: {row["plan"]}')
+                return None
+            cleaned['plan'] = plan
+
+        method = row.get('payment_method', '').lower()
+        if method:
+            if cleaned['plan'] is None:
+                self.result.add_error(line_no, 'A payment needs a membership plan.')
+                return None
+            if method not in PAYMENT_METHODS:
+                self.result.add_error(line_no, f'Unknown payment method: {method}')
+                return None
+            cleaned['payment_method'] = method
+            try:
+                cleaned['amount'] = Decimal(row['amount']) if row.get('amount') else cleaned['plan'].price
+            except InvalidOperation:
+                self.result.add_error(line_no, f'Invalid amount: {row["amount"]}')
+                return None
+
+        self._seen_usernames.add(username.lower())
+        self._seen_emails.add(email)
+        return cleaned
+
+    def _validate_batch(self, batch):
+        rows = []
+        for line_no, raw in batch:
+            self.result.rows += 1
+            cleaned = self._clean_row(line_no, raw)
+            if cleaned is not None:
+                rows.append(cleaned)
+
+        if not rows:
+            return rows
+
+        # One query each for clashes with accounts already in the database,
+        # ignoring case like the checks within the file
+        existing_usernames = set(User.objects.annotate(username_lower=Lower('username')).filter(
+            username_lower__in=[row['username'].lower() for row in rows]
+        ).values_list('username_lower', flat=True))
+        existing_emails = set(User.objects.annotate(email_lower=Lower('email')).filter(
+            email_lower__in=[row['email'] for row in rows]
+        ).values_list('email_lower', flat=True))
+
+        valid = []
+        for row in rows:
+            if row['username'].lower() in existing_usernames:
+                self.result.add_error(row['line_no'], f'Username already exists: {row["username"]}')
+            elif row['email'] in existing_emails:
+                self.result.add_error(row['line_no'], f'Email already registered: {row["email"]}')
+            else:
+                valid.append(row)
+        return valid
+
+    # ---------- Writing ----------
+
+    def _process_batch(self, batch, hasher, performed_by=None):
+        rows = self._validate_batch(batch)
+        if not rows or self.dry_run:
+            self.result.users += len(rows)
+            self.result.memberships += sum(1 for row in rows if row['plan'])
+            self.result.payments += sum(1 for row in rows if row['payment_method'])
+            return
+
+        # Hash outside the transaction so the write lock is held briefly
+        to_hash = [row for row in rows if row['password']]
+        hashes = hasher.hash_many([row['password'] for row in to_hash])
+        for row, encoded in zip(to_hash, hashes):
+            row['password'] = encoded
+        unusable = make_password(None)
+
+        for row in rows:
+            if row['plan']:
+                row['end_date'] = row['start_date'] + timedelta(days=row['plan'].duration_days)
+
+        with transaction.atomic():
+            # Members arriving with a current membership get a kiosk PIN straight away
+            needs_pin = [row for row in rows if row['plan'] and row['end_date'] >= self.today]
+            for row, pin in zip(needs_pin, User.allocate_kiosk_pins(len(needs_pin))):
+                row['kiosk_pin'] = pin
+
+            users = User.objects.bulk_create([
+                User(
+                    username=row['username'],
+                    email=row['email'],
+                    password=row['password'] or unusable,
+                    first_name=row['first_name'],
+                    last_name=row['last_name'],
+                    mobile_no=row['mobile_no'],
+                    address=row['address'],
+                    birthdate=row['birthdate'],
+                    age=User.calculate_age(row['birthdate'], self.today) if row['birthdate'] else None,
+                    kiosk_pin=row.get('kiosk_pin'),
+                    role='member',
+                )
+                for row in rows
+            ])
+
+            with_plan = [(row, user) for row, user in zip(rows, users) if row['plan']]
+            memberships = UserMembership.objects.bulk_create([
+                # Mirrors UserMembership.save, which bulk_create skips
+                UserMembership(
+                    user=user,
+                    plan=row['plan'],
+                    start_date=row['start_date'],
+                    end_date=row['end_date'],
+                    status='expired' if row['end_date'] < self.today else 'active',
+                )
+                for row, user in with_plan
+            ])
+            # bulk_create sends no signals either
+            MembershipCoverage.rebuild(
+                [membership.user_id for membership in memberships if membership.status == 'active'], self.today,
+            )
+
+            paid_at = timezone.now()
+            payments = Payment.objects.bulk_create([
+                Payment(
+                    user=user,
+                    membership=membership,
+                    amount=row['amount'],
+                    method=row['payment_method'],
+                    reference_no=row['reference_no'],
+                    notes='Imported from CSV',
+                    payment_date=paid_at,
+                    # Mirrors Payment.save, which bulk_create skips
+                    business_date=timezone.localdate(paid_at),
+                )
+                for (row, user), membership in zip(with_plan, memberships)
+                if row['payment_method']
+            ])
+            ledger.record(payments, staff=performed_by)
+
+        self.result.users += len(users)
+        self.result.memberships += len(memberships)
+        self.result.payments += len(payments)
+        self.result.pins += len(needs_pin)
+
+
+def import_members_csv(stream, batch_size=DEFAULT_BATCH_SIZE, hash_workers=None,
+                       dry_run=False, performed_by=None, request=None):
+    """Convenience wrapper around ``MemberImporter`` used by the command and admin"""
+    importer = MemberImporter(batch_size=batch_size, hash_workers=hash_workers, dry_run=dry_run)
+    return importer.run(stream, performed_by=performed_by, request=request)
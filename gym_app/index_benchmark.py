@@ -0,0 +1,178 @@
+"""
+Index benchmark: the membership and payment lookups with and without their indexes.
+
+Seeds a throwaway test database with ``generate_load_data``, refreshes the
+planner statistics, then times each lookup in ``QUERIES`` twice: with the
+indexes declared in the models' ``Meta.indexes`` and with those indexes
+dropped. The query plans of both runs go in the report, so it shows which
+index a lookup actually uses as well as how much faster it got.
+
+The lookups have the same shape as the ones in the views, ``expire_memberships``,
+``UserMembership.roll_over``, ``MembershipCoverage.rebuild`` and
+``Analytics.generate_daily_report``.
+
+Used by the ``benchmark_indexes`` management command.
+"""
+
+import platform
+import statistics
+import time
+from datetime import timedelta
+
+import django
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from .benchmarks import SCALES, seed
+from .models import UserMembership, Payment, WalkInPayment
+
+
+# Models whose Meta.indexes are dropped for the "without" run
+INDEXED_MODELS = [UserMembership, Payment, WalkInPayment]
+
+
+def _count(queryset):
+    return queryset.count()
+
+
+# name -> (function(today) building the queryset, how it is evaluated)
+QUERIES = {
+    'expire_due': (lambda today: UserMembership.objects.filter(
+        status__in=['active', 'scheduled'], end_date__lt=today), _count),
+    'coverage_rebuild': (lambda today: UserMembership.objects.filter(
+        status__in=['active', 'scheduled'], end_date__gte=today
+    ).order_by('user_id', 'start_date', 'id').values_list(
+        'user_id', 'id', 'start_date', 'end_date', 'status'), list),
+    'expiring_soon': (lambda today: UserMembership.objects.filter(
+        status='active', end_date__range=[today, today + timedelta(days=7)]
+    ).values_list('id', flat=True), list),
+    'daily_active_members': (lambda today: UserMembership.objects.filter(
+        status='active', start_date__lte=today, end_date__gte=today), _count),
+    'renewals_due': (lambda today: UserMembership.objects.filter(
+        status='scheduled', start_date__lte=today).values_list('id', 'user_id'), list),
+    'recent_payments': (lambda today: Payment.objects.order_by('-payment_date')[:10], list),
+    'recent_walkins': (lambda today: WalkInPayment.objects.order_by('-payment_date')[:10], list),
+}
+
+
+def declared_indexes():
+    """(model, index) for every index in the models' Meta.indexes"""
+    return [(model, index) for model in INDEXED_MODELS for index in model._meta.indexes]
+
+
+def drop_indexes(indexes):
+    with connection.schema_editor() as editor:
+        for model, index in indexes:
+            editor.remove_index(model, index)
+
+
+def create_indexes(indexes):
+    with connection.schema_editor() as editor:
+        for model, index in indexes:
+            editor.add_index(model, index)
+
+
+def analyze():
+    """Refresh the planner statistics (SQLite and PostgreSQL both have ANALYZE)"""
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+def time_queries(today, queries=None, repeat=20):
+    """Median and min wall time (ms) plus the query plan of each lookup"""
+    results = {}
+    for name in queries or list(QUERIES):
+        build, evaluate = QUERIES[name]
+        evaluate(build(today))  # warm the page cache
+        wall_ms = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            evaluate(build(today))
+            wall_ms.append((time.perf_counter() - started) * 1000)
+        results[name] = {
+            'wall_ms_median': round(statistics.median(wall_ms), 3),
+            'wall_ms_min': round(min(wall_ms), 3),
+            # count() drops the model's default ordering, so the plan does too
+            'plan': (build(today) if evaluate is list
+                     else build(today).order_by()).explain(),
+        }
+    return results
+
+
+def compare(today, queries=None, repeat=20):
+    """
+    Time every lookup with the declared indexes, then without them.
+
+    The indexes are recreated afterwards, even when a lookup fails.
+    """
+    indexes = declared_indexes()
+    with_indexes = time_queries(today, queries, repeat)
+    drop_indexes(indexes)
+    try:
+        analyze()
+        without_indexes = time_queries(today, queries, repeat)
+    finally:
+        create_indexes(indexes)
+        analyze()
+
+    index_names = [index.name for model, index in indexes]
+    results = {}
+    for name, indexed in with_indexes.items():
+        plain = without_indexes[name]
+        results[name] = {
+            'with_ms': indexed['wall_ms_median'],
+            'without_ms': plain['wall_ms_median'],
+            'speedup': round(plain['wall_ms_median'] / indexed['wall_ms_median'], 2)
+            if indexed['wall_ms_median'] else None,
+            'uses': [index for index in index_names if index in indexed['plan']],
+            'plan_with': indexed['plan'],
+            'plan_without': plain['plan'],
+        }
+    return results
+
+
+def run_index_benchmark(scale='large', queries=None, repeat=20, seed_value=42, stdout=None, log=None):
+    """
+    Seed a fresh test database at ``scale`` and compare every lookup with
+    and without the indexes.
+
+    The configured database is never touched: a test database is created
+    for the run and destroyed afterwards.
+    """
+    members = SCALES[scale] if scale in SCALES else int(scale)
+    report = {
+        'meta': {
+            'generated_at': timezone.now().isoformat(),
+            'django': django.get_version(),
+            'python': platform.python_version(),
+            'database': connection.vendor,
+            'scale': str(scale),
+            'members': members,
+            'repeat': repeat,
+            'seed': seed_value,
+            'indexes': [f'{model._meta.db_table}.{index.name} ({", ".join(index.fields)})'
+                        for model, index in declared_indexes()],
+        },
+        'results': {},
+    }
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        if log:
+            log(f'🌱 Seeding scale "{scale}" ({members:,} members)...')
+        started = time.perf_counter()
+        seed(members, seed_value, stdout=stdout)
+        analyze()
+        report['meta']['seed_seconds'] = round(time.perf_counter() - started, 2)
+        report['meta']['rows'] = {
+            model._meta.db_table: model.objects.count() for model in INDEXED_MODELS
+        }
+
+        report['results'] = compare(timezone.localdate(), queries, repeat)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+    return report
@@ -0,0 +1,174 @@
+"""
+Revenue ledger.
+
+Every sale, whether a membership payment (``subscriptions.subscribe``, the CSV
+importer), a walk-in pass (``views.walkin_confirm``) or a group sale
+(``walkins.sell_batch``), calls ``record`` inside its own transaction. That
+appends one ``RevenueEntry`` per sale and adds it to the matching
+``RevenueDailySummary`` row (business day, payment method, source, and
+plan or pass).
+Dashboards, ``reports_view`` and ``Analytics`` then read a range of summary
+rows instead of summing ``Payment`` and ``WalkInPayment`` separately.
+
+Ledger lines are never updated or deleted. When a sale is edited in the
+admin, ``correct`` appends reversal lines and re-records it; a deleted sale,
+including one deleted with its member, membership or group sale, is
+reversed from a ``pre_delete`` receiver (see ``signals.py``). Either way the
+summaries stay equal to the sum of the ledger.
+
+``rebuild`` recreates the ledger from the sale tables in bulk. It is used
+by ``generate_load_data``, and can repair a ledger that drifted, though it
+drops the history of reversals.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+
+from .models import Payment, WalkInPayment, RevenueEntry, RevenueDailySummary
+
+
+SOURCES = {
+    Payment: 'membership',
+    WalkInPayment: 'walk_in',
+}
+
+
+def item_id(sale):
+    """The plan (membership payment) or pass (walk-in sale) that was sold"""
+    return sale.membership.plan_id if isinstance(sale, Payment) else sale.pass_type_id
+
+
+def entry(sale, staff=None):
+    """Unsaved ``sale`` ledger line for a Payment or WalkInPayment"""
+    return RevenueEntry(
+        source=SOURCES[type(sale)],
+        source_id=sale.pk,
+        item_id=item_id(sale),
+        amount=sale.amount,
+        method=sale.method,
+        business_date=sale.business_date,
+        staff=staff,
+    )
+
+
+def record(sales, staff=None):
+    """Add ledger lines for freshly saved ``sales`` (sold by ``staff``, if any)"""
+    post([entry(sale, staff) for sale in sales])
+
+
+def post(entries):
+    """Append ``entries`` and apply them to the daily summaries"""
+    if not entries:
+        return
+    with transaction.atomic(savepoint=False):
+        RevenueEntry.objects.bulk_create(entries)
+        for key, (count, total) in _changes(entries).items():
+            _apply(*key, count, total)
+
+
+def _changes(entries):
+    """(count, total) per (business_date, method, source, item_id) summary row"""
+    changes = defaultdict(lambda: [0, Decimal('0.00')])
+    for line in entries:
+        change = changes[line.business_date, line.method, line.source, line.item_id]
+        change[0] += 1 if line.kind == 'sale' else -1
+        change[1] += line.amount
+    return changes
+
+
+def _apply(business_date, method, source, item_id, count, total):
+    """Add to one summary row, creating it for the first sale of its kind that day"""
+    key = dict(business_date=business_date, method=method, source=source, item_id=item_id)
+    row = RevenueDailySummary.objects.filter(**key)
+    if row.update(count=F('count') + count, total=F('total') + total):
+        return
+    try:
+        with transaction.atomic():
+            RevenueDailySummary.objects.create(**key, count=count, total=total)
+    except IntegrityError:
+        # Another sale created the row first
+        row.update(count=F('count') + count, total=F('total') + total)
+
+
+def reverse(sale, staff=None):
+    """Cancel what the ledger holds for ``sale`` with reversal lines"""
+    source = SOURCES[type(sale)]
+    net = (
+        RevenueEntry.objects.filter(source=source, source_id=sale.pk)
+        .order_by()
+        .values('business_date', 'method', 'item_id')
+        .annotate(
+            count=Sum(Case(When(kind='sale', then=1), default=-1, output_field=IntegerField())),
+            amount=Sum('amount'),
+        )
+    )
+    post([
+        RevenueEntry(
+            source=source,
+            source_id=sale.pk,
+            item_id=row['item_id'],
+            kind='reversal',
+            amount=-row['amount'],
+            method=row['method'],
+            business_date=row['business_date'],
+            staff=staff,
+        )
+        for row in net if row['count'] > 0
+    ])
+
+
+def correct(sale, staff=None):
+    """Re-post an edited sale: reverse its ledger lines, then record it as it is now"""
+    with transaction.atomic():
+        reverse(sale, staff)
+        record([sale], staff)
+
+
+def rebuild(batch_size=2000):
+    """
+    Recreate the ledger and daily summaries from the Payment and WalkInPayment
+    rows. Returns the number of ledger lines written.
+    """
+    summaries = defaultdict(lambda: [0, Decimal('0.00')])
+    written = 0
+    with transaction.atomic():
+        RevenueEntry.objects.all().delete()
+        RevenueDailySummary.objects.all().delete()
+
+        sales = [
+            # Members pay for their own plans; group sales know their seller
+            (Payment.objects.annotate(
+                item=F('membership__plan_id'), staff_id=Value(None, IntegerField()),
+            ), 'membership'),
+            (WalkInPayment.objects.annotate(item=F('pass_type_id'), staff_id=F('batch__sold_by_id')), 'walk_in'),
+        ]
+        for queryset, source in sales:
+            entries = []
+            rows = queryset.order_by('id').values_list(
+                'id', 'item', 'amount', 'method', 'business_date', 'payment_date', 'staff_id'
+            )
+            for sale_id, item, amount, method, business_date, payment_date, staff_id in rows.iterator(
+                chunk_size=batch_size
+            ):
+                entries.append(RevenueEntry(
+                    source=source, source_id=sale_id, item_id=item, amount=amount, method=method,
+                    business_date=business_date, staff_id=staff_id, created_at=payment_date,
+                ))
+                summary = summaries[business_date, method, source, item]
+                summary[0] += 1
+                summary[1] += amount
+                if len(entries) >= batch_size:
+                    written += len(RevenueEntry.objects.bulk_create(entries))
+                    entries = []
+            written += len(RevenueEntry.objects.bulk_create(entries))
+
+        RevenueDailySummary.objects.bulk_create([
+            RevenueDailySummary(
+                business_date=business_date, method=method, source=source, item_id=item, count=count, total=total,
+            )
+            for (business_date, method, source, item), (count, total) in summaries.items()
+        ], batch_size=batch_size)
+    return written
@@ -0,0 +1,65 @@
+import io
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from gym_app.benchmarks import SCALES
+from gym_app.concurrency_benchmark import MODES, run_concurrency_benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare WSGI (a thread per client) with ASGI (a task per client) for many concurrent '
+        'kiosk tablets and dashboard terminals against a freshly seeded test database'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale', default='tiny',
+            help=f'Named scale ({", ".join(SCALES)}) or member count (default: tiny)',
+        )
+        parser.add_argument(
+            '--modes', nargs='+', choices=MODES, default=list(MODES),
+            help='Serving modes to compare (default: all)',
+        )
+        parser.add_argument('--kiosks', type=int, default=20, help='Concurrent kiosk clients (default: 20)')
+        parser.add_argument('--terminals', type=int, default=5, help='Concurrent dashboard terminals (default: 5)')
+        parser.add_argument('--requests', type=int, default=20, help='Requests per client (default: 20)')
+        parser.add_argument('--seed', type=int, default=42, help='Data generator seed (default: 42)')
+        parser.add_argument('--output', type=str, help='Write the JSON report to this file')
+
+    def handle(self, *args, **options):
+        if options['scale'] not in SCALES and not options['scale'].isdigit():
+            raise CommandError(f'Unknown scale "{options["scale"]}"')
+        if options['kiosks'] < 0 or options['terminals'] < 0 or options['kiosks'] + options['terminals'] == 0:
+            raise CommandError('Need at least one kiosk or terminal client')
+
+        self.stdout.write(self.style.SUCCESS('\n⚡ Benchmarking concurrent kiosks and terminals...\n'))
+        report = run_concurrency_benchmark(
+            options['scale'],
+            modes=options['modes'],
+            kiosks=options['kiosks'],
+            terminals=options['terminals'],
+            requests=options['requests'],
+            seed_value=options['seed'],
+            stdout=io.StringIO(),
+            log=self.stdout.write,
+        )
+
+        self.stdout.write('')
+        for mode, result in report['results'].items():
+            self.stdout.write(
+                f'  {mode.upper():<5} {result["throughput_rps"]:>8} req/s  '
+                f'{result["requests"]} requests in {result["seconds"]:.2f} s, {result["errors"]} errors'
+            )
+            for kind, stats in result['kinds'].items():
+                self.stdout.write(
+                    f'        {kind:<9} p50 {stats["p50"]:8.2f} ms   p95 {stats["p95"]:8.2f} ms   '
+                    f'p99 {stats["p99"]:8.2f} ms'
+                )
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'\n📄 Report written to {options["output"]}'))
+
+        self.stdout.write(self.style.SUCCESS('\n✅ Done'))
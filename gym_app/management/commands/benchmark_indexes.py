@@ -0,0 +1,66 @@
+import io
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from gym_app.benchmarks import SCALES
+from gym_app.index_benchmark import QUERIES, run_index_benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Time the membership status/date and payment history lookups with and without their '
+        'composite indexes against a freshly seeded test database'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale', default='large',
+            help=f'Named scale ({", ".join(SCALES)}) or member count (default: large)',
+        )
+        parser.add_argument(
+            '--queries', nargs='+', choices=list(QUERIES), default=None,
+            help='Lookups to time (default: all)',
+        )
+        parser.add_argument('--repeat', type=int, default=20, help='Timed runs per lookup (default: 20)')
+        parser.add_argument('--seed', type=int, default=42, help='Data generator seed (default: 42)')
+        parser.add_argument('--output', type=str, help='Write the JSON report to this file')
+
+    def handle(self, *args, **options):
+        if options['scale'] not in SCALES and not options['scale'].isdigit():
+            raise CommandError(f'Unknown scale "{options["scale"]}"')
+        if options['repeat'] < 1:
+            raise CommandError('--repeat must be at least 1')
+
+        self.stdout.write(self.style.SUCCESS('\n🗂️  Benchmarking membership and payment indexes...\n'))
+        report = run_index_benchmark(
+            options['scale'],
+            queries=options['queries'],
+            repeat=options['repeat'],
+            seed_value=options['seed'],
+            stdout=io.StringIO(),
+            log=self.stdout.write,
+        )
+
+        self.stdout.write('')
+        self.stdout.write(f'  {"lookup":<26} {"with":>10} {"without":>10} {"speedup":>8}  index')
+        unused = []
+        for name, result in report['results'].items():
+            speedup = f'{result["speedup"]}x' if result['speedup'] else '-'
+            self.stdout.write(
+                f'  {name:<26} {result["with_ms"]:>7.3f} ms {result["without_ms"]:>7.3f} ms '
+                f'{speedup:>8}  {", ".join(result["uses"]) or "-"}'
+            )
+            if not result['uses']:
+                unused.append(name)
+
+        if unused:
+            self.stdout.write(self.style.WARNING(
+                f'\n⚠️  No declared index in the plan of: {", ".join(unused)}'
+            ))
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'\n📄 Report written to {options["output"]}'))
+
+        self.stdout.write(self.style.SUCCESS('\n✅ Done'))
@@ -0,0 +1,54 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from gym_app.startup_benchmark import PROFILES, DEFAULT_PATHS, run_profile
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure process startup, template warm-up and first-request latency for each '
+        'settings profile in fresh processes'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--profiles', nargs='+', choices=list(PROFILES), default=list(PROFILES),
+            help='Settings profiles to compare (default: all)',
+        )
+        parser.add_argument(
+            '--paths', nargs='+', default=DEFAULT_PATHS,
+            help=f'Pages to request (default: {" ".join(DEFAULT_PATHS)})',
+        )
+        parser.add_argument('--runs', type=int, default=5, help='Fresh processes per profile (default: 5)')
+        parser.add_argument('--repeat', type=int, default=20, help='Requests per page after the first (default: 20)')
+        parser.add_argument('--output', type=str, help='Write the JSON report to this file')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('\n🚀 Benchmarking startup and first requests...\n'))
+
+        report = {}
+        for name in options['profiles']:
+            env = ' '.join(f'{key}={value}' for key, value in PROFILES[name][1].items())
+            self.stdout.write(f'  {name} ({env}) x{options["runs"]}...')
+            result = report[name] = run_profile(
+                name, options['paths'], repeat=options['repeat'], runs=options['runs'],
+                base_dir=settings.BASE_DIR,
+            )
+            self.stdout.write('    ' + ', '.join(f'{key}={value}' for key, value in result['profile'].items()))
+            self.stdout.write(
+                f'    process {result["process_ms"]:.0f} ms, setup {result["setup_ms"]:.0f} ms, '
+                f'warm-up {result["warmup_ms"]:.0f} ms ({result["templates_warmed"]} templates)'
+            )
+            for path, page in result['pages'].items():
+                self.stdout.write(
+                    f'    {path:<24} {page["status"]:<16} first {page["first_ms"]:7.2f} ms   '
+                    f'steady {page["steady_ms"]:6.2f} ms'
+                )
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'\n📄 Report written to {options["output"]}'))
+
+        self.stdout.write(self.style.SUCCESS('\n✅ Done'))
@@ -0,0 +1,64 @@
+import io
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from gym_app.benchmarks import SCALES, SCENARIOS, run_benchmarks, compare_reports
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the hot views (kiosk, dashboards, member search, reports, audit trail, '
+        'attendance) against freshly seeded test databases and compare with a baseline'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scales', nargs='+', default=['tiny', 'small'],
+            help=f'Named scales ({", ".join(SCALES)}) or member counts (default: tiny small)',
+        )
+        parser.add_argument(
+            '--scenarios', nargs='+', choices=list(SCENARIOS), default=None,
+            help='Only run these scenarios (default: all)',
+        )
+        parser.add_argument('--repeat', type=int, default=5, help='Timed calls per scenario (default: 5)')
+        parser.add_argument('--seed', type=int, default=42, help='Data generator seed (default: 42)')
+        parser.add_argument('--output', type=str, help='Write the JSON report to this file')
+        parser.add_argument('--baseline', type=str, help='Compare against a stored JSON report')
+        parser.add_argument(
+            '--tolerance', type=float, default=0.25,
+            help='Allowed relative wall-time increase over the baseline (default: 0.25)',
+        )
+
+    def handle(self, *args, **options):
+        for scale in options['scales']:
+            if scale not in SCALES and not scale.isdigit():
+                raise CommandError(f'Unknown scale "{scale}"')
+
+        self.stdout.write(self.style.SUCCESS('\n⏱️  Benchmarking views...\n'))
+        report = run_benchmarks(
+            options['scales'],
+            scenarios=options['scenarios'],
+            repeat=options['repeat'],
+            seed_value=options['seed'],
+            stdout=io.StringIO(),
+            log=self.stdout.write,
+        )
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'\n📄 Report written to {options["output"]}'))
+
+        if options['baseline']:
+            try:
+                with open(options['baseline']) as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f'Could not read baseline: {e}')
+
+            regressions = compare_reports(report, baseline, tolerance=options['tolerance'])
+            if regressions:
+                for message in regressions:
+                    self.stdout.write(self.style.ERROR(f'✗ {message}'))
+                raise CommandError(f'{len(regressions)} regression(s) against {options["baseline"]}')
+            self.stdout.write(self.style.SUCCESS('\n✅ No regressions against the baseline'))
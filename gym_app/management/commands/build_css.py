@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from gym_app.assets import CSS_BUNDLES, bundle_path, build_bundles
+
+
+class Command(BaseCommand):
+    help = 'Concatenate and minify the per-page CSS bundles (run before collectstatic)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'bundles', nargs='*',
+            help='Only build these bundles (default: all)',
+        )
+
+    def handle(self, *args, **options):
+        names = options['bundles'] or None
+        unknown = [name for name in names or [] if name not in CSS_BUNDLES]
+        if unknown:
+            raise CommandError(f'Unknown bundle(s): {", ".join(unknown)}')
+
+        self.stdout.write(self.style.SUCCESS(f'\n🎨 Building CSS bundles into {settings.CSS_BUNDLE_ROOT}...\n'))
+        try:
+            results = build_bundles(names)
+        except FileNotFoundError as e:
+            raise CommandError(str(e))
+
+        total_in = total_out = 0
+        for name, size_in, size_out in results:
+            total_in += size_in
+            total_out += size_out
+            self.stdout.write(f'  {bundle_path(name):<40} {size_in / 1024:6.1f} KB -> {size_out / 1024:6.1f} KB')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\n✅ {len(results)} bundles, {total_in / 1024:.1f} KB -> {total_out / 1024:.1f} KB. '
+            f'Run collectstatic to hash and compress them.'
+        ))
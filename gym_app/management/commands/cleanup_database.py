@@ -4,7 +4,8 @@ from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
 from gym_app.models import (
     MembershipPlan, FlexibleAccess, UserMembership, 
-    Payment, WalkInPayment, Analytics, AuditLog, Attendance
+    Payment, WalkInBatch, WalkInPayment, Analytics, AuditLog, Attendance, Task,
+    RevenueEntry, RevenueDailySummary, CohortRetention
 )
 
 User = get_user_model()
@@ -32,6 +33,7 @@ class Command(BaseCommand):
                     '  - All attendance records\n'
                     '  - All analytics data\n'
                     '  - All audit logs\n'
+                    '  - All queued background tasks\n'
                     '  - All membership plans and walk-in passes\n\n'
                     'To proceed, run: python manage.py cleanup_database --confirm\n'
                 )
@@ -44,8 +46,11 @@ class Command(BaseCommand):
         stats = {
             'Attendance': Attendance.objects.count(),
             'Audit Logs': AuditLog.objects.count(),
+            'Background Tasks': Task.objects.count(),
             'Analytics': Analytics.objects.count(),
+            'Revenue Ledger Entries': RevenueEntry.objects.count(),
             'Walk-in Payments': WalkInPayment.objects.count(),
+            'Walk-in Batches': WalkInBatch.objects.count(),
             'Member Payments': Payment.objects.count(),
             'User Memberships': UserMembership.objects.count(),
             'Walk-in Passes': FlexibleAccess.objects.count(),
@@ -67,31 +72,39 @@ class Command(BaseCommand):
         AuditLog.objects.all().delete()
         self.stdout.write(self.style.SUCCESS('✓ Deleted all audit logs'))
 
-        # 3. Delete analytics
+        # 3. Delete background tasks
+        Task.objects.all().delete()
+        self.stdout.write(self.style.SUCCESS('✓ Deleted all background tasks'))
+
+        # 4. Delete analytics and the revenue ledger
         Analytics.objects.all().delete()
-        self.stdout.write(self.style.SUCCESS('✓ Deleted all analytics'))
+        RevenueEntry.objects.all().delete()
+        RevenueDailySummary.objects.all().delete()
+        CohortRetention.objects.all().delete()
+        self.stdout.write(self.style.SUCCESS('✓ Deleted all analytics and revenue ledger entries'))
 
-        # 4. Delete walk-in payments
+        # 5. Delete walk-in payments and group sales
         WalkInPayment.objects.all().delete()
+        WalkInBatch.objects.all().delete()
         self.stdout.write(self.style.SUCCESS('✓ Deleted all walk-in payments'))
 
-        # 5. Delete member payments
+        # 6. Delete member payments
         Payment.objects.all().delete()
         self.stdout.write(self.style.SUCCESS('✓ Deleted all member payments'))
 
-        # 6. Delete user memberships
+        # 7. Delete user memberships
         UserMembership.objects.all().delete()
         self.stdout.write(self.style.SUCCESS('✓ Deleted all user memberships'))
 
-        # 7. Delete walk-in passes
+        # 8. Delete walk-in passes
         FlexibleAccess.objects.all().delete()
         self.stdout.write(self.style.SUCCESS('✓ Deleted all walk-in passes'))
 
-        # 8. Delete membership plans
+        # 9. Delete membership plans
         MembershipPlan.objects.all().delete()
         self.stdout.write(self.style.SUCCESS('✓ Deleted all membership plans'))
 
-        # 9. Delete non-superuser accounts
+        # 10. Delete non-superuser accounts
         non_superusers = User.objects.filter(is_superuser=False)
         deleted_count = non_superusers.count()
         non_superusers.delete()
@@ -2,23 +2,31 @@ from django.core.management.base import BaseCommand
 from django.utils import timezone
 from datetime import date
 from gym_app.models import UserMembership, Analytics
+from gym_app import cohorts
 
 
 class Command(BaseCommand):
-    help = 'Expire memberships that have passed their end date and generate daily analytics'
+    help = 'Expire memberships that have passed their end date, start due renewals and generate daily analytics'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild-cohorts',
+            action='store_true',
+            help='Recompute every retention cohort instead of only the ones that changed',
+        )
 
     def handle(self, *args, **kwargs):
         today = date.today()
         
-        # Find and expire old memberships
-        expired_count = UserMembership.objects.filter(
-            status='active',
-            end_date__lt=today
-        ).update(status='expired')
+        # Expire old memberships and activate the renewals queued behind them
+        expired_count, started_count = UserMembership.roll_over(today)
         
         self.stdout.write(
             self.style.SUCCESS(f'Successfully expired {expired_count} memberships')
         )
+        self.stdout.write(
+            self.style.SUCCESS(f'Started {started_count} queued renewals')
+        )
         
         # Generate daily analytics
         try:
@@ -33,4 +41,10 @@ class Command(BaseCommand):
         except Exception as e:
             self.stdout.write(
                 self.style.ERROR(f'Error generating analytics: {str(e)}')
-            )
\ No newline at end of file
+            )
+
+        # Refresh the retention cohorts (after the roll-over, so they see today's statuses)
+        refreshed = cohorts.refresh(today, full=kwargs['rebuild_cohorts'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Refreshed {refreshed} retention cohorts')
+        )
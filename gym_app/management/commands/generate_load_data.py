@@ -0,0 +1,335 @@
+import random
+import time as timer
+from bisect import bisect
+from datetime import datetime, time, timedelta
+from itertools import accumulate
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from gym_app import ledger
+from gym_app.hashing import hash_passwords
+from gym_app.models import (
+    User, MembershipPlan, FlexibleAccess, UserMembership, MembershipCoverage,
+    Payment, WalkInPayment, AuditLog, Attendance
+)
+
+
+FIRST_NAMES = [
+    'Juan', 'Maria', 'Jose', 'Ana', 'Mark', 'Angelica', 'John', 'Kristine', 'Paolo', 'Camille',
+    'Miguel', 'Patricia', 'Carlo', 'Nicole', 'Rafael', 'Andrea', 'Joshua', 'Bea', 'Gabriel', 'Joy',
+    'Christian', 'Princess', 'Daniel', 'Erika', 'Kevin', 'Jasmine', 'Ramon', 'Liza', 'Paul', 'Grace',
+]
+
+LAST_NAMES = [
+    'Santos', 'Reyes', 'Cruz', 'Bautista', 'Ocampo', 'Garcia', 'Mendoza', 'Torres', 'Tomas', 'Andrada',
+    'Castillo', 'Flores', 'Villanueva', 'Ramos', 'Castro', 'Rivera', 'Aquino', 'Navarro', 'Salazar', 'Mercado',
+    'Aguilar', 'Dela Cruz', 'Pascual', 'Gonzales', 'Lopez', 'Domingo', 'Soriano', 'Valdez', 'Del Rosario', 'Manalo',
+]
+
+# Relative gym traffic per hour of day (early-morning and after-work peaks)
+HOUR_WEIGHTS = {
+    5: 3, 6: 9, 7: 11, 8: 7, 9: 4, 10: 3, 11: 3, 12: 4, 13: 3,
+    14: 3, 15: 4, 16: 6, 17: 10, 18: 13, 19: 11, 20: 6, 21: 3, 22: 1,
+}
+
+# Relative member visit likelihood per weekday (Monday first)
+WEEKDAY_FACTORS = [1.15, 1.05, 1.0, 1.0, 0.9, 0.75, 0.5]
+
+# Walk-in traffic is heavier on weekends
+WALKIN_WEEKDAY_FACTORS = [0.8, 0.8, 0.8, 0.9, 1.1, 1.5, 1.4]
+
+# Payment method mix
+METHOD_WEIGHTS = {'cash': 60, 'gcash': 32, 'card': 8}
+
+# Mix of generated audit actions
+AUDIT_ACTION_WEIGHTS = {
+    'login': 30, 'logout': 20, 'user_updated': 25, 'payment_received': 8,
+    'membership_created': 6, 'walkin_sale': 6, 'login_failed': 4, 'permission_denied': 1,
+}
+
+
+class WeightedChoice:
+    """Fast repeated weighted sampling from a fixed distribution"""
+
+    def __init__(self, weights):
+        self.values = list(weights)
+        self.cum_weights = list(accumulate(weights.values()))
+        self.total = self.cum_weights[-1]
+
+    def pick(self, rng):
+        return self.values[bisect(self.cum_weights, rng.random() * self.total)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate a large, realistic synthetic dataset for load testing and benchmarks. '
+        'Roughly 20,000 members over 365 days produces about one million rows.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--members', type=int, default=1000, help='Members to create (default: 1000)')
+        parser.add_argument('--staff', type=int, default=3, help='Staff accounts to create (default: 3)')
+        parser.add_argument('--days', type=int, default=365, help='Days of history to generate (default: 365)')
+        parser.add_argument('--walkins-per-day', type=float, default=25,
+                            help='Average walk-in passes sold per day (default: 25)')
+        parser.add_argument('--visits-per-week', type=float, default=2.5,
+                            help='Average visits per week for a member with an active plan (default: 2.5)')
+        parser.add_argument('--renewal-rate', type=float, default=0.65,
+                            help='Probability that a membership is renewed (default: 0.65)')
+        parser.add_argument('--audit-logs', type=int, default=None,
+                            help='Audit log rows to generate (default: 5 per member)')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for reproducible data (default: 42)')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk insert (default: 5000)')
+        parser.add_argument('--prefix', type=str, default='load',
+                            help='Username prefix for generated accounts (default: load)')
+        parser.add_argument('--password', type=str, default='member123',
+                            help='Password shared by all generated accounts (default: member123)')
+
+    def handle(self, *args, **options):
+        if options['members'] < 0 or options['days'] < 1 or options['batch_size'] < 1:
+            raise CommandError('--members must be >= 0, --days and --batch-size must be >= 1')
+
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.tz = timezone.get_current_timezone()
+        self.now = timezone.localtime()
+        self.today = self.now.date()
+        self.window_start = self.today - timedelta(days=options['days'])
+        self.hours = WeightedChoice(HOUR_WEIGHTS)
+        self.methods = WeightedChoice(METHOD_WEIGHTS)
+        self.counts = {}
+
+        started = timer.perf_counter()
+        self.stdout.write(self.style.SUCCESS(f'\n🏋️  Generating load-test data (seed {options["seed"]})...\n'))
+
+        if not MembershipPlan.objects.exists() or not FlexibleAccess.objects.exists():
+            call_command('create_sample_data', stdout=self.stdout)
+        self.plans = WeightedChoice(self._plan_weights())
+        self.passes = WeightedChoice(self._pass_weights())
+
+        # Every generated account shares one password, so hash it once
+        self.password_hash = hash_passwords([options['password']], workers=0)[0]
+
+        staff = self._create_staff(options['prefix'], options['staff'])
+        members = self._create_members(options)
+        self._create_walkins(options['walkins_per_day'])
+        # The sales above were bulk-created, so post their ledger lines in bulk too
+        self.stdout.write('   … revenue ledger')
+        self._count('Revenue ledger entries', ledger.rebuild(self.batch_size))
+        audit_logs = options['audit_logs']
+        self._create_audit_logs(
+            members + staff,
+            audit_logs if audit_logs is not None else options['members'] * 5,
+        )
+
+        elapsed = timer.perf_counter() - started
+        total = sum(self.counts.values())
+        self.stdout.write(self.style.SUCCESS(f'\n✅ Generated {total:,} rows in {elapsed:.1f}s'))
+        for label, count in self.counts.items():
+            self.stdout.write(f'   {label}: {count:,}')
+
+    # ---------- Helpers ----------
+
+    def _plan_weights(self):
+        # Monthly plans sell best, long plans least
+        plans = list(MembershipPlan.objects.filter(is_active=True)) or list(MembershipPlan.objects.all())
+        return {plan: 1.0 / max(plan.duration_days, 7) ** 0.5 * (3 if plan.duration_days == 30 else 1)
+                for plan in plans}
+
+    def _pass_weights(self):
+        passes = list(FlexibleAccess.objects.filter(is_active=True)) or list(FlexibleAccess.objects.all())
+        return {pass_type: 1.0 / pass_type.duration_days for pass_type in passes}
+
+    def _at(self, day, hour=None):
+        """Aware datetime on ``day`` at a peak-weighted (or given) hour"""
+        if hour is None:
+            hour = self.hours.pick(self.rng)
+        return datetime.combine(day, time(hour, self.rng.randrange(60), self.rng.randrange(60)), tzinfo=self.tz)
+
+    def _random_day(self):
+        return self.window_start + timedelta(days=self.rng.randrange((self.today - self.window_start).days + 1))
+
+    def _count(self, label, amount):
+        self.counts[label] = self.counts.get(label, 0) + amount
+
+    def _bulk(self, model, objects, label):
+        model.objects.bulk_create(objects, batch_size=self.batch_size)
+        self._count(label, len(objects))
+        return objects
+
+    def _person(self):
+        first = self.rng.choice(FIRST_NAMES)
+        last = self.rng.choice(LAST_NAMES)
+        mobile = f'09{self.rng.randrange(10 ** 9):09d}'
+        return first, last, mobile
+
+    def _next_index(self, prefix):
+        return User.objects.filter(username__startswith=f'{prefix}_').count()
+
+    # ---------- Generators ----------
+
+    def _create_staff(self, prefix, count):
+        start = self._next_index(f'{prefix}_staff')
+        staff = []
+        for i in range(start, start + count):
+            first, last, mobile = self._person()
+            staff.append(User(
+                username=f'{prefix}_staff_{i:04d}', email=f'{prefix}_staff_{i:04d}@example.com',
+                password=self.password_hash, first_name=first, last_name=last, mobile_no=mobile,
+                role='staff', is_staff=True,
+            ))
+        return self._bulk(User, staff, 'Staff')
+
+    def _create_members(self, options):
+        prefix = f'{options["prefix"]}_member'
+        start = self._next_index(prefix)
+        visit_rate = options['visits_per_week'] / 7
+        created = []
+
+        # Work in chunks so memberships can reference freshly inserted user ids
+        chunk = max(1, self.batch_size // 10)
+        for chunk_start in range(start, start + options['members'], chunk):
+            chunk_end = min(chunk_start + chunk, start + options['members'])
+            with transaction.atomic():
+                users, histories = [], []
+                for i in range(chunk_start, chunk_end):
+                    first, last, mobile = self._person()
+                    birthdate = self.today - timedelta(days=self.rng.randint(16 * 365, 65 * 365))
+                    joined = self._random_day()
+                    history = self._membership_history(joined, options['renewal_rate'])
+                    users.append(User(
+                        username=f'{prefix}_{i:07d}', email=f'{prefix}_{i:07d}@example.com',
+                        password=self.password_hash, first_name=first, last_name=last, mobile_no=mobile,
+                        birthdate=birthdate, age=User.calculate_age(birthdate, self.today),
+                        date_joined=self._at(joined), role='member',
+                    ))
+                    histories.append(history)
+
+                # Members with a current plan get a kiosk PIN, as after subscribing
+                current = [user for user, history in zip(users, histories)
+                           if history and history[-1][2] == 'active']
+                for user, pin in zip(current, User.allocate_kiosk_pins(len(current), rng=self.rng)):
+                    user.kiosk_pin = pin
+                self._bulk(User, users, 'Members')
+
+                memberships = []
+                for user, history in zip(users, histories):
+                    for plan, start_date, status, end_date in history:
+                        memberships.append(UserMembership(
+                            user=user, plan=plan, start_date=start_date, end_date=end_date, status=status,
+                        ))
+                self._bulk(UserMembership, memberships, 'Memberships')
+                MembershipCoverage.rebuild(
+                    [m.user_id for m in memberships if m.status == 'active'], self.today,
+                )
+
+                self._bulk(Payment, [
+                    # business_date mirrors Payment.save, which bulk_create skips
+                    Payment(
+                        user=membership.user, membership=membership, amount=membership.plan.price,
+                        method=self.methods.pick(self.rng), payment_date=self._at(membership.start_date),
+                        business_date=membership.start_date,
+                    )
+                    for membership in memberships
+                ], 'Payments')
+
+                self._create_attendance(memberships, visit_rate)
+            created.extend(users)
+            self.stdout.write(f'   … {chunk_end - start:,}/{options["members"]:,} members')
+        return created
+
+    def _membership_history(self, joined, renewal_rate):
+        """Chain of (plan, start, status, end) from the join date up to today"""
+        history = []
+        start_date = joined
+        while True:
+            plan = self.plans.pick(self.rng)
+            end_date = start_date + timedelta(days=plan.duration_days)
+            if end_date >= self.today:
+                status = 'active'
+            else:
+                status = 'cancelled' if self.rng.random() < 0.02 else 'expired'
+            history.append((plan, start_date, status, end_date))
+
+            if status == 'active' or self.rng.random() >= renewal_rate:
+                return history
+            # Most renewals are on time, some come back after a lapse
+            start_date = end_date
+            if self.rng.random() < 0.2:
+                start_date += timedelta(days=self.rng.randint(1, 60))
+            if start_date > self.today:
+                return history
+
+    def _create_attendance(self, memberships, visit_rate):
+        sessions = []
+        for membership in memberships:
+            if membership.status == 'cancelled':
+                continue
+            day = membership.start_date
+            last_day = min(membership.end_date, self.today)
+            while day <= last_day:
+                if self.rng.random() < visit_rate * WEEKDAY_FACTORS[day.weekday()]:
+                    check_in = self._at(day)
+                    if check_in <= self.now:
+                        duration = int(min(max(self.rng.gauss(75, 25), 15), 240))
+                        check_out = check_in + timedelta(minutes=duration)
+                        if check_out > self.now:
+                            # Still working out
+                            check_out, duration = None, None
+                        sessions.append(Attendance(
+                            user=membership.user, check_in=check_in,
+                            check_out=check_out, duration_minutes=duration,
+                        ))
+                day += timedelta(days=1)
+
+            if len(sessions) >= self.batch_size:
+                self._bulk(Attendance, sessions, 'Attendance sessions')
+                sessions = []
+        self._bulk(Attendance, sessions, 'Attendance sessions')
+
+    def _create_walkins(self, per_day):
+        self.stdout.write('   … walk-in sales')
+        sales = []
+        day = self.window_start
+        while day <= self.today:
+            mean = per_day * WALKIN_WEEKDAY_FACTORS[day.weekday()]
+            for _ in range(max(0, round(self.rng.gauss(mean, mean * 0.3)))):
+                sold_at = self._at(day)
+                if sold_at > self.now:
+                    continue
+                pass_type = self.passes.pick(self.rng)
+                first, last, mobile = self._person()
+                sales.append(WalkInPayment(
+                    pass_type=pass_type, customer_name=f'{first} {last}',
+                    mobile_no=mobile if self.rng.random() < 0.6 else None,
+                    amount=pass_type.price, method=self.methods.pick(self.rng), payment_date=sold_at,
+                    business_date=day,
+                ))
+            if len(sales) >= self.batch_size:
+                self._bulk(WalkInPayment, sales, 'Walk-in sales')
+                sales = []
+            day += timedelta(days=1)
+        self._bulk(WalkInPayment, sales, 'Walk-in sales')
+
+    def _create_audit_logs(self, users, count):
+        if not users or count <= 0:
+            return
+        self.stdout.write('   … audit logs')
+        actions = WeightedChoice(AUDIT_ACTION_WEIGHTS)
+        logs = []
+        for _ in range(count):
+            user = self.rng.choice(users)
+            action = actions.pick(self.rng)
+            logs.append(AuditLog(
+                user=user, action=action,
+                severity='warning' if action in ('login_failed', 'permission_denied') else 'info',
+                description=f'Generated {action.replace("_", " ")} event for {user.username}',
+                ip_address=f'192.168.{self.rng.randrange(256)}.{self.rng.randrange(1, 255)}',
+                user_agent='load-generator', timestamp=min(self._at(self._random_day()), self.now),
+            ))
+            if len(logs) >= self.batch_size:
+                self._bulk(AuditLog, logs, 'Audit logs')
+                logs = []
+        self._bulk(AuditLog, logs, 'Audit logs')
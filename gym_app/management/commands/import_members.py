@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+from gym_app.importers import import_members_csv, DEFAULT_BATCH_SIZE, MEMBER_CSV_COLUMNS
+
+
+class Command(BaseCommand):
+    help = 'Bulk import members (with optional memberships and payments) from a CSV file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_path', type=str, help='Path to the CSV file')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f'Rows validated and inserted per transaction (default: {DEFAULT_BATCH_SIZE})',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Password hashing processes (default: one per CPU, 0 hashes in-process)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Validate the file without writing anything',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS(f'\n📥 Importing members from {options["csv_path"]}...\n'))
+        self.stdout.write(f'   Columns: {", ".join(MEMBER_CSV_COLUMNS)}\n')
+
+        try:
+            with open(options['csv_path'], newline='', encoding='utf-8-sig') as csv_file:
+                result = import_members_csv(
+                    csv_file,
+                    batch_size=options['batch_size'],
+                    hash_workers=options['workers'],
+                    dry_run=options['dry_run'],
+                )
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+        except IntegrityError as e:
+            raise CommandError(f'Import stopped by a conflicting record: {e}. Earlier batches were saved.')
+
+        for line_no, message in result.errors:
+            self.stdout.write(self.style.ERROR(f'✗ Line {line_no}: {message}'))
+
+        verb = 'would be imported' if options['dry_run'] else 'imported'
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'\n✅ {result.users} of {result.rows} member(s) {verb}\n'
+                f'   📋 Memberships: {result.memberships}\n'
+                f'   💳 Payments: {result.payments}\n'
+                f'   🔢 Kiosk PINs: {result.pins}\n'
+                f'   ⚠️  Rejected rows: {len(result.errors)}\n'
+            )
+        )
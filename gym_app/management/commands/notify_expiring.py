@@ -0,0 +1,60 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from gym_app.notifications import notify_expiring, get_outbox, DEFAULT_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Remind members whose membership ends soon by e-mail and SMS (run daily)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=None,
+            help='Remind members expiring within this many days (default: EXPIRY_NOTICE_DAYS)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f'Members rendered and sent per batch (default: {DEFAULT_BATCH_SIZE})',
+        )
+        parser.add_argument(
+            '--backend',
+            type=str,
+            default=None,
+            help='Outbox backend class (default: NOTIFICATION_OUTBOX_BACKEND)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Count the reminders without sending or recording them',
+        )
+
+    def handle(self, *args, **options):
+        days = options['days'] if options['days'] is not None else getattr(settings, 'EXPIRY_NOTICE_DAYS', 7)
+        if days < 0 or options['batch_size'] < 1:
+            raise CommandError('--days must be 0 or more and --batch-size at least 1')
+        try:
+            outbox = get_outbox(options['backend'], stream=self.stdout)
+        except ImportError as e:
+            raise CommandError(f'Unknown outbox backend: {e}')
+
+        self.stdout.write(self.style.SUCCESS(f'\n🔔 Reminding members expiring within {days} days...\n'))
+        result = notify_expiring(
+            days=days,
+            outbox=outbox,
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+        )
+
+        verb = 'would be sent' if options['dry_run'] else 'sent'
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'\n✅ {sum(result.sent.values())} reminder(s) {verb} to {result.members} expiring member(s)\n'
+                f'   📧 E-mail: {result.sent["email"]}\n'
+                f'   📱 SMS: {result.sent["sms"]}\n'
+                f'   🔁 Already reminded: {result.already_sent}\n'
+                f'   ⚠️  No e-mail or mobile number: {result.unreachable}\n'
+            )
+        )
@@ -0,0 +1,79 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from gym_app import taskqueue
+import gym_app.tasks  # noqa: F401  (registers the tasks)
+
+
+# Requeue abandoned tasks and purge old ones this often (seconds)
+HOUSEKEEPING_INTERVAL = 3600
+
+
+class Command(BaseCommand):
+    help = 'Run queued background tasks (receipts, audit log entries, PINs, analytics)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Run the tasks that are due, then exit (for cron)',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=2.0,
+            help='Seconds to wait when the queue is empty (default: 2)',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=100,
+            help='Tasks to run before checking the database connection again (default: 100)',
+        )
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        if not options['once']:
+            signal.signal(signal.SIGTERM, self.stop)
+            signal.signal(signal.SIGINT, self.stop)
+            self.stdout.write(self.style.SUCCESS('🏃 Task worker started, waiting for tasks...'))
+
+        total_done = total_failed = 0
+        last_housekeeping = None
+        while not self.stopping:
+            close_old_connections()
+            now = time.monotonic()
+            if last_housekeeping is None or now - last_housekeeping >= HOUSEKEEPING_INTERVAL:
+                self.housekeeping()
+                last_housekeeping = now
+
+            done, failed = taskqueue.run_pending(limit=options['limit'])
+            total_done += done
+            total_failed += failed
+            if options['once']:
+                if done + failed < options['limit']:
+                    break
+                continue
+            if done + failed:
+                self.stdout.write(f'   {done} done, {failed} failed')
+            else:
+                time.sleep(options['sleep'])
+
+        close_old_connections()
+        self.stdout.write(
+            self.style.SUCCESS(f'✅ Ran {total_done + total_failed} tasks: {total_done} done, {total_failed} failed')
+        )
+
+    def housekeeping(self):
+        requeued = taskqueue.requeue_stale()
+        purged = taskqueue.purge_finished()
+        if requeued or purged:
+            self.stdout.write(f'   Requeued {requeued} stale tasks, purged {purged} finished tasks')
+
+    def stop(self, signum, frame):
+        """Finish the current task, then exit"""
+        self.stdout.write(self.style.WARNING('\n⏹️  Stopping after the current task...'))
+        self.stopping = True
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from gym_app.warmup import template_names, warm_templates, warm_urls
+
+
+class Command(BaseCommand):
+    help = 'Compile every project template into the template cache (also a syntax check for all templates)'
+
+    def handle(self, *args, **options):
+        names = template_names()
+        self.stdout.write(self.style.SUCCESS(f'\n🔥 Warming {len(names)} templates...\n'))
+
+        loaded, errors, seconds = warm_templates(names)
+        url_seconds = warm_urls()
+
+        if options['verbosity'] > 1:
+            for name in loaded:
+                self.stdout.write(f'  ✓ {name}')
+        for name, error in errors.items():
+            self.stdout.write(self.style.ERROR(f'  ✗ {name}: {error}'))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\n✅ Compiled {len(loaded)} templates in {seconds * 1000:.0f} ms, '
+            f'URL reverse map built in {url_seconds * 1000:.0f} ms'
+        ))
+        if errors:
+            raise CommandError(f'{len(errors)} template(s) failed to compile')
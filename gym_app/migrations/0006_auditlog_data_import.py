@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gym_app', '0005_user_kiosk_pin'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='auditlog',
+            name='action',
+            field=models.CharField(choices=[('login', 'User Login'), ('logout', 'User Logout'), ('login_failed', 'Login Failed'), ('register', 'User Registration'), ('user_created', 'User Created'), ('user_updated', 'User Updated'), ('user_deleted', 'User Deleted'), ('role_changed', 'Role Changed'), ('membership_created', 'Membership Created'), ('membership_updated', 'Membership Updated'), ('membership_cancelled', 'Membership Cancelled'), ('membership_expired', 'Membership Expired'), ('payment_received', 'Payment Received'), ('walkin_sale', 'Walk-in Sale'), ('payment_refunded', 'Payment Refunded'), ('plan_created', 'Plan Created'), ('plan_updated', 'Plan Updated'), ('plan_deleted', 'Plan Deleted'), ('data_export', 'Data Exported'), ('data_import', 'Data Imported'), ('report_generated', 'Report Generated'), ('settings_changed', 'Settings Changed'), ('unauthorized_access', 'Unauthorized Access Attempt'), ('password_changed', 'Password Changed'), ('permission_denied', 'Permission Denied')], max_length=50),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:34
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gym_app', '0006_auditlog_data_import'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='attendance',
+            name='check_in',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AlterField(
+            model_name='auditlog',
+            name='timestamp',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+    ]
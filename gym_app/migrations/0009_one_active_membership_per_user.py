@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:03
+
+from django.db import migrations, models
+
+
+def expire_duplicate_active_memberships(apps, schema_editor):
+    """Keep only the latest active membership per member before adding the constraint"""
+    UserMembership = apps.get_model('gym_app', 'UserMembership')
+    latest = {}
+    duplicates = []
+    for membership_id, user_id in (UserMembership.objects.filter(status='active')
+                                   .order_by('user_id', '-start_date', '-id')
+                                   .values_list('id', 'user_id')):
+        if user_id in latest:
+            duplicates.append(membership_id)
+        else:
+            latest[user_id] = membership_id
+    UserMembership.objects.filter(id__in=duplicates).update(status='expired')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gym_app', '0008_task'),
+    ]
+
+    operations = [
+        migrations.RunPython(expire_duplicate_active_memberships, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='usermembership',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'active')), fields=('user',), name='one_active_membership_per_user'),
+        ),
+    ]
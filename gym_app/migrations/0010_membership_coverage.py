@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:07
+
+import datetime
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_coverage(apps, schema_editor):
+    """Before renewals existed coverage is just each member's current plan"""
+    UserMembership = apps.get_model('gym_app', 'UserMembership')
+    MembershipCoverage = apps.get_model('gym_app', 'MembershipCoverage')
+    today = datetime.date.today()
+    MembershipCoverage.objects.bulk_create(
+        (
+            MembershipCoverage(
+                user_id=user_id, start_date=start_date, end_date=end_date, membership_id=membership_id,
+            )
+            for membership_id, user_id, start_date, end_date in UserMembership.objects.filter(
+                status='active', end_date__gte=today,
+            ).values_list('id', 'user_id', 'start_date', 'end_date').iterator()
+        ),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gym_app', '0009_one_active_membership_per_user'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='usermembership',
+            name='status',
+            field=models.CharField(choices=[('active', 'Active'), ('scheduled', 'Scheduled'), ('expired', 'Expired'), ('cancelled', 'Cancelled')], default='active', max_length=10),
+        ),
+        migrations.CreateModel(
+            name='MembershipCoverage',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='coverage', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField(db_index=True)),
+                ('queued', models.PositiveSmallIntegerField(default=0)),
+                ('membership', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='gym_app.usermembership')),
+            ],
+            options={
+                'verbose_name': 'Membership Coverage',
+                'verbose_name_plural': 'Membership Coverage',
+                'db_table': 'membership_coverage',
+            },
+        ),
+        migrations.RunPython(backfill_coverage, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:09
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gym_app', '0010_membership_coverage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WalkInBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('label', models.CharField(blank=True, default='', max_length=100)),
+                ('method', models.CharField(choices=[('cash', 'Cash'), ('gcash', 'GCash'), ('card', 'Card')], max_length=10)),
+                ('reference_no', models.CharField(blank=True, max_length=50, null=True)),
+                ('total_amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('pass_count', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('sold_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='walk_in_batches', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Walk-in Batch',
+                'verbose_name_plural': 'Walk-in Batches',
+                'db_table': 'walk_in_batches',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='walkinpayment',
+            name='batch',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='payments', to='gym_app.walkinbatch'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gym_app', '0011_walkin_batch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WalkInPassCode',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=8, unique=True)),
+                ('valid_from', models.DateField()),
+                ('valid_until', models.DateField(db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Walk-in Pass Code',
+                'verbose_name_plural': 'Walk-in Pass Codes',
+                'db_table': 'walk_in_pass_codes',
+            },
+        ),
+        migrations.AddField(
+            model_name='attendance',
+            name='walk_in',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='attendances', to='gym_app.walkinpayment'),
+        ),
+        migrations.AlterField(
+            model_name='attendance',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='attendances', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='attendance',
+            constraint=models.CheckConstraint(condition=models.Q(('user__isnull', False), ('walk_in__isnull', False), _connector='OR'), name='attendance_member_or_walk_in'),
+        ),
+        migrations.AddField(
+            model_name='walkinpasscode',
+            name='payment',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='pass_code', to='gym_app.walkinpayment'),
+        ),
+    ]
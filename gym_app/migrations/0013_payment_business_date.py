@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:20
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_business_date(apps, schema_editor):
+    """Local day of every existing payment (converted in Python, not per-database SQL)"""
+    for model_name in ('Payment', 'WalkInPayment'):
+        model = apps.get_model('gym_app', model_name)
+        batch = []
+        for payment in model.objects.only('id', 'payment_date').iterator(chunk_size=2000):
+            payment.business_date = timezone.localdate(payment.payment_date)
+            batch.append(payment)
+            if len(batch) >= 2000:
+                model.objects.bulk_update(batch, ['business_date'])
+                batch = []
+        model.objects.bulk_update(batch, ['business_date'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gym_app', '0012_walkin_pass_codes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='business_date',
+            field=models.DateField(db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='walkinpayment',
+            name='business_date',
+            field=models.DateField(db_index=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_business_date, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gym_app', '0013_payment_business_date'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['-payment_date'], name='payments_payment_f51455_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usermembership',
+            index=models.Index(fields=['status', 'end_date', 'user', 'start_date'], name='user_member_status_0e21c5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usermembership',
+            index=models.Index(condition=models.Q(('status', 'scheduled')), fields=['start_date'], name='membership_scheduled_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='walkinpayment',
+            index=models.Index(fields=['-payment_date'], name='walk_in_pay_payment_49c58f_idx'),
+        ),
+    ]
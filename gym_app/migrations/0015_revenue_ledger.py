@@ -0,0 +1,91 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:30
+
+import django.db.models.deletion
+import django.utils.timezone
+from collections import defaultdict
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F, IntegerField, Value
+
+
+def backfill_ledger(apps, schema_editor):
+    """One ledger line per existing sale, and the daily summaries of them"""
+    RevenueEntry = apps.get_model('gym_app', 'RevenueEntry')
+    RevenueDailySummary = apps.get_model('gym_app', 'RevenueDailySummary')
+    sales = [
+        (apps.get_model('gym_app', 'Payment').objects.annotate(staff_id=Value(None, IntegerField())), 'membership'),
+        (apps.get_model('gym_app', 'WalkInPayment').objects.annotate(staff_id=F('batch__sold_by_id')), 'walk_in'),
+    ]
+    summaries = defaultdict(lambda: [0, Decimal('0.00')])
+    for queryset, source in sales:
+        entries = []
+        rows = queryset.order_by('id').values_list(
+            'id', 'amount', 'method', 'business_date', 'payment_date', 'staff_id'
+        )
+        for sale_id, amount, method, business_date, payment_date, staff_id in rows.iterator(chunk_size=2000):
+            entries.append(RevenueEntry(
+                source=source, source_id=sale_id, kind='sale', amount=amount, method=method,
+                business_date=business_date, staff_id=staff_id, created_at=payment_date,
+            ))
+            summary = summaries[business_date, method, source]
+            summary[0] += 1
+            summary[1] += amount
+            if len(entries) >= 2000:
+                RevenueEntry.objects.bulk_create(entries)
+                entries = []
+        RevenueEntry.objects.bulk_create(entries)
+    RevenueDailySummary.objects.bulk_create([
+        RevenueDailySummary(business_date=business_date, method=method, source=source, count=count, total=total)
+        for (business_date, method, source), (count, total) in summaries.items()
+    ], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gym_app', '0014_membership_payment_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevenueDailySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('business_date', models.DateField()),
+                ('method', models.CharField(choices=[('cash', 'Cash'), ('gcash', 'GCash'), ('card', 'Card')], max_length=10)),
+                ('source', models.CharField(choices=[('membership', 'Membership Payment'), ('walk_in', 'Walk-in Sale')], max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+            ],
+            options={
+                'verbose_name': 'Revenue Daily Summary',
+                'verbose_name_plural': 'Revenue Daily Summaries',
+                'db_table': 'revenue_daily_summaries',
+                'ordering': ['-business_date', 'source', 'method'],
+                'constraints': [models.UniqueConstraint(fields=('business_date', 'method', 'source'), name='one_revenue_summary_per_day_method_source')],
+            },
+        ),
+        migrations.CreateModel(
+            name='RevenueEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('membership', 'Membership Payment'), ('walk_in', 'Walk-in Sale')], max_length=20)),
+                ('source_id', models.PositiveIntegerField()),
+                ('kind', models.CharField(choices=[('sale', 'Sale'), ('reversal', 'Reversal')], default='sale', max_length=10)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('method', models.CharField(choices=[('cash', 'Cash'), ('gcash', 'GCash'), ('card', 'Card')], max_length=10)),
+                ('business_date', models.DateField(db_index=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('staff', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='revenue_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Revenue Entry',
+                'verbose_name_plural': 'Revenue Entries',
+                'db_table': 'revenue_entries',
+                'ordering': ['-id'],
+                'indexes': [models.Index(fields=['source', 'source_id'], name='revenue_ent_source_f9a13b_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_ledger, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:33
+
+from django.db import migrations, models
+from django.db.models import Case, IntegerField, Sum, When
+
+
+def backfill_items(apps, schema_editor):
+    """Plan/pass of every ledger line, then the summaries regrouped by it"""
+    RevenueEntry = apps.get_model('gym_app', 'RevenueEntry')
+    RevenueDailySummary = apps.get_model('gym_app', 'RevenueDailySummary')
+    items = {
+        'membership': dict(apps.get_model('gym_app', 'Payment').objects.values_list('id', 'membership__plan_id')),
+        'walk_in': dict(apps.get_model('gym_app', 'WalkInPayment').objects.values_list('id', 'pass_type_id')),
+    }
+    batch = []
+    for line in RevenueEntry.objects.only('id', 'source', 'source_id').iterator(chunk_size=2000):
+        line.item_id = items[line.source].get(line.source_id)
+        batch.append(line)
+        if len(batch) >= 2000:
+            RevenueEntry.objects.bulk_update(batch, ['item_id'])
+            batch = []
+    RevenueEntry.objects.bulk_update(batch, ['item_id'])
+
+    # Regrouped from the ledger (not the sale tables) so reversals are kept
+    RevenueDailySummary.objects.all().delete()
+    RevenueDailySummary.objects.bulk_create([
+        RevenueDailySummary(**row)
+        for row in RevenueEntry.objects.order_by().values('business_date', 'method', 'source', 'item_id').annotate(
+            count=Sum(Case(When(kind='sale', then=1), default=-1, output_field=IntegerField())),
+            total=Sum('amount'),
+        )
+    ], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gym_app', '0015_revenue_ledger'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='revenuedailysummary',
+            name='one_revenue_summary_per_day_method_source',
+        ),
+        migrations.AddField(
+            model_name='revenuedailysummary',
+            name='item_id',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='revenueentry',
+            name='item_id',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='revenuedailysummary',
+            constraint=models.UniqueConstraint(fields=('business_date', 'method', 'source', 'item_id'), name='one_revenue_summary_per_day_and_item'),
+        ),
+        migrations.RunPython(backfill_items, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:37
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gym_app', '0016_revenue_cube_items'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CohortRetention',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cohort', models.DateField()),
+                ('offset', models.PositiveSmallIntegerField()),
+                ('members', models.PositiveIntegerField(default=0)),
+                ('retained', models.PositiveIntegerField(default=0)),
+                ('renewed', models.PositiveIntegerField(default=0)),
+                ('churned', models.PositiveIntegerField(default=0)),
+                ('as_of', models.DateField()),
+                ('refreshed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Cohort Retention',
+                'verbose_name_plural': 'Cohort Retention',
+                'db_table': 'cohort_retention',
+                'ordering': ['-cohort', 'offset'],
+                'constraints': [models.UniqueConstraint(fields=('cohort', 'offset'), name='one_retention_point_per_cohort_month')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:44
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gym_app', '0017_cohort_retention'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='auditlog',
+            name='action',
+            field=models.CharField(choices=[('login', 'User Login'), ('logout', 'User Logout'), ('login_failed', 'Login Failed'), ('register', 'User Registration'), ('user_created', 'User Created'), ('user_updated', 'User Updated'), ('user_deleted', 'User Deleted'), ('role_changed', 'Role Changed'), ('membership_created', 'Membership Created'), ('membership_updated', 'Membership Updated'), ('membership_cancelled', 'Membership Cancelled'), ('membership_expired', 'Membership Expired'), ('payment_received', 'Payment Received'), ('walkin_sale', 'Walk-in Sale'), ('payment_refunded', 'Payment Refunded'), ('plan_created', 'Plan Created'), ('plan_updated', 'Plan Updated'), ('plan_deleted', 'Plan Deleted'), ('data_export', 'Data Exported'), ('data_import', 'Data Imported'), ('report_generated', 'Report Generated'), ('reminders_sent', 'Expiry Reminders Sent'), ('settings_changed', 'Settings Changed'), ('unauthorized_access', 'Unauthorized Access Attempt'), ('password_changed', 'Password Changed'), ('permission_denied', 'Permission Denied')], max_length=50),
+        ),
+        migrations.CreateModel(
+            name='ExpiryNotice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('end_date', models.DateField()),
+                ('channel', models.CharField(choices=[('email', 'E-mail'), ('sms', 'SMS')], max_length=10)),
+                ('sent_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='expiry_notices', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Expiry Notice',
+                'verbose_name_plural': 'Expiry Notices',
+                'db_table': 'expiry_notices',
+                'ordering': ['-sent_at'],
+                'constraints': [models.UniqueConstraint(fields=('user', 'end_date', 'channel'), name='one_expiry_notice_per_channel')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gym_app', '0018_expiry_notices'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StaleCohort',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cohort', models.DateField(unique=True)),
+            ],
+            options={
+                'verbose_name': 'Stale Cohort',
+                'verbose_name_plural': 'Stale Cohorts',
+                'db_table': 'stale_cohorts',
+            },
+        ),
+    ]
@@ -1,10 +1,23 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractUser
 from django.utils import timezone
-from datetime import date, timedelta
+from datetime import date, datetime, time, timedelta
 from decimal import Decimal
 
 
+def day_range(first, last=None):
+    """
+    Half-open ``(start, end)`` datetimes of the local days ``first`` to ``last``.
+    
+    Filter with ``field__gte=start, field__lt=end`` instead of ``field__date``,
+    which converts every row to the local time zone and can't use an index.
+    """
+    tz = timezone.get_current_timezone()
+    start = datetime.combine(first, time.min, tzinfo=tz)
+    end = datetime.combine((last or first) + timedelta(days=1), time.min, tzinfo=tz)
+    return start, end
+
+
 class User(AbstractUser):
     """Custom User model with role-based access and demographics"""
     
@@ -58,12 +71,18 @@ class User(AbstractUser):
                     self.birthdate = None
             
             if self.birthdate:
-                today = date.today()
-                self.age = today.year - self.birthdate.year - (
-                    (today.month, today.day) < (self.birthdate.month, self.birthdate.day)
-                )
+                self.age = self.calculate_age(self.birthdate)
         super().save(*args, **kwargs)
     
+    @staticmethod
+    def calculate_age(birthdate, today=None):
+        """Return the age in whole years for a birthdate"""
+        if today is None:
+            today = date.today()
+        return today.year - birthdate.year - (
+            (today.month, today.day) < (birthdate.month, birthdate.day)
+        )
+    
     def __str__(self):
         return f"{self.get_full_name()} ({self.role})"
     
@@ -85,6 +104,25 @@ class User(AbstractUser):
                 self.save()
                 return pin
     
+    @classmethod
+    def allocate_kiosk_pins(cls, count, rng=None):
+        """Reserve ``count`` unused 6-digit kiosk PINs, checking random candidates in batches"""
+        import random
+        rng = rng or random
+        if count > 10 ** 6 - cls.objects.filter(kiosk_pin__isnull=False).count():
+            raise ValueError('Not enough free kiosk PINs left to allocate.')
+        
+        pins = set()
+        while len(pins) < count:
+            candidates = set()
+            while len(candidates) < min(count - len(pins), 500):
+                pin = f'{rng.randint(0, 999999):06d}'
+                if pin not in pins:
+                    candidates.add(pin)
+            taken = set(cls.objects.filter(kiosk_pin__in=candidates).values_list('kiosk_pin', flat=True))
+            pins |= candidates - taken
+        return list(pins)
+    
     # NEW METHOD - Add this method
     def has_kiosk_access(self):
         """Check if user has kiosk access (active membership)"""
@@ -148,6 +186,7 @@ class UserMembership(models.Model):
     
     STATUS_CHOICES = [
         ('active', 'Active'),
+        ('scheduled', 'Scheduled'),
         ('expired', 'Expired'),
         ('cancelled', 'Cancelled'),
     ]
@@ -166,6 +205,23 @@ class UserMembership(models.Model):
         verbose_name = 'User Membership'
         verbose_name_plural = 'User Memberships'
         ordering = ['-start_date']
+        indexes = [
+            # Plans ending before/after a day (expiry, coverage rebuild, expiring
+            # soon, active on a day); user and start_date make it covering
+            models.Index(fields=['status', 'end_date', 'user', 'start_date']),
+            # Queued renewals due to start (roll_over); few rows are scheduled
+            models.Index(
+                fields=['start_date'], condition=models.Q(status='scheduled'),
+                name='membership_scheduled_start_idx',
+            ),
+        ]
+        constraints = [
+            # A member has at most one active plan at a time
+            models.UniqueConstraint(
+                fields=['user'], condition=models.Q(status='active'),
+                name='one_active_membership_per_user',
+            ),
+        ]
     
     def save(self, *args, **kwargs):
         """Auto-calculate end_date based on plan duration"""
@@ -181,6 +237,43 @@ class UserMembership(models.Model):
     def __str__(self):
         return f"{self.user.get_full_name()} - {self.plan.name} ({self.status})"
     
+    @classmethod
+    def roll_over(cls, today=None):
+        """
+        Daily status change: expire plans past their end date and start the
+        queued renewals that are due. Returns (expired, started).
+        
+        Only touches the rows changing today, never the history.
+        """
+        if today is None:
+            today = date.today()
+        
+        with transaction.atomic():
+            ended = set(MembershipCoverage.objects.filter(end_date__lt=today).values_list('user_id', flat=True))
+            expired = cls.objects.filter(
+                status__in=['active', 'scheduled'], end_date__lt=today
+            ).update(status='expired')
+            
+            # Latest due renewal per member (several are due if the job missed days)
+            due = {}
+            for membership_id, user_id in cls.objects.filter(
+                status='scheduled', start_date__lte=today
+            ).order_by('user_id', 'start_date', 'id').values_list('id', 'user_id'):
+                due[user_id] = membership_id
+            
+            if due:
+                # A renewal takes over from the plan it was queued behind on
+                # the day they share
+                expired += cls.objects.filter(
+                    models.Q(status='active') | models.Q(status='scheduled', start_date__lte=today),
+                    user_id__in=due,
+                ).exclude(id__in=due.values()).update(status='expired')
+                cls.objects.filter(id__in=due.values()).update(status='active')
+            
+            MembershipCoverage.rebuild(ended | set(due), today)
+        
+        return expired, len(due)
+    
     def is_active(self):
         """Check if membership is currently active"""
         return self.status == 'active' and self.end_date >= date.today()
@@ -192,6 +285,124 @@ class UserMembership(models.Model):
         return 0
 
 
+class MembershipCoverage(models.Model):
+    """
+    A member's effective coverage: the current plan merged with the renewals
+    queued behind it into one date interval.
+    
+    Derived from UserMembership (``rebuild`` runs on every membership save
+    and delete, see signals.py) so "is this member covered today?" and
+    "when does their membership really end?" are a single-row lookup.
+    """
+    
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='coverage')
+    start_date = models.DateField()
+    end_date = models.DateField(db_index=True)
+    membership = models.ForeignKey(
+        UserMembership, on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    queued = models.PositiveSmallIntegerField(default=0)
+    
+    class Meta:
+        db_table = 'membership_coverage'
+        verbose_name = 'Membership Coverage'
+        verbose_name_plural = 'Membership Coverage'
+    
+    def __str__(self):
+        return f"{self.user_id}: {self.start_date} - {self.end_date}"
+    
+    def covers(self, day=None):
+        day = day or date.today()
+        return self.start_date <= day <= self.end_date
+    
+    @classmethod
+    def rebuild(cls, user_ids=None, today=None):
+        """
+        Recompute coverage from active and scheduled memberships, for the
+        given members (all members when ``user_ids`` is None).
+        
+        Plans that start no later than the day after the previous one ends
+        are merged. A later plan after a gap is picked up by ``roll_over``
+        once the earlier interval has ended.
+        """
+        if today is None:
+            today = date.today()
+        memberships = UserMembership.objects.filter(status__in=['active', 'scheduled'], end_date__gte=today)
+        existing = cls.objects.all()
+        if user_ids is not None:
+            user_ids = list(user_ids)
+            if not user_ids:
+                return
+            memberships = memberships.filter(user_id__in=user_ids)
+            existing = existing.filter(user_id__in=user_ids)
+        
+        coverage = {}
+        for user_id, membership_id, start_date, end_date, status in memberships.order_by(
+            'user_id', 'start_date', 'id'
+        ).values_list('user_id', 'id', 'start_date', 'end_date', 'status'):
+            current = coverage.get(user_id)
+            if current is None:
+                current = coverage[user_id] = cls(user_id=user_id, start_date=start_date, end_date=end_date)
+            elif start_date > current.end_date + timedelta(days=1):
+                continue
+            current.end_date = max(current.end_date, end_date)
+            if status == 'active':
+                current.membership_id = membership_id
+            else:
+                current.queued += 1
+        
+        def save():
+            cls.objects.bulk_create(
+                coverage.values(),
+                batch_size=500,
+                update_conflicts=True,
+                unique_fields=['user'],
+                update_fields=['start_date', 'end_date', 'membership', 'queued'],
+            )
+        
+        if user_ids is None:
+            with transaction.atomic():
+                existing.delete()
+                save()
+        else:
+            uncovered = [user_id for user_id in user_ids if user_id not in coverage]
+            if uncovered:
+                existing.filter(user_id__in=uncovered).delete()
+            if coverage:
+                save()
+
+
+class ExpiryNotice(models.Model):
+    """
+    A reminder sent to a member whose membership is about to end (see
+    notifications.py). One per member, coverage end date and channel, so
+    nobody is reminded twice about the same expiry; a renewal moves the end
+    date and the next expiry gets its own reminder.
+    """
+    
+    CHANNEL_CHOICES = [
+        ('email', 'E-mail'),
+        ('sms', 'SMS'),
+    ]
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='expiry_notices')
+    end_date = models.DateField()
+    channel = models.CharField(max_length=10, choices=CHANNEL_CHOICES)
+    sent_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        db_table = 'expiry_notices'
+        verbose_name = 'Expiry Notice'
+        verbose_name_plural = 'Expiry Notices'
+        ordering = ['-sent_at']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'end_date', 'channel'], name='one_expiry_notice_per_channel'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user_id}: {self.get_channel_display()} reminder for {self.end_date}"
+
+
 class Payment(models.Model):
     """Payment records for registered members"""
     
@@ -206,6 +417,9 @@ class Payment(models.Model):
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     method = models.CharField(max_length=10, choices=PAYMENT_METHOD_CHOICES)
     payment_date = models.DateTimeField(default=timezone.now)
+    # Local (Asia/Manila) day of payment_date, for indexed daily/monthly
+    # totals. Set by save(); nullable only so adding it needs no table rebuild.
+    business_date = models.DateField(null=True, db_index=True, editable=False)
     reference_no = models.CharField(max_length=50, blank=True, null=True)
     notes = models.TextField(blank=True, null=True)
     
@@ -217,10 +431,50 @@ class Payment(models.Model):
         verbose_name = 'Payment'
         verbose_name_plural = 'Payments'
         ordering = ['-payment_date']
+        indexes = [
+            models.Index(fields=['-payment_date']),
+        ]
     
     def __str__(self):
         return f"{self.user.get_full_name()} - ₱{self.amount} ({self.payment_date.strftime('%Y-%m-%d')})"
 
+    def save(self, *args, **kwargs):
+        """Keep business_date in step with payment_date"""
+        self.business_date = timezone.localdate(self.payment_date)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'payment_date' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'business_date'}
+        super().save(*args, **kwargs)
+
+
+class WalkInBatch(models.Model):
+    """One group or event sale of several walk-in passes, paid together"""
+    
+    PAYMENT_METHOD_CHOICES = [
+        ('cash', 'Cash'),
+        ('gcash', 'GCash'),
+        ('card', 'Card'),
+    ]
+    
+    label = models.CharField(max_length=100, blank=True, default='')
+    method = models.CharField(max_length=10, choices=PAYMENT_METHOD_CHOICES)
+    reference_no = models.CharField(max_length=50, blank=True, null=True)
+    total_amount = models.DecimalField(max_digits=12, decimal_places=2)
+    pass_count = models.PositiveIntegerField()
+    sold_by = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name='walk_in_batches'
+    )
+    created_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        db_table = 'walk_in_batches'
+        verbose_name = 'Walk-in Batch'
+        verbose_name_plural = 'Walk-in Batches'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.label or 'Group sale'} - {self.pass_count} passes - ₱{self.total_amount}"
+
 
 class WalkInPayment(models.Model):
     """Payment records for walk-in clients (no account required)"""
@@ -237,8 +491,14 @@ class WalkInPayment(models.Model):
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     method = models.CharField(max_length=10, choices=PAYMENT_METHOD_CHOICES)
     payment_date = models.DateTimeField(default=timezone.now)
+    # Local (Asia/Manila) day of payment_date, for indexed daily/monthly
+    # totals. Set by save(); nullable only so adding it needs no table rebuild.
+    business_date = models.DateField(null=True, db_index=True, editable=False)
     reference_no = models.CharField(max_length=50, blank=True, null=True)
     notes = models.TextField(blank=True, null=True)
+    batch = models.ForeignKey(
+        WalkInBatch, on_delete=models.CASCADE, null=True, blank=True, related_name='payments'
+    )
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -248,11 +508,240 @@ class WalkInPayment(models.Model):
         verbose_name = 'Walk-in Payment'
         verbose_name_plural = 'Walk-in Payments'
         ordering = ['-payment_date']
+        indexes = [
+            models.Index(fields=['-payment_date']),
+        ]
     
     def __str__(self):
         customer = self.customer_name if self.customer_name else "Anonymous"
         return f"{customer} - {self.pass_type.name} - ₱{self.amount}"
 
+    def save(self, *args, **kwargs):
+        """Keep business_date in step with payment_date"""
+        self.business_date = timezone.localdate(self.payment_date)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'payment_date' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'business_date'}
+        super().save(*args, **kwargs)
+
+
+class WalkInPassCode(models.Model):
+    """
+    Kiosk code of a walk-in pass: code -> validity.
+    
+    Codes are 8 digits so the kiosk keypad takes them as well as the 6-digit
+    member PINs. A pass is valid from the day it was sold for the pass's
+    ``duration_days`` (a day pass only on that day).
+    """
+    
+    CODE_LENGTH = 8
+    
+    code = models.CharField(max_length=CODE_LENGTH, unique=True)
+    payment = models.OneToOneField(WalkInPayment, on_delete=models.CASCADE, related_name='pass_code')
+    valid_from = models.DateField()
+    valid_until = models.DateField(db_index=True)
+    
+    class Meta:
+        db_table = 'walk_in_pass_codes'
+        verbose_name = 'Walk-in Pass Code'
+        verbose_name_plural = 'Walk-in Pass Codes'
+    
+    def __str__(self):
+        return f"{self.code} (valid {self.valid_from} to {self.valid_until})"
+    
+    def covers(self, day=None):
+        """Whether the pass can be used on ``day`` (today by default)"""
+        day = day or date.today()
+        return self.valid_from <= day <= self.valid_until
+    
+    @classmethod
+    def allocate(cls, count, rng=None):
+        """Reserve ``count`` unused codes, checking the random candidates in one query"""
+        import random
+        rng = rng or random
+        codes = set()
+        while len(codes) < count:
+            candidates = set()
+            while len(candidates) < count - len(codes):
+                code = f'{rng.randint(0, 10 ** cls.CODE_LENGTH - 1):0{cls.CODE_LENGTH}d}'
+                if code not in codes:
+                    candidates.add(code)
+            taken = set(cls.objects.filter(code__in=candidates).values_list('code', flat=True))
+            codes |= candidates - taken
+        return list(codes)
+    
+    @classmethod
+    def issue(cls, payments):
+        """Create the codes of freshly sold passes (``payment.pass_type`` must be loaded)"""
+        pass_codes = []
+        for payment, code in zip(payments, cls.allocate(len(payments))):
+            valid_from = payment.business_date
+            pass_codes.append(cls(
+                code=code,
+                payment=payment,
+                valid_from=valid_from,
+                valid_until=valid_from + timedelta(days=max(payment.pass_type.duration_days, 1) - 1),
+            ))
+        return cls.objects.bulk_create(pass_codes)
+
+
+class RevenueEntry(models.Model):
+    """
+    One line of the append-only revenue ledger (see ledger.py).
+
+    Every membership payment and walk-in sale adds a ``sale`` line. Lines are
+    never changed: a corrected or deleted sale adds a ``reversal`` line with
+    the opposite amount (and a new ``sale`` line for corrected figures).
+    """
+
+    SOURCE_CHOICES = [
+        ('membership', 'Membership Payment'),
+        ('walk_in', 'Walk-in Sale'),
+    ]
+
+    KIND_CHOICES = [
+        ('sale', 'Sale'),
+        ('reversal', 'Reversal'),
+    ]
+
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES)
+    # Payment or WalkInPayment id; kept after the sale row itself is deleted
+    source_id = models.PositiveIntegerField()
+    # What was sold: the MembershipPlan (membership) or FlexibleAccess (walk-in) id
+    item_id = models.PositiveIntegerField(null=True, blank=True)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, default='sale')
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    method = models.CharField(max_length=10, choices=Payment.PAYMENT_METHOD_CHOICES)
+    business_date = models.DateField(db_index=True)
+    staff = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name='revenue_entries'
+    )
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'revenue_entries'
+        verbose_name = 'Revenue Entry'
+        verbose_name_plural = 'Revenue Entries'
+        ordering = ['-id']
+        indexes = [
+            # The ledger lines of one sale, to reverse them
+            models.Index(fields=['source', 'source_id']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.get_source_display()} #{self.source_id} - ₱{self.amount}"
+
+
+class RevenueDailySummary(models.Model):
+    """
+    Revenue per business day, payment method, source and plan or pass, kept
+    up to date by ledger.py as ledger lines are added. Any revenue figure over
+    a range of days is one indexed range read of these rows, and they are the
+    cube that revenue_cube.py rolls up and pivots.
+    """
+
+    business_date = models.DateField()
+    method = models.CharField(max_length=10, choices=Payment.PAYMENT_METHOD_CHOICES)
+    source = models.CharField(max_length=20, choices=RevenueEntry.SOURCE_CHOICES)
+    item_id = models.PositiveIntegerField(null=True, blank=True)
+    # Sales less reversals
+    count = models.IntegerField(default=0)
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+
+    class Meta:
+        db_table = 'revenue_daily_summaries'
+        verbose_name = 'Revenue Daily Summary'
+        verbose_name_plural = 'Revenue Daily Summaries'
+        ordering = ['-business_date', 'source', 'method']
+        constraints = [
+            # Also the index behind the business_date range reads
+            models.UniqueConstraint(
+                fields=['business_date', 'method', 'source', 'item_id'], name='one_revenue_summary_per_day_and_item',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.business_date} {self.get_source_display()} ({self.get_method_display()}) - ₱{self.total}"
+
+    @classmethod
+    def in_range(cls, first=None, last=None):
+        """Rows for the business days first..last, inclusive"""
+        queryset = cls.objects.order_by()
+        if first is not None:
+            queryset = queryset.filter(business_date__gte=first)
+        if last is not None:
+            queryset = queryset.filter(business_date__lte=last)
+        return queryset
+
+    @classmethod
+    def rows(cls, first=None, last=None):
+        """(business_date, source, count, total) for the days first..last, inclusive"""
+        return cls.in_range(first, last).values_list('business_date', 'source', 'count', 'total')
+
+    @staticmethod
+    def tally(rows, day=None):
+        """Sale counts and totals by source, over ``rows`` or only those of ``day``"""
+        counts = {source: 0 for source, label in RevenueEntry.SOURCE_CHOICES}
+        totals = {source: Decimal('0.00') for source, label in RevenueEntry.SOURCE_CHOICES}
+        for business_date, source, count, total in rows:
+            if day is None or business_date == day:
+                counts[source] += count
+                totals[source] += total
+        return counts, totals
+
+
+class CohortRetention(models.Model):
+    """
+    One point of a join cohort's retention curve: of the members whose first
+    plan started in ``cohort`` (a month), how many were still covered,
+    renewed or lapsed ``offset`` months later.
+
+    A cache of cohorts.py's computation over UserMembership, refreshed by
+    ``expire_memberships`` every night; pages only ever read these rows.
+    """
+
+    cohort = models.DateField()
+    offset = models.PositiveSmallIntegerField()
+    members = models.PositiveIntegerField(default=0)
+    # Members with a plan covering any day of the month
+    retained = models.PositiveIntegerField(default=0)
+    # Members who started another plan after their first that month
+    renewed = models.PositiveIntegerField(default=0)
+    # Members whose last plan ended that month and who have not come back
+    churned = models.PositiveIntegerField(default=0)
+    as_of = models.DateField()
+    refreshed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'cohort_retention'
+        verbose_name = 'Cohort Retention'
+        verbose_name_plural = 'Cohort Retention'
+        ordering = ['-cohort', 'offset']
+        constraints = [
+            models.UniqueConstraint(fields=['cohort', 'offset'], name='one_retention_point_per_cohort_month'),
+        ]
+
+    def __str__(self):
+        return f"{self.cohort:%b %Y} +{self.offset}: {self.retained}/{self.members}"
+
+
+class StaleCohort(models.Model):
+    """
+    A join cohort whose cached curve is out of date because a plan was
+    deleted or a first plan moved to another month; the next
+    ``cohorts.refresh`` recomputes it and drops the mark.
+    """
+
+    cohort = models.DateField(unique=True)
+
+    class Meta:
+        db_table = 'stale_cohorts'
+        verbose_name = 'Stale Cohort'
+        verbose_name_plural = 'Stale Cohorts'
+
+    def __str__(self):
+        return f"{self.cohort:%b %Y}"
+
 
 class Analytics(models.Model):
     """Daily/weekly aggregated data for dashboard"""
@@ -287,21 +776,10 @@ class Analytics(models.Model):
             end_date__gte=target_date
         ).count()
         
-        # Count walk-in passes sold on this date
-        passes_sold = WalkInPayment.objects.filter(
-            payment_date__date=target_date
-        ).count()
-        
-        # Calculate total sales
-        member_sales = Payment.objects.filter(
-            payment_date__date=target_date
-        ).aggregate(total=models.Sum('amount'))['total'] or Decimal('0.00')
-        
-        walkin_sales = WalkInPayment.objects.filter(
-            payment_date__date=target_date
-        ).aggregate(total=models.Sum('amount'))['total'] or Decimal('0.00')
-        
-        total_sales = member_sales + walkin_sales
+        # Walk-in passes sold and total sales, from the revenue ledger
+        counts, totals = RevenueDailySummary.tally(RevenueDailySummary.rows(target_date, target_date))
+        passes_sold = counts['walk_in']
+        total_sales = sum(totals.values())
         
         # Create or update analytics record
         analytics, created = cls.objects.update_or_create(
@@ -349,7 +827,9 @@ class AuditLog(models.Model):
         
         # System
         ('data_export', 'Data Exported'),
+        ('data_import', 'Data Imported'),
         ('report_generated', 'Report Generated'),
+        ('reminders_sent', 'Expiry Reminders Sent'),
         ('settings_changed', 'Settings Changed'),
         
         # Security
@@ -386,7 +866,7 @@ class AuditLog(models.Model):
     # Additional data in JSON format
     extra_data = models.JSONField(default=dict, blank=True)
     
-    timestamp = models.DateTimeField(auto_now_add=True, db_index=True)
+    timestamp = models.DateTimeField(default=timezone.now, db_index=True)
     
     class Meta:
         db_table = 'audit_logs'
@@ -412,6 +892,20 @@ class AuditLog(models.Model):
         Usage:
             AuditLog.log('login', user=request.user, description='User logged in successfully')
         """
+        return cls.objects.create(**cls._entry_fields(
+            action, user, description, severity, request, model_name, object_id, object_repr, extra_data
+        ))
+    
+    @classmethod
+    async def alog(cls, action, user=None, description='', severity='info', 
+                   request=None, model_name=None, object_id=None, object_repr=None, **extra_data):
+        """Async version of log() for async views"""
+        return await cls.objects.acreate(**cls._entry_fields(
+            action, user, description, severity, request, model_name, object_id, object_repr, extra_data
+        ))
+    
+    @staticmethod
+    def _entry_fields(action, user, description, severity, request, model_name, object_id, object_repr, extra_data):
         ip_address = None
         user_agent = None
         
@@ -426,18 +920,18 @@ class AuditLog(models.Model):
             # Get user agent
             user_agent = request.META.get('HTTP_USER_AGENT', '')
         
-        return cls.objects.create(
-            user=user,
-            action=action,
-            severity=severity,
-            description=description,
-            ip_address=ip_address,
-            user_agent=user_agent,
-            model_name=model_name,
-            object_id=str(object_id) if object_id else None,
-            object_repr=object_repr,
-            extra_data=extra_data
-        )
+        return {
+            'user': user,
+            'action': action,
+            'severity': severity,
+            'description': description,
+            'ip_address': ip_address,
+            'user_agent': user_agent,
+            'model_name': model_name,
+            'object_id': str(object_id) if object_id else None,
+            'object_repr': object_repr,
+            'extra_data': extra_data,
+        }
     
     @classmethod
     def get_user_activity(cls, user, days=30):
@@ -483,14 +977,23 @@ class AuditLog(models.Model):
     # Add this to gym_app/models.py (at the end, before the last line)
 
 class Attendance(models.Model):
-    """Track member check-ins and check-outs"""
+    """Track member and walk-in check-ins and check-outs"""
     
     user = models.ForeignKey(
         User, 
         on_delete=models.CASCADE, 
+        null=True,
+        blank=True,
+        related_name='attendances'
+    )
+    walk_in = models.ForeignKey(
+        WalkInPayment,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
         related_name='attendances'
     )
-    check_in = models.DateTimeField(auto_now_add=True)
+    check_in = models.DateTimeField(default=timezone.now)
     check_out = models.DateTimeField(null=True, blank=True)
     duration_minutes = models.IntegerField(null=True, blank=True)
     notes = models.TextField(blank=True, null=True)
@@ -504,9 +1007,22 @@ class Attendance(models.Model):
             models.Index(fields=['-check_in']),
             models.Index(fields=['user', '-check_in']),
         ]
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(user__isnull=False) | models.Q(walk_in__isnull=False),
+                name='attendance_member_or_walk_in',
+            ),
+        ]
     
     def __str__(self):
-        return f"{self.user.get_full_name()} - {self.check_in.strftime('%Y-%m-%d %H:%M')}"
+        return f"{self.visitor_name} - {self.check_in.strftime('%Y-%m-%d %H:%M')}"
+    
+    @property
+    def visitor_name(self):
+        """Member's name, or the walk-in customer's name"""
+        if self.user_id:
+            return self.user.get_full_name() or self.user.username
+        return self.walk_in.customer_name or 'Walk-in Guest'
     
     def save(self, *args, **kwargs):
         """Calculate duration if check_out is set"""
@@ -529,4 +1045,39 @@ class Attendance(models.Model):
         
         if hours > 0:
             return f"{hours}h {minutes}m"
-        return f"{minutes}m"
\ No newline at end of file
+        return f"{minutes}m"
+
+
+class Task(models.Model):
+    """Side effect queued to run after the request (see gym_app/taskqueue.py)"""
+    
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    
+    name = models.CharField(max_length=100)
+    kwargs = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default='')
+    
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'tasks'
+        verbose_name = 'Background Task'
+        verbose_name_plural = 'Background Tasks'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'run_after']),
+        ]
+    
+    def __str__(self):
+        return f"{self.name} ({self.get_status_display()})"
@@ -0,0 +1,225 @@
+"""
+Expiring-membership reminders.
+
+``notify_expiring`` is run daily by the ``notify_expiring`` command. It
+streams the members whose coverage (``MembershipCoverage``, so queued
+renewals count) ends within the next N days off the indexed ``end_date``
+range, in chunks. For every chunk it renders an e-mail and an SMS reminder
+per reachable member from templates loaded once per run, records one
+``ExpiryNotice`` per member, end date and channel, and hands the messages to
+the outbox in a single call. Reminders already on record are skipped. When
+two runs overlap, the unique constraint on the notices lets only one of them
+record a reminder, and each run sends only the reminders it recorded. A
+single summary audit entry is written at the end.
+
+Outboxes work like Django's e-mail backends: a class whose
+``send_messages(messages)`` returns the number sent, chosen by the
+``NOTIFICATION_OUTBOX_BACKEND`` setting. ``ConsoleOutbox`` prints the
+messages, ``FileOutbox`` appends them as JSON lines to a file per day and
+``MemoryOutbox`` keeps them in ``notifications.outbox`` for tests. An SMS
+gateway or SMTP relay is one more backend.
+"""
+
+import json
+import os
+import sys
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.template.loader import get_template
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import MembershipCoverage, ExpiryNotice, AuditLog
+
+
+DEFAULT_BATCH_SIZE = 500
+
+# channel -> template of its body
+TEMPLATES = {
+    'email': 'gym_app/notifications/expiring_email.txt',
+    'sms': 'gym_app/notifications/expiring_sms.txt',
+}
+
+Message = namedtuple('Message', ['channel', 'recipient', 'subject', 'body', 'user_id'])
+
+# Messages sent through MemoryOutbox
+outbox = []
+
+
+class ConsoleOutbox:
+    """Writes every message to ``stream`` (stdout by default)"""
+
+    def __init__(self, stream=None, **kwargs):
+        self.stream = stream or sys.stdout
+
+    def send_messages(self, messages):
+        for message in messages:
+            self.stream.write(
+                f'[{message.channel}] To: {message.recipient}\n'
+                f'Subject: {message.subject}\n\n{message.body}\n{"-" * 70}\n'
+            )
+        self.stream.flush()
+        return len(messages)
+
+
+class FileOutbox:
+    """Appends every message as a JSON line to ``<path>/<YYYY-MM-DD>.jsonl``"""
+
+    def __init__(self, path=None, **kwargs):
+        self.path = path or getattr(settings, 'NOTIFICATION_OUTBOX_DIR', os.path.join(settings.BASE_DIR, 'outbox'))
+
+    def send_messages(self, messages):
+        if not messages:
+            return 0
+        os.makedirs(self.path, exist_ok=True)
+        filename = os.path.join(self.path, f'{timezone.localdate():%Y-%m-%d}.jsonl')
+        with open(filename, 'a', encoding='utf-8') as f:
+            for message in messages:
+                f.write(json.dumps(message._asdict(), ensure_ascii=False) + '\n')
+        return len(messages)
+
+
+class MemoryOutbox:
+    """Collects messages in ``notifications.outbox``"""
+
+    def __init__(self, **kwargs):
+        pass
+
+    def send_messages(self, messages):
+        outbox.extend(messages)
+        return len(messages)
+
+
+def get_outbox(backend=None, **kwargs):
+    """An instance of ``backend``, or of the NOTIFICATION_OUTBOX_BACKEND setting"""
+    backend = backend or getattr(settings, 'NOTIFICATION_OUTBOX_BACKEND', 'gym_app.notifications.ConsoleOutbox')
+    return import_string(backend)(**kwargs)
+
+
+class NotifyResult:
+    """Counters collected while sending reminders"""
+
+    def __init__(self, days):
+        self.days = days
+        self.members = 0
+        self.sent = {channel: 0 for channel in TEMPLATES}
+        self.already_sent = 0
+        self.unreachable = 0
+
+    def as_dict(self):
+        return {
+            'days': self.days,
+            'members': self.members,
+            'sent': self.sent,
+            'already_sent': self.already_sent,
+            'unreachable': self.unreachable,
+        }
+
+
+def expiring(today, days):
+    """Coverage ending between ``today`` and ``days`` days from now, soonest first (end_date index)"""
+    return MembershipCoverage.objects.filter(
+        end_date__range=[today, today + timedelta(days=days)],
+        user__is_active=True,
+    ).select_related('user', 'membership__plan').order_by('end_date', 'user_id')
+
+
+def recipients(user):
+    """(channel, address) of every way ``user`` can be reached"""
+    if user.email:
+        yield 'email', user.email
+    if user.mobile_no:
+        yield 'sms', user.mobile_no
+
+
+def notify_expiring(today=None, days=None, outbox=None, batch_size=DEFAULT_BATCH_SIZE,
+                    dry_run=False, performed_by=None):
+    """
+    Remind every member whose membership ends within ``days`` days (the
+    EXPIRY_NOTICE_DAYS setting by default) who was not reminded about that
+    end date yet. Returns a ``NotifyResult``.
+
+    With ``dry_run`` nothing is sent or recorded.
+    """
+    if today is None:
+        today = timezone.localdate()
+    if days is None:
+        days = getattr(settings, 'EXPIRY_NOTICE_DAYS', 7)
+    outbox = outbox or get_outbox()
+    templates = {channel: get_template(name) for channel, name in TEMPLATES.items()}
+    result = NotifyResult(days)
+
+    chunk = []
+    for coverage in expiring(today, days).iterator(chunk_size=batch_size):
+        chunk.append(coverage)
+        if len(chunk) >= batch_size:
+            _send_chunk(chunk, today, templates, outbox, result, dry_run)
+            chunk = []
+    if chunk:
+        _send_chunk(chunk, today, templates, outbox, result, dry_run)
+
+    if not dry_run and sum(result.sent.values()):
+        AuditLog.log(
+            action='reminders_sent',
+            user=performed_by,
+            description=f'Sent {sum(result.sent.values())} expiry reminder(s) to members expiring within {days} days',
+            severity='info',
+            model_name='ExpiryNotice',
+            **result.as_dict()
+        )
+
+    return result
+
+
+def _send_chunk(chunk, today, templates, outbox, result, dry_run):
+    """Render, record and send the reminders for one chunk of coverage rows"""
+    already_sent = set(ExpiryNotice.objects.filter(
+        user_id__in=[coverage.user_id for coverage in chunk], end_date__gte=today,
+    ).values_list('user_id', 'end_date', 'channel'))
+
+    messages, notices = [], []
+    now = timezone.now()
+    for coverage in chunk:
+        result.members += 1
+        user = coverage.user
+        context = {
+            'user': user,
+            'plan': coverage.membership.plan if coverage.membership else None,
+            'end_date': coverage.end_date,
+            'days_left': (coverage.end_date - today).days,
+        }
+        reachable = False
+        for channel, recipient in recipients(user):
+            reachable = True
+            if (user.id, coverage.end_date, channel) in already_sent:
+                result.already_sent += 1
+                continue
+            messages.append(Message(
+                channel=channel,
+                recipient=recipient,
+                subject=f'Your membership ends on {coverage.end_date:%b %d, %Y}',
+                body=templates[channel].render(context).strip(),
+                user_id=user.id,
+            ))
+            notices.append(ExpiryNotice(user=user, end_date=coverage.end_date, channel=channel, sent_at=now))
+        if not reachable:
+            result.unreachable += 1
+
+    if not dry_run and messages:
+        # A failed send rolls the notices back, so the next run retries them
+        with transaction.atomic():
+            # An overlapping run may have recorded some of these since
+            # ``already_sent`` was read: send only the ones recorded here
+            ExpiryNotice.objects.bulk_create(notices, ignore_conflicts=True)
+            recorded = set(ExpiryNotice.objects.filter(
+                user_id__in={notice.user_id for notice in notices}, sent_at=now,
+            ).values_list('user_id', 'end_date', 'channel'))
+            ours = [(notice.user_id, notice.end_date, notice.channel) in recorded for notice in notices]
+            result.already_sent += ours.count(False)
+            messages = [message for message, recorded_here in zip(messages, ours) if recorded_here]
+            outbox.send_messages(messages)
+    for message in messages:
+        result.sent[message.channel] += 1
@@ -0,0 +1,346 @@
+"""
+Request profiling.
+
+``ProfilingMiddleware`` records, per URL name, the request latency, time
+spent in the database, number of queries and template render time into
+in-process histograms. The metrics page and the Prometheus endpoint in
+``views.py`` read them back as p50/p95/p99.
+
+Histograms use HDR-style log-linear buckets: values are kept in
+microseconds, exact below 32 and within ~6% above, so memory per histogram
+stays bounded no matter how many requests are recorded. Numbers are per
+process; each worker of a multi-process server reports its own.
+
+Template render time comes from ``ProfilingDjangoTemplates``, a drop-in
+replacement for the Django template backend that times top-level renders.
+
+Optional sampling (``PROFILING_CPROFILE_RATE``) runs a fraction of requests
+under cProfile and keeps dumps of the slowest ones in
+``PROFILING_DUMP_DIR`` for inspection with ``python -m pstats``.
+"""
+
+import cProfile
+import heapq
+import os
+import random
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.template.backends.django import DjangoTemplates, Template
+from django.urls import resolve, Resolver404
+from django.utils import timezone
+
+from .querybudget import QueryRecorder
+
+
+SUB_BUCKET_BITS = 5
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+HALF_BUCKETS = SUB_BUCKETS // 2
+
+PERCENTILES = (50, 95, 99)
+
+_template_time = ContextVar('template_time', default=None)
+
+
+class Histogram:
+    """Log-linear bucketed histogram of non-negative integers"""
+
+    __slots__ = ('counts', 'count', 'total', 'min', 'max')
+
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    @staticmethod
+    def bucket_index(value):
+        if value < SUB_BUCKETS:
+            return value
+        shift = value.bit_length() - SUB_BUCKET_BITS
+        return SUB_BUCKETS + (shift - 1) * HALF_BUCKETS + (value >> shift) - HALF_BUCKETS
+
+    @staticmethod
+    def bucket_upper_bound(index):
+        if index < SUB_BUCKETS:
+            return index
+        shift, offset = divmod(index - SUB_BUCKETS, HALF_BUCKETS)
+        shift += 1
+        return ((offset + HALF_BUCKETS + 1) << shift) - 1
+
+    def record(self, value):
+        value = max(0, int(value))
+        index = self.bucket_index(value)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self.min = value if self.min is None else min(self.min, value)
+
+    def percentile(self, pct):
+        """Upper bound of the bucket holding the ``pct``-th percentile"""
+        if not self.count:
+            return 0
+        rank = max(1, int(round(self.count * pct / 100.0)))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(self.bucket_upper_bound(index), self.max)
+        return self.max
+
+    def mean(self):
+        return self.total / self.count if self.count else 0
+
+
+class ViewMetrics:
+    """Histograms for one URL name"""
+
+    __slots__ = ('latency_us', 'db_us', 'template_us', 'queries', 'errors')
+
+    def __init__(self):
+        self.latency_us = Histogram()
+        self.db_us = Histogram()
+        self.template_us = Histogram()
+        self.queries = Histogram()
+        self.errors = 0
+
+    def summary(self):
+        def pcts(histogram, scale=1.0):
+            return {f'p{p}': histogram.percentile(p) / scale for p in PERCENTILES}
+
+        return {
+            'requests': self.latency_us.count,
+            'errors': self.errors,
+            'latency_ms': pcts(self.latency_us, 1000.0),
+            'latency_max_ms': self.latency_us.max / 1000.0,
+            'db_ms': pcts(self.db_us, 1000.0),
+            'template_ms': pcts(self.template_us, 1000.0),
+            'queries': pcts(self.queries),
+            'totals': {
+                'latency_s': self.latency_us.total / 1e6,
+                'db_s': self.db_us.total / 1e6,
+                'template_s': self.template_us.total / 1e6,
+                'queries': self.queries.total,
+            },
+        }
+
+
+class MetricsRegistry:
+    """Thread-safe map of URL name -> ViewMetrics"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+        self.started_at = timezone.now()
+        # Set by the middleware when cProfile sampling is on
+        self.profiles = None
+
+    def record(self, view, latency, db_time, template_time, queries, error=False):
+        with self._lock:
+            metrics = self._views.get(view)
+            if metrics is None:
+                metrics = self._views[view] = ViewMetrics()
+            metrics.latency_us.record(latency * 1e6)
+            metrics.db_us.record(db_time * 1e6)
+            metrics.template_us.record(template_time * 1e6)
+            metrics.queries.record(queries)
+            if error:
+                metrics.errors += 1
+
+    def snapshot(self):
+        """Summaries for every view, slowest p95 first"""
+        with self._lock:
+            rows = [(view, metrics.summary()) for view, metrics in self._views.items()]
+        rows.sort(key=lambda row: row[1]['latency_ms']['p95'], reverse=True)
+        return rows
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+            self.started_at = timezone.now()
+
+
+registry = MetricsRegistry()
+
+
+# ---------- Template timing ----------
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            bucket = _template_time.get()
+            if bucket is not None:
+                bucket[0] += time.perf_counter() - started
+
+
+class ProfilingDjangoTemplates(DjangoTemplates):
+    """Django template backend that reports render time to the profiler"""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
+
+
+# ---------- cProfile sampling ----------
+
+class SlowestProfiles:
+    """Keep cProfile dumps for the N slowest sampled requests"""
+
+    def __init__(self, directory, keep):
+        self.directory = directory
+        self.keep = keep
+        self._heap = []
+        self._lock = threading.Lock()
+
+    def offer(self, profiler, view, latency):
+        with self._lock:
+            if len(self._heap) >= self.keep and latency <= self._heap[0][0]:
+                return None
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(
+                self.directory,
+                f'{view}-{int(latency * 1000)}ms-{timezone.now():%Y%m%d%H%M%S%f}.prof',
+            )
+            profiler.dump_stats(path)
+            heapq.heappush(self._heap, (latency, path))
+            if len(self._heap) > self.keep:
+                evicted_latency, evicted_path = heapq.heappop(self._heap)
+                try:
+                    os.remove(evicted_path)
+                except OSError:
+                    pass
+            return path
+
+    def dumps(self):
+        with self._lock:
+            return sorted(self._heap, reverse=True)
+
+
+class ProfilingMiddleware:
+    """
+    Record latency, DB time, query count and template time per URL name.
+
+    Settings:
+        PROFILING_ENABLED        turn recording on/off (default True)
+        PROFILING_CPROFILE_RATE  fraction of requests run under cProfile (default 0)
+        PROFILING_CPROFILE_KEEP  number of slowest dumps to keep (default 20)
+        PROFILING_DUMP_DIR       where dumps are written
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'PROFILING_ENABLED', True)
+        self.sample_rate = getattr(settings, 'PROFILING_CPROFILE_RATE', 0)
+        if self.sample_rate and registry.profiles is None:
+            registry.profiles = SlowestProfiles(
+                getattr(settings, 'PROFILING_DUMP_DIR', os.path.join(settings.BASE_DIR, 'profiles')),
+                getattr(settings, 'PROFILING_CPROFILE_KEEP', 20),
+            )
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        template_time = [0.0]
+        token = _template_time.set(template_time)
+        profiler = cProfile.Profile() if self.sample_rate and random.random() < self.sample_rate else None
+
+        started = time.perf_counter()
+        try:
+            with recorder.record():
+                if profiler is not None:
+                    response = profiler.runcall(self.get_response, request)
+                else:
+                    response = self.get_response(request)
+        finally:
+            _template_time.reset(token)
+        latency = time.perf_counter() - started
+
+        view = self.record(request, response, latency, recorder, template_time[0])
+        if profiler is not None:
+            registry.profiles.offer(profiler, view, latency)
+        return response
+
+    async def __acall__(self, request):
+        # cProfile follows one thread, so async requests are never sampled
+        if not self.enabled:
+            return await self.get_response(request)
+
+        recorder = QueryRecorder()
+        template_time = [0.0]
+        token = _template_time.set(template_time)
+
+        started = time.perf_counter()
+        try:
+            with recorder.record():
+                response = await self.get_response(request)
+        finally:
+            _template_time.reset(token)
+        latency = time.perf_counter() - started
+
+        self.record(request, response, latency, recorder, template_time[0])
+        return response
+
+    def record(self, request, response, latency, recorder, template_time):
+        view = self._view_name(request)
+        registry.record(
+            view, latency, recorder.duration, template_time, recorder.count,
+            error=response.status_code >= 500,
+        )
+        return view
+
+    @staticmethod
+    def _view_name(request):
+        match = request.resolver_match
+        if match is None:
+            try:
+                match = resolve(request.path_info)
+            except Resolver404:
+                return '<unresolved>'
+        return match.view_name or match._func_path
+
+
+def prometheus_text():
+    """Render the registry in the Prometheus text exposition format"""
+    rows = sorted(registry.snapshot())
+    series = [
+        # metric, help, percentile key, total key, divisor turning the percentiles into base units
+        ('gym_request_latency_seconds', 'Request latency per view', 'latency_ms', 'latency_s', 1000.0),
+        ('gym_request_db_seconds', 'Database time per request', 'db_ms', 'db_s', 1000.0),
+        ('gym_request_template_seconds', 'Template render time per request', 'template_ms', 'template_s', 1000.0),
+        ('gym_request_queries', 'SQL queries per request', 'queries', 'queries', 1.0),
+    ]
+    lines = []
+    for metric, help_text, key, total_key, divisor in series:
+        lines.append(f'# HELP {metric} {help_text}')
+        lines.append(f'# TYPE {metric} summary')
+        for view, summary in rows:
+            for p in PERCENTILES:
+                lines.append(f'{metric}{{view="{view}",quantile="{p / 100}"}} {summary[key][f"p{p}"] / divisor:.6g}')
+            lines.append(f'{metric}_sum{{view="{view}"}} {summary["totals"][total_key]:.6g}')
+            lines.append(f'{metric}_count{{view="{view}"}} {summary["requests"]}')
+
+    lines.append('# HELP gym_request_errors_total Requests that returned a 5xx response')
+    lines.append('# TYPE gym_request_errors_total counter')
+    for view, summary in rows:
+        lines.append(f'gym_request_errors_total{{view="{view}"}} {summary["errors"]}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,271 @@
+"""
+Per-view query budgets.
+
+Every URL name can be given a maximum number of SQL queries a single request
+may run. ``QueryBudgetMiddleware`` counts the queries of each request and
+logs a warning when a view goes over its budget or repeats the same
+statement many times (the usual sign of an N+1 pattern, e.g. a template
+expanding ``payment.membership.plan`` row by row). ``QueryBudgetTestMixin``
+turns the same checks into test assertions.
+
+Budgets come from ``DEFAULT_QUERY_BUDGETS`` below, can be overridden with the
+``QUERY_BUDGETS`` setting, or attached to a view with ``@query_budget(n)``.
+"""
+
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial, wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connection
+from django.urls import resolve, Resolver404
+
+
+logger = logging.getLogger('gym_app.querybudget')
+
+# Maximum queries per request, keyed by URL name. Session and user lookups
+# done by the auth middleware count towards the budget. Budgets cover the
+# worst case: a cold plan/pass catalog and the first sale of the day for an
+# item and payment method (QueryBudgetTests drives each flow that way).
+DEFAULT_QUERY_BUDGETS = {
+    'home': 4,
+    'about': 0,
+    'login': 0,
+    'register': 0,
+    'dashboard': 12,
+    'dashboard_summary': 6,
+    'dashboard_attendance': 4,
+    'events_stream': 2,
+    'membership_plans': 5,
+    'subscribe_plan': 18,
+    'walkin_purchase': 7,
+    'walkin_confirm': 18,
+    'walkin_batch': 24,
+    'walkin_batch_receipt': 4,
+    'reports': 16,
+    'revenue_report': 5,
+    'retention_report': 3,
+    'audit_trail': 5,
+    'manage_plans': 4,
+    'members_list': 3,
+    'member_detail': 5,
+    'create_staff': 2,
+    'kiosk_login': 5,
+    'kiosk_success': 1,
+    'kiosk_walkin_success': 1,
+    'attendance_report': 6,
+    'metrics': 2,
+    'metrics_prometheus': 2,
+    'slow_queries': 2,
+}
+
+# The same normalised statement this many times in one request is an N+1
+N_PLUS_ONE_THRESHOLD = 5
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LISTS = re.compile(r'\bIN\s*\((?:\s*(?:%s|\?)\s*,?)+\)', re.IGNORECASE)
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_sql(sql):
+    """Collapse literals, placeholders lists and whitespace so similar queries match"""
+    sql = _LITERALS.sub('?', sql)
+    sql = _IN_LISTS.sub('IN (...)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def query_budget(max_queries):
+    """
+    Attach a query budget to a view, taking precedence over the registry.
+
+    Usage:
+        @query_budget(5)
+        def member_detail(request, user_id): ...
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(*args, **kwargs):
+            return view_func(*args, **kwargs)
+        wrapper.query_budget = max_queries
+        return wrapper
+    return decorator
+
+
+def get_budget(url_name, view_func=None):
+    """Budget for a URL name (``None`` when the view has no budget)"""
+    budget = getattr(view_func, 'query_budget', None)
+    if budget is not None:
+        return budget
+    overrides = getattr(settings, 'QUERY_BUDGETS', {})
+    return overrides.get(url_name, DEFAULT_QUERY_BUDGETS.get(url_name))
+
+
+# ---------- Request-scoped execute wrappers ----------
+#
+# ``connection.execute_wrapper`` only sees statements run on the calling
+# thread's connection. Async views run their queries on another thread (the
+# async ORM goes through ``sync_to_async``), so request instrumentation is
+# kept in a context variable instead: asgiref copies the context into that
+# thread, and ``_dispatch``, installed once on every connection, hands each
+# statement to the wrappers active for the current request.
+
+_active_wrappers = ContextVar('query_wrappers', default=())
+
+
+def _dispatch(execute, sql, params, many, context):
+    for wrapper in reversed(_active_wrappers.get()):
+        execute = partial(wrapper, execute)
+    return execute(sql, params, many, context)
+
+
+def install_dispatcher(connection, **kwargs):
+    """``connection_created`` receiver (also called directly for the current connection)"""
+    if _dispatch not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _dispatch)
+
+
+@contextmanager
+def execute_wrapper(wrapper):
+    """Like ``connection.execute_wrapper`` but follows the request into async views"""
+    install_dispatcher(connection)
+    token = _active_wrappers.set(_active_wrappers.get() + (wrapper,))
+    try:
+        yield
+    finally:
+        _active_wrappers.reset(token)
+
+
+class QueryRecorder:
+    """Collect every statement run for the current request while active"""
+
+    def __init__(self):
+        self.queries = []
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.duration += elapsed
+            self.queries.append((sql, elapsed))
+
+    @contextmanager
+    def record(self):
+        with execute_wrapper(self):
+            yield self
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    def repeated(self, threshold=N_PLUS_ONE_THRESHOLD):
+        """Normalised statements run at least ``threshold`` times"""
+        counts = Counter(normalize_sql(sql) for sql, elapsed in self.queries)
+        return {sql: n for sql, n in counts.items() if n >= threshold}
+
+
+class QueryBudgetMiddleware:
+    """
+    Count queries per request and warn about views over budget or with N+1s.
+
+    Enabled with ``QUERY_BUDGET_ENABLED`` (defaults to ``DEBUG``). With
+    ``QUERY_BUDGET_STRICT`` the warnings become exceptions, which is
+    useful when running the site under tests.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'QUERY_BUDGET_ENABLED', settings.DEBUG)
+        self.strict = getattr(settings, 'QUERY_BUDGET_STRICT', False)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        with recorder.record():
+            response = self.get_response(request)
+        return self.check(request, response, recorder)
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+
+        recorder = QueryRecorder()
+        with recorder.record():
+            response = await self.get_response(request)
+        return self.check(request, response, recorder)
+
+    def check(self, request, response, recorder):
+        try:
+            match = request.resolver_match or resolve(request.path_info)
+        except Resolver404:
+            return response
+
+        problems = []
+        budget = get_budget(match.url_name, match.func)
+        if budget is not None and recorder.count > budget:
+            problems.append(f'{recorder.count} queries (budget {budget})')
+        for sql, n in recorder.repeated().items():
+            problems.append(f'possible N+1, {n}x: {sql[:200]}')
+
+        if problems:
+            message = f'{request.method} {request.path} [{match.url_name}]: ' + '; '.join(problems)
+            if self.strict:
+                raise AssertionError(message)
+            logger.warning(message)
+
+        if settings.DEBUG:
+            response['X-Query-Count'] = str(recorder.count)
+        return response
+
+
+class QueryBudgetTestMixin:
+    """
+    Test assertions for query budgets.
+
+    Usage:
+        class DashboardTests(QueryBudgetTestMixin, TestCase):
+            def test_admin_dashboard(self):
+                with self.assertWithinQueryBudget('dashboard'):
+                    self.client.get(reverse('dashboard'))
+    """
+
+    def assertWithinQueryBudget(self, url_name, budget=None, n_plus_one_threshold=N_PLUS_ONE_THRESHOLD):
+        if budget is None:
+            budget = get_budget(url_name)
+        if budget is None:
+            self.fail(f'No query budget registered for "{url_name}"')
+        return self._assert_queries(url_name, budget, n_plus_one_threshold)
+
+    def assertNoNPlusOne(self, threshold=N_PLUS_ONE_THRESHOLD):
+        return self._assert_queries(None, None, threshold)
+
+    @contextmanager
+    def _assert_queries(self, label, budget, threshold):
+        recorder = QueryRecorder()
+        with recorder.record():
+            yield recorder
+
+        listing = '\n'.join(f'  {i}. {sql}' for i, (sql, elapsed) in enumerate(recorder.queries, 1))
+        if budget is not None and recorder.count > budget:
+            self.fail(f'"{label}" ran {recorder.count} queries, budget is {budget}:\n{listing}')
+        repeated = recorder.repeated(threshold)
+        if repeated:
+            details = '\n'.join(f'  {n}x {sql}' for sql, n in repeated.items())
+            self.fail(f'Possible N+1 query pattern in {label or "block"}:\n{details}')
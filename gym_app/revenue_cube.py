@@ -0,0 +1,130 @@
+"""
+Revenue cube: sales sliced by period x payment method x plan/pass.
+
+``RevenueDailySummary`` is the cube at its finest grain, one row per business
+day, payment method, source and plan or pass. ``ledger.py`` updates it
+incrementally as sales arrive. ``cube`` reads a date range of it (one indexed
+range read) and rolls the days up into weeks or months. ``pivot`` lays any two
+dimensions out as a table with row and column totals, so admins can re-pivot
+(``views.revenue_report``) without anything here reading ``Payment`` or
+``WalkInPayment``.
+"""
+
+from collections import defaultdict, namedtuple
+from datetime import timedelta
+from decimal import Decimal
+
+from .models import MembershipPlan, FlexibleAccess, Payment, RevenueEntry, RevenueDailySummary
+
+
+GRAINS = {
+    'day': 'Day',
+    'week': 'Week',
+    'month': 'Month',
+}
+
+DIMENSIONS = {
+    'period': 'Period',
+    'method': 'Payment Method',
+    'source': 'Source',
+    'item': 'Plan / Pass',
+}
+
+MEASURES = {
+    'total': 'Revenue',
+    'count': 'Sales',
+}
+
+# One cube cell; ``item`` is (source, plan or pass id)
+Cell = namedtuple('Cell', ['period', 'method', 'source', 'item', 'count', 'total'])
+
+
+def period_start(day, grain):
+    """First day of the day/week (Monday)/month that ``day`` falls in"""
+    if grain == 'week':
+        return day - timedelta(days=day.weekday())
+    if grain == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def cube(first, last, grain='day'):
+    """Cells of the business days first..last, rolled up to ``grain``"""
+    cells = defaultdict(lambda: [0, Decimal('0.00')])
+    rows = RevenueDailySummary.in_range(first, last).values_list(
+        'business_date', 'method', 'source', 'item_id', 'count', 'total'
+    )
+    for business_date, method, source, item_id, count, total in rows:
+        cell = cells[period_start(business_date, grain), method, source, (source, item_id)]
+        cell[0] += count
+        cell[1] += total
+    return [Cell(*key, count, total) for key, (count, total) in cells.items()]
+
+
+class Labels:
+    """Display names for the values of each dimension"""
+
+    def __init__(self, grain='day'):
+        self.grain = grain
+        self.methods = dict(Payment.PAYMENT_METHOD_CHOICES)
+        self.sources = dict(RevenueEntry.SOURCE_CHOICES)
+        self.items = {
+            **{('membership', pk): name for pk, name in MembershipPlan.objects.values_list('id', 'name')},
+            **{('walk_in', pk): name for pk, name in FlexibleAccess.objects.values_list('id', 'name')},
+        }
+
+    def __call__(self, dimension, value):
+        if dimension == 'period':
+            if self.grain == 'month':
+                return f'{value:%b %Y}'
+            if self.grain == 'week':
+                return f'Week of {value:%b %d, %Y}'
+            return f'{value:%b %d, %Y}'
+        if dimension == 'method':
+            return self.methods.get(value, value)
+        if dimension == 'source':
+            return self.sources.get(value, value)
+        source, item_id = value
+        return self.items.get(value, f'{self.sources.get(source, source)} #{item_id or "?"}')
+
+
+class Pivot:
+    """``cells`` summed into a ``rows`` x ``columns`` table of ``measure``"""
+
+    def __init__(self, cells, rows='period', columns='method', measure='total', labels=None):
+        self.rows = rows
+        self.columns = columns
+        self.measure = measure
+        zero = Decimal('0.00') if measure == 'total' else 0
+        self.values = defaultdict(lambda: zero)
+        self.row_totals = defaultdict(lambda: zero)
+        self.column_totals = defaultdict(lambda: zero)
+        self.grand_total = zero
+        for cell in cells:
+            value = getattr(cell, measure)
+            row, column = getattr(cell, rows), getattr(cell, columns)
+            self.values[row, column] += value
+            self.row_totals[row] += value
+            self.column_totals[column] += value
+            self.grand_total += value
+
+        labels = labels or Labels()
+        # Periods in time order, everything else biggest first
+        self.row_keys = self._ordered(rows, self.row_totals)
+        self.column_keys = self._ordered(columns, self.column_totals)
+        self.column_labels = [labels(columns, key) for key in self.column_keys]
+        self.table = [
+            {
+                'label': labels(rows, row),
+                'values': [self.values.get((row, column)) for column in self.column_keys],
+                'total': self.row_totals[row],
+            }
+            for row in self.row_keys
+        ]
+        self.column_total_values = [self.column_totals[column] for column in self.column_keys]
+
+    @staticmethod
+    def _ordered(dimension, totals):
+        if dimension == 'period':
+            return sorted(totals)
+        return sorted(totals, key=lambda key: (-totals[key], str(key)))
@@ -0,0 +1,64 @@
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import cohorts, ledger
+from .catalog import bump_catalog_version, catalog
+from .models import MembershipPlan, FlexibleAccess, UserMembership, MembershipCoverage, Payment, WalkInPayment
+from .querybudget import install_dispatcher
+
+
+# Request instrumentation (query budgets, profiling, slow-query log) must
+# see statements from every thread, including the async ORM's
+connection_created.connect(install_dispatcher, dispatch_uid='gym_app.querybudget')
+
+
+def _invalidate_catalog():
+    catalog.invalidate()
+    bump_catalog_version()
+
+
+@receiver(post_save, sender=MembershipPlan)
+@receiver(post_delete, sender=MembershipPlan)
+@receiver(post_save, sender=FlexibleAccess)
+@receiver(post_delete, sender=FlexibleAccess)
+def catalog_changed(sender, **kwargs):
+    """Any plan or pass change invalidates the cached catalog and pages"""
+    # Once now so this process reads its own write, and again after commit
+    # so no other process can cache the pre-commit rows under the new version.
+    _invalidate_catalog()
+    transaction.on_commit(_invalidate_catalog)
+
+
+@receiver(post_save, sender=UserMembership)
+@receiver(post_delete, sender=UserMembership)
+def membership_changed(sender, instance, **kwargs):
+    """Keep the member's merged coverage interval in step with their plans"""
+    MembershipCoverage.rebuild([instance.user_id])
+
+
+@receiver(pre_save, sender=UserMembership)
+def membership_moving(sender, instance, update_fields=None, **kwargs):
+    """A plan moved to another month may take its member out of their cohort"""
+    if instance.pk is None or (update_fields is not None and 'start_date' not in update_fields):
+        return
+    moved_from = UserMembership.objects.filter(pk=instance.pk).values_list('start_date', flat=True).first()
+    if moved_from is not None and cohorts.month_index(moved_from) != cohorts.month_index(instance.start_date):
+        cohorts.mark_stale(instance.user_id, moved_from)
+
+
+@receiver(post_delete, sender=UserMembership)
+def membership_deleted(sender, instance, **kwargs):
+    """A deleted plan leaves nothing behind for the cohort refresh to find"""
+    cohorts.mark_stale(instance.user_id, instance.start_date)
+
+
+@receiver(pre_delete, sender=Payment)
+@receiver(pre_delete, sender=WalkInPayment)
+def sale_deleted(sender, instance, **kwargs):
+    """
+    Reverse a deleted sale in the revenue ledger, whether it was deleted
+    directly or with its member, membership or group sale
+    """
+    ledger.reverse(instance)
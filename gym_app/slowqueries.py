@@ -0,0 +1,209 @@
+"""
+Slow-query log.
+
+``SlowQueryMiddleware`` wraps every statement of a request with
+``querybudget.execute_wrapper``. Statements slower than
+``SLOW_QUERY_THRESHOLD_MS`` are written as JSON lines to the
+``gym_app.slow_queries`` logger (a rotating file, see ``LOGGING`` in
+settings) together with the view that ran them, the line of project code
+that issued them and the database's query plan, so filters such as the
+``icontains`` searches on the audit trail and attendance pages can be
+diagnosed after the fact.
+
+``read_slow_queries`` and ``group_slow_queries`` feed the admin page.
+"""
+
+import json
+import logging
+import logging.handlers
+import os
+import time
+import traceback
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from . import querybudget
+from .querybudget import execute_wrapper, normalize_sql
+
+
+logger = logging.getLogger('gym_app.slow_queries')
+
+
+class SlowQueryFileHandler(logging.handlers.RotatingFileHandler):
+    """Rotating log file whose directory is created on the first write, not at import"""
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
+# Frames from the wrapper chain itself are never the origin
+_WRAPPER_FILES = {os.path.abspath(__file__), os.path.abspath(querybudget.__file__)}
+
+
+def _origin_frame():
+    """Innermost stack frame inside the project (not Django or this module)"""
+    base_dir = str(settings.BASE_DIR)
+    for frame in reversed(traceback.extract_stack()):
+        filename = os.path.abspath(frame.filename)
+        if (filename.startswith(base_dir) and filename not in _WRAPPER_FILES
+                and 'site-packages' not in filename):
+            return f'{os.path.relpath(filename, base_dir)}:{frame.lineno} in {frame.name}'
+    return None
+
+
+def explain(sql, params):
+    """Return the database's plan for a SELECT as a list of lines"""
+    prefix = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+    with connection.cursor() as cursor:
+        cursor.execute(prefix + sql, params)
+        rows = cursor.fetchall()
+    if connection.vendor == 'sqlite':
+        # (id, parent, notused, detail)
+        return [row[-1] for row in rows]
+    return [' '.join(str(col) for col in row) for row in rows]
+
+
+class SlowQueryLogger:
+    """``execute_wrapper`` callable that logs statements over the threshold"""
+
+    def __init__(self, request=None, threshold_ms=None, run_explain=None):
+        self.request = request
+        self.threshold = (threshold_ms if threshold_ms is not None
+                          else getattr(settings, 'SLOW_QUERY_THRESHOLD_MS', 100)) / 1000.0
+        self.run_explain = (run_explain if run_explain is not None
+                            else getattr(settings, 'SLOW_QUERY_EXPLAIN', True))
+        self._explaining = False
+
+    def __call__(self, execute, sql, params, many, context):
+        if self._explaining:
+            return execute(sql, params, many, context)
+
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            if elapsed >= self.threshold:
+                self.log(sql, params, many, elapsed)
+
+    def _view_name(self):
+        match = getattr(self.request, 'resolver_match', None)
+        if match is None:
+            return '<middleware>' if self.request is not None else None
+        return match.view_name
+
+    def log(self, sql, params, many, elapsed):
+        plan = None
+        if self.run_explain and not many and sql.lstrip().upper().startswith('SELECT'):
+            self._explaining = True
+            try:
+                plan = explain(sql, params)
+            except Exception as e:
+                plan = [f'EXPLAIN failed: {e}']
+            finally:
+                self._explaining = False
+
+        entry = {
+            'timestamp': timezone.now().isoformat(),
+            'duration_ms': round(elapsed * 1000, 3),
+            'view': self._view_name(),
+            'path': getattr(self.request, 'path', None),
+            'origin': _origin_frame(),
+            'sql': sql,
+            'params': [str(param) for param in params] if params and not many else None,
+            'plan': plan,
+        }
+        logger.warning(json.dumps(entry))
+
+
+class SlowQueryMiddleware:
+    """Log slow statements for each request (``SLOW_QUERY_LOG_ENABLED``)"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'SLOW_QUERY_LOG_ENABLED', True)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+        with execute_wrapper(SlowQueryLogger(request)):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+        with execute_wrapper(SlowQueryLogger(request)):
+            return await self.get_response(request)
+
+
+# ---------- Reading the log back ----------
+
+def read_slow_queries(path=None, limit=5000):
+    """Most recent entries from the log file and its rotated backups"""
+    path = path or getattr(settings, 'SLOW_QUERY_LOG_FILE', None)
+    if not path:
+        return []
+
+    files = [path] + [f'{path}.{i}' for i in range(1, 10)]
+    entries = []
+    for filename in files:
+        if not os.path.exists(filename):
+            continue
+        with open(filename, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    continue
+        if len(entries) >= limit:
+            break
+    entries.sort(key=lambda entry: entry.get('timestamp', ''), reverse=True)
+    return entries[:limit]
+
+
+def group_slow_queries(entries):
+    """Group entries by normalised statement, slowest total time first"""
+    groups = {}
+    for entry in entries:
+        key = normalize_sql(entry.get('sql', ''))
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = {
+                'statement': key,
+                'count': 0,
+                'total_ms': 0.0,
+                'max_ms': 0.0,
+                'views': set(),
+                'origins': set(),
+                'last_seen': entry.get('timestamp'),
+                'plan': entry.get('plan'),
+                'example': entry,
+            }
+        duration = entry.get('duration_ms', 0.0)
+        group['count'] += 1
+        group['total_ms'] += duration
+        if duration > group['max_ms']:
+            group['max_ms'] = duration
+            group['example'] = entry
+        if entry.get('view'):
+            group['views'].add(entry['view'])
+        if entry.get('origin'):
+            group['origins'].add(entry['origin'])
+
+    result = sorted(groups.values(), key=lambda group: group['total_ms'], reverse=True)
+    for group in result:
+        group['avg_ms'] = group['total_ms'] / group['count']
+        group['views'] = sorted(group['views'])
+        group['origins'] = sorted(group['origins'])
+    return result
@@ -0,0 +1,137 @@
+"""
+Startup and first-request latency benchmark.
+
+Each run starts a fresh Python process for a settings profile, builds the
+WSGI application the way ``gym_project/wsgi.py`` does (including the
+template warm-up when the profile enables it) and then sends requests
+straight through the WSGI callable. It reports how long setup and warm-up
+took, how long the first request to each page took and the steady-state
+median of the following requests.
+
+Used by the ``benchmark_startup`` management command. The child side runs
+as ``python -m gym_app.startup_benchmark`` and prints one JSON object.
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+
+# name -> (settings module, extra environment)
+PROFILES = {
+    'dev': ('gym_project.settings', {'GYM_ENV': 'dev'}),
+    'prod-cold': ('gym_project.settings', {'GYM_ENV': 'prod', 'GYM_TEMPLATE_WARMUP': '0'}),
+    'prod': ('gym_project.settings', {'GYM_ENV': 'prod', 'GYM_TEMPLATE_WARMUP': '1'}),
+}
+
+# Pages that render templates without depending on cached data
+DEFAULT_PATHS = ['/about/', '/login/', '/register/', '/kiosk/']
+
+
+def _request(application, path):
+    from wsgiref.util import setup_testing_defaults
+
+    environ = {'PATH_INFO': path, 'REQUEST_METHOD': 'GET'}
+    setup_testing_defaults(environ)
+    status = []
+
+    def start_response(status_line, headers, exc_info=None):
+        status.append(status_line)
+
+    started = time.perf_counter()
+    result = application(environ, start_response)
+    try:
+        for chunk in result:
+            pass
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    return time.perf_counter() - started, status[0]
+
+
+def measure(paths, repeat):
+    """Child process: time setup, warm-up and requests (returns a dict)"""
+    started = time.perf_counter()
+    from django.core.wsgi import get_wsgi_application
+    application = get_wsgi_application()
+    setup_done = time.perf_counter()
+
+    from gym_app.warmup import warm_on_startup
+    warmed = warm_on_startup()
+    warm_done = time.perf_counter()
+
+    pages = {}
+    for path in paths:
+        first, status = _request(application, path)
+        timings = [_request(application, path)[0] for _ in range(repeat)]
+        pages[path] = {
+            'status': status,
+            'first_ms': first * 1000,
+            'steady_ms': statistics.median(timings) * 1000 if timings else None,
+        }
+
+    from django.conf import settings
+    database = settings.DATABASES['default']
+    return {
+        'profile': {
+            'debug': settings.DEBUG,
+            'cache': settings.CACHES['default']['BACKEND'].rsplit('.', 1)[-1],
+            'conn_max_age': database.get('CONN_MAX_AGE', 0),
+            'sessions': settings.SESSION_ENGINE.rsplit('.', 1)[-1],
+            'template_loaders': 'cached' if settings.TEMPLATES[0]['OPTIONS'].get('loaders') else 'default',
+        },
+        'setup_ms': (setup_done - started) * 1000,
+        'warmup_ms': (warm_done - setup_done) * 1000,
+        'templates_warmed': len(warmed[0]) if warmed else 0,
+        'pages': pages,
+    }
+
+
+def run_profile(name, paths=None, repeat=20, runs=5, base_dir=None):
+    """Run ``runs`` fresh processes for a profile and take medians"""
+    settings_module, extra_env = PROFILES[name]
+    paths = paths or DEFAULT_PATHS
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings_module, **extra_env)
+    # The prod profile refuses to start without a key of its own
+    env.setdefault('DJANGO_SECRET_KEY', 'startup-benchmark-only')
+    command = [sys.executable, '-m', 'gym_app.startup_benchmark', str(repeat)] + list(paths)
+
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        output = subprocess.run(
+            command, env=env, cwd=base_dir, check=True, capture_output=True, text=True,
+        ).stdout
+        sample = json.loads(output.strip().splitlines()[-1])
+        sample['process_ms'] = (time.perf_counter() - started) * 1000
+        samples.append(sample)
+
+    def median(key, path=None):
+        values = [s['pages'][path][key] if path else s[key] for s in samples]
+        return statistics.median(values)
+
+    return {
+        'settings': settings_module,
+        'environment': extra_env,
+        'profile': samples[0]['profile'],
+        'runs': runs,
+        'process_ms': median('process_ms'),
+        'setup_ms': median('setup_ms'),
+        'warmup_ms': median('warmup_ms'),
+        'templates_warmed': samples[0]['templates_warmed'],
+        'pages': {
+            path: {
+                'status': samples[0]['pages'][path]['status'],
+                'first_ms': median('first_ms', path),
+                'steady_ms': median('steady_ms', path),
+            }
+            for path in paths
+        },
+    }
+
+
+if __name__ == '__main__':
+    print(json.dumps(measure(sys.argv[2:], int(sys.argv[1]))))
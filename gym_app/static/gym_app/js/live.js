@@ -0,0 +1,76 @@
+/*
+ * Live tallies for the dashboards and the attendance report.
+ *
+ * The page renders its counts once; this keeps them current from the
+ * server-sent event stream instead of re-querying. The container carries
+ * the stream URL (resuming after the event id the page was rendered with)
+ * and the business date; counters are elements with data-live="<name>" and
+ * their raw value in data-value.
+ */
+(function () {
+    'use strict';
+
+    const root = document.querySelector('[data-live-events]');
+    if (!root || !window.EventSource) {
+        return;
+    }
+
+    const counters = {};
+    root.querySelectorAll('[data-live]').forEach(function (el) {
+        counters[el.dataset.live] = el;
+    });
+
+    function bump(name, amount) {
+        const el = counters[name];
+        if (!el) {
+            return;
+        }
+        const value = parseFloat(el.dataset.value) + amount;
+        el.dataset.value = value;
+        const decimals = el.dataset.decimals ? parseInt(el.dataset.decimals, 10) : 0;
+        el.textContent = (el.dataset.prefix || '') + value.toFixed(decimals);
+        el.classList.remove('live-updated');
+        void el.offsetWidth;
+        el.classList.add('live-updated');
+    }
+
+    const handlers = {
+        checkin: function (data) {
+            bump('currently_checked_in', 1);
+            bump('today_checkins', 1);
+            if (data.walk_in) {
+                bump('today_walkin_checkins', 1);
+            }
+        },
+        checkout: function () {
+            bump('currently_checked_in', -1);
+        },
+        sale: function (data) {
+            const amount = parseFloat(data.amount);
+            bump('today_revenue', amount);
+            bump('month_revenue', amount);
+            if (data.kind === 'membership') {
+                bump('today_payments', 1);
+                if (!data.renewal) {
+                    bump('active_memberships', 1);
+                }
+            } else {
+                bump('today_walkins', data.count || 1);
+            }
+        },
+    };
+
+    const source = new EventSource(root.dataset.liveEvents);
+    Object.keys(handlers).forEach(function (type) {
+        source.addEventListener(type, function (message) {
+            const data = JSON.parse(message.data);
+            if (data.date !== root.dataset.liveDate) {
+                // A new business day: today's counts start over on the server
+                source.close();
+                window.location.reload();
+                return;
+            }
+            handlers[type](data);
+        });
+    });
+})();
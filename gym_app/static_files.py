@@ -0,0 +1,143 @@
+"""
+Static file serving for deployments without a separate web server.
+
+``StaticFilesMiddleware`` answers requests under ``STATIC_URL`` straight
+from ``STATIC_ROOT`` before sessions, auth or any view code runs. Files
+whose names carry a content hash (everything ``{% static %}`` produces with
+the manifest storage) are sent with a one-year ``immutable`` cache lifetime,
+so browsers never ask for them again until a release changes the hash.
+Other files get a short lifetime. Clients that accept brotli or gzip get the
+``.br``/``.gz`` copies written by ``storage.CompressedManifestStaticFilesStorage``.
+
+Enabled with ``SERVE_STATIC_FILES`` (the production profile sets it).
+"""
+
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import unquote
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+# Manifest storage inserts a 12 character hex hash before the extension
+_HASHED_NAME = re.compile(r'\.[0-9a-f]{12}\.[^./]+$')
+
+# Accept-Encoding token -> (file suffix, Content-Encoding), in preference order
+_ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def accepted_encodings(header):
+    """q-value of every token in an Accept-Encoding header (``gzip;q=0`` refuses gzip)"""
+    weights = {}
+    for part in header.split(','):
+        token, _, params = part.partition(';')
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[token] = q
+    return weights
+
+
+class StaticFilesMiddleware:
+    """Serve ``STATIC_ROOT`` with far-future cache headers and precompressed variants"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'SERVE_STATIC_FILES', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.prefix = '/' + settings.STATIC_URL.lstrip('/')
+        self.root = os.path.abspath(settings.STATIC_ROOT)
+        self.short_max_age = getattr(settings, 'STATIC_FILES_MAX_AGE', 60)
+        # url path -> {'': path, '.gz': path, '.br': path}. Only files that
+        # exist are kept: the paths requested are up to the client.
+        self._files = {}
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        response = self.match(request)
+        if response is not None:
+            return response
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        response = self.match(request)
+        if response is not None:
+            return response
+        return await self.get_response(request)
+
+    def match(self, request):
+        if request.method in ('GET', 'HEAD') and request.path_info.startswith(self.prefix):
+            return self.serve(request, request.path_info[len(self.prefix):])
+        return None
+
+    def find(self, name):
+        """Paths of a static file and its compressed copies (found files are cached per process)"""
+        normalized = posixpath.normpath(unquote(name)).lstrip('/')
+        # Keyed on the file, not the URL, so "a/../x.css" adds no entry
+        if normalized in self._files:
+            return self._files[normalized]
+
+        path = os.path.abspath(os.path.join(self.root, *normalized.split('/')))
+        if not (path.startswith(self.root + os.sep) and os.path.isfile(path)):
+            return None
+        variants = {'': path}
+        for token, suffix in _ENCODINGS:
+            if os.path.isfile(path + suffix):
+                variants[suffix] = path + suffix
+        self._files[normalized] = variants
+        return variants
+
+    def serve(self, request, name):
+        variants = self.find(name)
+        if variants is None:
+            return None
+
+        path, encoding, best = variants[''], None, 0
+        weights = accepted_encodings(request.headers.get('Accept-Encoding', ''))
+        for token, suffix in _ENCODINGS:
+            q = weights.get(token, weights.get('*', 0))
+            if suffix in variants and q > best:
+                path, encoding, best = variants[suffix], token, q
+
+        stat = os.stat(path)
+        if not was_modified_since(request.headers.get('If-Modified-Since'), stat.st_mtime):
+            response = HttpResponseNotModified()
+        else:
+            response = FileResponse(open(path, 'rb'))
+            response['Content-Length'] = str(stat.st_size)
+            if encoding:
+                response['Content-Encoding'] = encoding
+        content_type, _ = mimetypes.guess_type(variants[''])
+        response['Content-Type'] = content_type or 'application/octet-stream'
+        response['Last-Modified'] = http_date(stat.st_mtime)
+        if len(variants) > 1:
+            response['Vary'] = 'Accept-Encoding'
+        if _HASHED_NAME.search(name):
+            response['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+        else:
+            response['Cache-Control'] = f'public, max-age={self.short_max_age}'
+        return response
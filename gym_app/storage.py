@@ -0,0 +1,63 @@
+"""
+Static file storage with precompressed variants.
+
+``CompressedManifestStaticFilesStorage`` is Django's manifest storage
+(content-hashed names) that additionally writes ``.gz`` and, when the
+optional ``brotli`` package is installed, ``.br`` copies of every text
+asset during ``collectstatic``. ``StaticFilesMiddleware`` in
+``static_files.py`` serves those variants to clients that accept them.
+"""
+
+import gzip
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.svg', '.txt', '.json', '.xml', '.html', '.map')
+
+# Not worth a second request-time file lookup below this
+MIN_COMPRESS_SIZE = 256
+
+
+def compress_file(path):
+    """Write ``path.gz`` (and ``path.br``) next to ``path`` when smaller. Returns the paths written."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < MIN_COMPRESS_SIZE:
+        return []
+
+    variants = [('.gz', lambda raw: gzip.compress(raw, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append(('.br', lambda raw: brotli.compress(raw, quality=11)))
+
+    written = []
+    for suffix, compress in variants:
+        compressed = compress(data)
+        if len(compressed) < len(data):
+            with open(path + suffix, 'wb') as f:
+                f.write(compressed)
+            written.append(path + suffix)
+    return written
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Hashed file names plus gzip/brotli copies of text assets"""
+
+    def post_process(self, paths, dry_run=False, **options):
+        processed = []
+        for name, hashed_name, result in super().post_process(paths, dry_run, **options):
+            processed.append(hashed_name)
+            yield name, hashed_name, result
+
+        if dry_run:
+            return
+        # Both the original and the hashed copy are served (the original by
+        # name for anything not going through {% static %})
+        for name in set(paths) | {name for name in processed if name}:
+            if name.endswith(COMPRESSIBLE_EXTENSIONS) and self.exists(name):
+                compress_file(self.path(name))
@@ -0,0 +1,155 @@
+"""
+Membership subscriptions and renewals.
+
+``subscribe`` is the whole sale as one transaction and one commit: the
+coverage check, the membership and payment rows, the revenue ledger line
+(``ledger.py``) and the queued side
+effects (one batched audit task, PIN, receipt, analytics; see ``tasks.py``)
+either all land or none do.
+
+A member who is still covered can buy ahead: the new plan is queued as
+``scheduled`` and starts on the day their coverage ends
+(``MembershipCoverage.end_date``). ``UserMembership.roll_over`` (run by
+``expire_memberships``) makes it active when it is due.
+
+The renewal form carries the start date it was shown with. If the member's
+coverage moved on in the meantime (most often because the same form was
+submitted twice), nothing is charged and ``AlreadySubscribed`` is raised.
+Two submissions for the same member cannot race: the member row is locked
+with ``SELECT ... FOR UPDATE`` on databases that have it, and SQLite takes
+its write lock when the transaction begins (``transaction_mode``
+``IMMEDIATE`` in settings). The partial unique constraint on active
+memberships backs both up at the database level.
+"""
+
+from datetime import date
+
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+
+from . import events, ledger, tasks
+from .models import User, UserMembership, MembershipCoverage, Payment
+from .taskqueue import enqueue
+
+
+PAYMENT_METHODS = {value for value, label in Payment.PAYMENT_METHOD_CHOICES}
+
+# The partial unique index on UserMembership that lets one membership be active
+ACTIVE_MEMBERSHIP_CONSTRAINT = 'one_active_membership_per_user'
+
+
+class AlreadySubscribed(Exception):
+    """The member's coverage changed since the form was shown"""
+
+
+def current_coverage(user, today=None):
+    """The member's coverage interval if it has not ended yet, else None"""
+    return MembershipCoverage.objects.filter(user=user, end_date__gte=today or date.today()).first()
+
+
+def renewal_start(coverage, today=None):
+    """Day a plan bought now starts: when the coverage ends, or today"""
+    return coverage.end_date if coverage is not None else today or date.today()
+
+
+def _violates_active_membership(error):
+    """Whether ``error`` came from ``ACTIVE_MEMBERSHIP_CONSTRAINT``"""
+    diag = getattr(error.__cause__, 'diag', None)
+    if getattr(diag, 'constraint_name', None):
+        return diag.constraint_name == ACTIVE_MEMBERSHIP_CONSTRAINT
+    message = str(error)
+    # SQLite names the indexed column of a partial index, not the index
+    return ACTIVE_MEMBERSHIP_CONSTRAINT in message or (
+        message.startswith('UNIQUE constraint failed') and
+        message.endswith(f'{UserMembership._meta.db_table}.user_id')
+    )
+
+
+def subscribe(user, plan, payment_method, reference_no='', request=None, starts_on=None):
+    """
+    Subscribe ``user`` to a catalog ``plan`` and record the payment.
+
+    A member who is still covered gets the plan queued after their current
+    coverage. ``starts_on`` is the start date the member was shown (today
+    when omitted); ``AlreadySubscribed`` is raised if it no longer holds.
+    ``ValueError`` is raised for a payment method not in
+    ``Payment.PAYMENT_METHOD_CHOICES``. Returns the new ``Payment``.
+    """
+    if payment_method not in PAYMENT_METHODS:
+        raise ValueError(f'Unknown payment method: {payment_method!r}')
+
+    today = date.today()
+    try:
+        with transaction.atomic():
+            if connection.features.has_select_for_update:
+                User.objects.select_for_update().filter(pk=user.pk).exists()
+            # A plan that lapsed before the expiry job got to it
+            UserMembership.objects.filter(user=user, status='active', end_date__lt=today).update(status='expired')
+            
+            coverage = current_coverage(user, today)
+            start_date = renewal_start(coverage, today)
+            if start_date != (starts_on or today):
+                raise AlreadySubscribed
+
+            membership = UserMembership.objects.create(
+                user=user,
+                plan=plan.as_model(),
+                start_date=start_date,
+                status='active' if coverage is None else 'scheduled'
+            )
+            payment = Payment.objects.create(
+                user=user,
+                membership=membership,
+                amount=plan.price,
+                method=payment_method,
+                reference_no=reference_no,
+                payment_date=timezone.now()
+            )
+            ledger.record([payment])
+
+            enqueue(
+                tasks.write_audit_logs.defer(entries=[
+                    tasks.audit_entry(
+                        action='membership_created',
+                        user=user,
+                        description=(
+                            f'Subscribed to {plan.name} - ₱{plan.price}' if coverage is None else
+                            f'Renewal queued: {plan.name} from {start_date:%b %d, %Y} - ₱{plan.price}'
+                        ),
+                        severity='info',
+                        request=request,
+                        model_name='UserMembership',
+                        object_id=membership.id,
+                        object_repr=str(membership),
+                        plan_name=plan.name,
+                        start_date=start_date.isoformat(),
+                        amount=float(plan.price)
+                    ),
+                    tasks.audit_entry(
+                        action='payment_received',
+                        user=user,
+                        description=f'Payment received: ₱{plan.price} via {payment_method}',
+                        severity='info',
+                        request=request,
+                        model_name='Payment',
+                        object_id=payment.id,
+                        object_repr=str(payment),
+                        amount=float(plan.price),
+                        payment_method=payment_method
+                    ),
+                ]),
+                tasks.assign_kiosk_pin.defer(user_id=user.id) if not user.kiosk_pin else None,
+                tasks.send_payment_receipt.defer(payment_id=payment.id),
+                tasks.refresh_daily_analytics.defer(day=today.isoformat()),
+            )
+
+            events.publish_on_commit(
+                'sale', kind='membership', item=plan.name, amount=plan.price, method=payment_method,
+                renewal=coverage is not None,
+            )
+    except IntegrityError as e:
+        # Lost the race on the active-membership constraint
+        if _violates_active_membership(e) and current_coverage(user, today) is not None:
+            raise AlreadySubscribed
+        raise
+    return payment
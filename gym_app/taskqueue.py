@@ -0,0 +1,204 @@
+"""
+Background task queue.
+
+Side effects a request does not have to wait for (audit log entries, PIN
+generation, receipts, analytics refreshes) are stored as ``Task`` rows and
+run by ``python manage.py run_tasks``. The database is the broker, so there
+is nothing else to deploy.
+
+Define a task with ``@task``, then queue calls as part of the surrounding
+transaction:
+
+    @task
+    def send_payment_receipt(payment_id): ...
+
+    with transaction.atomic():
+        payment = Payment.objects.create(...)
+        enqueue(send_payment_receipt.defer(payment_id=payment.id))
+
+Every call queued by one ``enqueue`` is inserted with a single statement
+in the caller's transaction: the worker sees the tasks once it commits, a
+rolled-back request queues nothing, and the sale and its follow-up work
+cost one commit. Arguments are stored as JSON: pass ids and plain values,
+not model instances.
+
+A failing task is retried with exponential backoff (``TASK_RETRY_DELAY``
+seconds, doubled per attempt) until ``max_attempts``, then marked failed
+with its traceback. Tasks left ``running`` by a worker that died are
+requeued after ``TASK_STALE_AFTER`` seconds. With ``TASKS_EAGER`` every
+task runs in-process right after the commit instead (a failing one is
+saved as a Task row for the worker to retry); the dev settings do that,
+production needs the worker running.
+"""
+
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Task
+
+
+logger = logging.getLogger('gym_app.tasks')
+
+# task name -> function
+registry = {}
+
+
+def task(func=None, *, max_attempts=None):
+    """
+    Register a function as a task and give it ``defer(**kwargs)``.
+
+    ``defer`` returns an unsaved ``Task`` for ``enqueue``.
+    """
+    def decorator(func):
+        name = f'{func.__module__}.{func.__name__}'
+        registry[name] = func
+
+        def defer(delay=None, **kwargs):
+            now = timezone.now()
+            return Task(
+                name=name,
+                kwargs=kwargs,
+                max_attempts=max_attempts or getattr(settings, 'TASK_MAX_ATTEMPTS', 5),
+                run_after=now + timedelta(seconds=delay) if delay else now,
+                created_at=now,
+            )
+
+        func.task_name = name
+        func.defer = defer
+        return func
+
+    return decorator(func) if func is not None else decorator
+
+
+def enqueue(*tasks):
+    """Insert the deferred tasks as part of the current transaction"""
+    tasks = [t for t in tasks if t is not None]
+    if not tasks:
+        return
+    if getattr(settings, 'TASKS_EAGER', False):
+        transaction.on_commit(lambda: run_eagerly(tasks))
+    else:
+        Task.objects.bulk_create(tasks)
+
+
+# ---------- Worker side ----------
+
+def retry_delay(attempts):
+    """Seconds before retry number ``attempts``"""
+    return getattr(settings, 'TASK_RETRY_DELAY', 30) * 2 ** (attempts - 1)
+
+
+def claim_next():
+    """
+    Mark the next due task as running and return it (``None`` when idle).
+
+    The conditional UPDATE is the lock: when two workers pick the same row
+    only one of them updates it.
+    """
+    now = timezone.now()
+    due = (Task.objects.filter(status='pending', run_after__lte=now)
+           .order_by('run_after', 'id').values_list('id', flat=True)[:10])
+    for task_id in due:
+        claimed = Task.objects.filter(id=task_id, status='pending').update(
+            status='running', started_at=now, attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return Task.objects.get(id=task_id)
+    return None
+
+
+def execute(task):
+    """Run one task's function in a transaction (raises on failure)"""
+    func = registry.get(task.name)
+    if func is None:
+        raise LookupError(f'Unknown task "{task.name}"')
+    with transaction.atomic():
+        func(**task.kwargs)
+
+
+def _record_failure(task, error):
+    """Schedule a retry of a failed task, or mark it failed after its last attempt"""
+    now = timezone.now()
+    if task.attempts < task.max_attempts and task.name in registry:
+        task.status = 'pending'
+        task.run_after = now + timedelta(seconds=retry_delay(task.attempts))
+        logger.warning('Task %s #%s failed (attempt %s/%s), retrying',
+                       task.name, task.id, task.attempts, task.max_attempts)
+    else:
+        task.status = 'failed'
+        task.finished_at = now
+        logger.error('Task %s #%s failed permanently:\n%s', task.name, task.id, error)
+    task.last_error = error
+    if task.pk is None:
+        # An eager task only gets a row when it fails
+        task.save()
+    else:
+        task.save(update_fields=['status', 'run_after', 'finished_at', 'last_error'])
+
+
+def run_task(task):
+    """Run a claimed task and record the outcome. Returns True on success."""
+    try:
+        execute(task)
+    except Exception:
+        _record_failure(task, traceback.format_exc())
+        return False
+
+    task.status = 'done'
+    task.finished_at = timezone.now()
+    task.last_error = ''
+    task.save(update_fields=['status', 'finished_at', 'last_error'])
+    return True
+
+
+def run_eagerly(tasks):
+    """
+    TASKS_EAGER: run each task in-process after the commit. A failure never
+    reaches the request, whose sale is already committed, nor stops the
+    other tasks: it is stored as a Task row that the worker retries.
+    """
+    for task in tasks:
+        task.status = 'running'
+        task.attempts += 1
+        task.started_at = timezone.now()
+        try:
+            execute(task)
+        except Exception:
+            _record_failure(task, traceback.format_exc())
+
+
+def run_pending(limit=None):
+    """Run due tasks until the queue is idle (or ``limit``). Returns (done, failed)."""
+    done = failed = 0
+    while limit is None or done + failed < limit:
+        task = claim_next()
+        if task is None:
+            break
+        if run_task(task):
+            done += 1
+        else:
+            failed += 1
+    return done, failed
+
+
+def requeue_stale(stale_after=None):
+    """Put tasks left running by a dead worker back in the queue"""
+    stale_after = stale_after or getattr(settings, 'TASK_STALE_AFTER', 600)
+    cutoff = timezone.now() - timedelta(seconds=stale_after)
+    return Task.objects.filter(status='running', started_at__lt=cutoff).update(
+        status='pending', run_after=timezone.now(),
+    )
+
+
+def purge_finished(days=None):
+    """Delete finished tasks older than ``TASK_RETENTION_DAYS`` (failed ones are kept)"""
+    days = days if days is not None else getattr(settings, 'TASK_RETENTION_DAYS', 7)
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = Task.objects.filter(status='done', finished_at__lt=cutoff).delete()
+    return deleted
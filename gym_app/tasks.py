@@ -0,0 +1,80 @@
+"""
+Tasks run by the ``run_tasks`` worker (see ``taskqueue.py``).
+"""
+
+from datetime import date
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import IntegrityError, transaction
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .models import User, Payment, Analytics, AuditLog
+from .taskqueue import task
+
+
+@task
+def write_audit_logs(entries):
+    """Insert the audit log entries of one request in a single statement"""
+    AuditLog.objects.bulk_create([AuditLog(**fields) for fields in entries])
+
+
+def audit_entry(action, user=None, description='', severity='info',
+                request=None, model_name=None, object_id=None, object_repr=None, **extra_data):
+    """
+    Fields of an ``AuditLog.log()`` call (same arguments), for ``write_audit_logs``.
+
+    The client details and the timestamp are taken now, not when the
+    worker gets to it.
+    """
+    fields = AuditLog._entry_fields(
+        action, user, description, severity, request, model_name, object_id, object_repr, extra_data
+    )
+    user = fields.pop('user')
+    fields['user_id'] = user.id if user is not None else None
+    fields['timestamp'] = timezone.now().isoformat()
+    return fields
+
+
+# Fresh PINs tried before the task fails and is retried by the queue
+PIN_ATTEMPTS = 3
+
+
+@task
+def assign_kiosk_pin(user_id):
+    """Give a member a kiosk PIN if they don't have one yet"""
+    user = User.objects.get(id=user_id)
+    if user.kiosk_pin:
+        return
+    # Another worker can take the same PIN between the check and the save
+    for attempt in range(PIN_ATTEMPTS):
+        [user.kiosk_pin] = User.allocate_kiosk_pins(1)
+        try:
+            with transaction.atomic():
+                user.save(update_fields=['kiosk_pin'])
+            return
+        except IntegrityError:
+            if attempt == PIN_ATTEMPTS - 1:
+                raise
+
+
+@task
+def send_payment_receipt(payment_id):
+    """E-mail a member the receipt for a payment"""
+    payment = Payment.objects.select_related('user', 'membership__plan').get(id=payment_id)
+    if not payment.user.email:
+        return
+    context = {'payment': payment, 'user': payment.user, 'membership': payment.membership}
+    send_mail(
+        subject=f'Payment receipt #{payment.id}',
+        message=render_to_string('gym_app/emails/payment_receipt.txt', context),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        recipient_list=[payment.user.email],
+    )
+
+
+@task
+def refresh_daily_analytics(day):
+    """Recompute the Analytics row for a day after a sale"""
+    Analytics.generate_daily_report(date.fromisoformat(day))
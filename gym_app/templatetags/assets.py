@@ -0,0 +1,27 @@
+from django import template
+from django.conf import settings
+from django.templatetags.static import static
+from django.utils.html import format_html_join
+
+from gym_app.assets import CSS_BUNDLES, bundle_path
+
+
+register = template.Library()
+
+
+@register.simple_tag
+def css_bundle(name):
+    """
+    Stylesheet link(s) for a CSS bundle.
+
+    Usage:
+        {% load assets %}
+        {% css_bundle 'reports' %}
+    """
+    if name not in CSS_BUNDLES:
+        raise template.TemplateSyntaxError(f'Unknown CSS bundle "{name}"')
+    if getattr(settings, 'CSS_BUNDLES_ENABLED', False):
+        paths = [bundle_path(name)]
+    else:
+        paths = CSS_BUNDLES[name]
+    return format_html_join('\n    ', '<link rel="stylesheet" href="{}">', ((static(path),) for path in paths))
@@ -1,3 +1,1777 @@
-from django.test import TestCase
+import asyncio
+import io
+import logging
+import os
+import tempfile
+import threading
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import (
+    User, MembershipPlan, FlexibleAccess, UserMembership, MembershipCoverage,
+    Payment, WalkInPayment, AuditLog, Attendance, CohortRetention, ExpiryNotice
+)
+from . import cohorts, ledger, notifications
+from .catalog import catalog
+from .querybudget import QueryBudgetTestMixin, normalize_sql
+
+
+# Enough rows per relation that a per-row query would trip the N+1 check
+ROWS = 8
+
+
+class ViewBenchmarkTests(TransactionTestCase):
+    """The view benchmark runs every scenario at the tiny scale"""
+
+    def test_tiny_scale_runs_every_scenario(self):
+        from .benchmarks import SCALES, SCENARIOS, run_scenario, seed
+        # seed() flushes the database, which TestCase's transaction would not survive
+        fixtures = seed(SCALES['tiny'], stdout=io.StringIO())
+
+        for name in SCENARIOS:
+            with self.subTest(name):
+                result = run_scenario(fixtures, name, repeat=2)
+                self.assertLess(result['status'], 400)
+                self.assertGreater(result['queries'], 0)
+
+        # Reset before every call, so each one was a check-in
+        checkins = Attendance.objects.filter(user=fixtures.users['member'])
+        self.assertEqual(checkins.count(), 1)
+        self.assertIsNone(checkins.get().check_out)
+
+
+class QueryBudgetTests(QueryBudgetTestMixin, TestCase):
+    """Every page stays within its query budget and has no N+1 patterns"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', 'admin@example.com', 'pw', role='admin')
+        cls.staff = User.objects.create_user('staff', 'staff@example.com', 'pw', role='staff', is_staff=True)
+
+        plans = [
+            MembershipPlan.objects.create(name=f'Plan {i}', duration_days=30 * (i + 1), price=Decimal(1000 + i))
+            for i in range(ROWS)
+        ]
+        passes = [
+            FlexibleAccess.objects.create(name=f'Pass {i}', duration_days=i + 1, price=Decimal(100 + i))
+            for i in range(ROWS)
+        ]
+
+        today = date.today()
+        cls.members = []
+        for i in range(ROWS):
+            member = User.objects.create_user(
+                f'member{i}', f'member{i}@example.com', 'pw',
+                first_name='Member', last_name=str(i), role='member',
+            )
+            cls.members.append(member)
+            for j, plan in enumerate(plans[:3]):
+                membership = UserMembership.objects.create(
+                    user=member, plan=plan,
+                    start_date=today - timedelta(days=30 * (3 - j)) + timedelta(days=i),
+                    status='active' if j == 2 else 'expired',
+                )
+                Payment.objects.create(user=member, membership=membership, amount=plan.price, method='cash')
+            Attendance.objects.create(user=member)
+            AuditLog.log('login', user=member, description='Logged in')
+        cls.member = cls.members[0]
+        cls.member.generate_kiosk_pin()
+
+        for pass_type in passes:
+            WalkInPayment.objects.create(pass_type=pass_type, amount=pass_type.price, method='cash')
+        ledger.rebuild()
+
+    def assertPageWithinBudget(self, url_name, user=None, args=None, data=None):
+        if user is not None:
+            self.client.force_login(user)
+        url = reverse(url_name, args=args)
+        with self.assertWithinQueryBudget(url_name):
+            response = self.client.get(url, data or {})
+        self.assertEqual(response.status_code, 200)
+
+    def assertPostWithinBudget(self, url_name, data, redirect_to, args=None):
+        # Start from a cold catalog so loading it counts towards the budget
+        cache.clear()
+        catalog.invalidate()
+        with self.assertWithinQueryBudget(url_name):
+            response = self.client.post(reverse(url_name, args=args), data)
+        self.assertRedirects(response, redirect_to, fetch_redirect_response=False)
+
+    def test_public_pages(self):
+        self.assertPageWithinBudget('home')
+        self.assertPageWithinBudget('about')
+        self.assertPageWithinBudget('login')
+        self.assertPageWithinBudget('kiosk_login')
+
+    def test_home_logged_in(self):
+        # Session and user lookups, plus loading the catalog from cold
+        cache.clear()
+        catalog.invalidate()
+        self.assertPageWithinBudget('home', self.member)
+
+    def test_dashboards(self):
+        for user in (self.admin, self.staff, self.member):
+            with self.subTest(role=user.role):
+                self.assertPageWithinBudget('dashboard', user)
+
+    def test_member_pages(self):
+        cache.clear()
+        catalog.invalidate()
+        self.assertPageWithinBudget('membership_plans', self.member)
+        self.assertPageWithinBudget('member_detail', self.staff, args=[self.member.id])
+
+    def test_staff_pages(self):
+        self.assertPageWithinBudget('members_list', self.staff, data={'search': 'member'})
+        self.assertPageWithinBudget('walkin_purchase', self.staff)
+        self.assertPageWithinBudget('manage_plans', self.staff)
+        self.assertPageWithinBudget('attendance_report', self.staff, data={'user': 'member'})
+
+    def test_admin_pages(self):
+        self.assertPageWithinBudget('reports', self.admin)
+        self.assertPageWithinBudget('revenue_report', self.admin, data={'rows': 'item', 'grain': 'month'})
+        self.assertPageWithinBudget('retention_report', self.admin, data={'curve': 'churned'})
+        self.assertPageWithinBudget('audit_trail', self.admin, data={'user': 'member'})
+
+    def test_dashboard_endpoints(self):
+        for user in (self.admin, self.staff):
+            with self.subTest(role=user.role):
+                self.assertPageWithinBudget('dashboard_summary', user)
+                self.assertPageWithinBudget('dashboard_attendance', user)
+
+    def test_walkin_sale(self):
+        # GCash has no summary row yet today, so the ledger inserts one
+        self.client.force_login(self.staff)
+        pass_type = FlexibleAccess.objects.first()
+        self.assertPostWithinBudget(
+            'walkin_purchase', {'pass_id': pass_type.id, 'payment_method': 'gcash'}, reverse('walkin_confirm'),
+        )
+        self.assertPostWithinBudget('walkin_confirm', {'action': 'confirm'}, reverse('walkin_purchase'))
+        self.assertTrue(WalkInPayment.objects.filter(pass_type=pass_type, method='gcash').exists())
+
+    def test_subscribe(self):
+        newcomer = User.objects.create_user('newcomer', 'newcomer@example.com', 'pw', role='member')
+        plan = MembershipPlan.objects.first()
+        self.client.force_login(newcomer)
+        self.assertPostWithinBudget(
+            'subscribe_plan', {'payment_method': 'gcash'}, reverse('dashboard'), args=[plan.id],
+        )
+        self.assertTrue(UserMembership.objects.filter(user=newcomer, status='active').exists())
+
+        # A covered member's renewal is queued after their coverage
+        self.client.force_login(self.member)
+        self.assertPostWithinBudget(
+            'subscribe_plan',
+            {'payment_method': 'gcash', 'starts_on': self.member.coverage.end_date.isoformat()},
+            reverse('dashboard'), args=[plan.id],
+        )
+        self.assertTrue(UserMembership.objects.filter(user=self.member, status='scheduled').exists())
+
+    def test_walkin_batch(self):
+        from .models import WalkInBatch
+        # Five passes of three types, none sold for GCash yet today
+        self.client.force_login(self.staff)
+        pass_ids = [pass_type.id for pass_type in FlexibleAccess.objects.order_by('id')[:3]]
+        lines = [pass_ids[i % 3] for i in range(5)]
+        data = {
+            'payment_method': 'gcash',
+            'pass_id': lines,
+            'customer_name': [f'Guest {i}' for i in range(5)],
+            'mobile_no': [''] * 5,
+        }
+        cache.clear()
+        catalog.invalidate()
+        with self.assertWithinQueryBudget('walkin_batch'):
+            response = self.client.post(reverse('walkin_batch'), data)
+        batch = WalkInBatch.objects.get()
+        self.assertRedirects(response, reverse('walkin_batch_receipt', args=[batch.id]), fetch_redirect_response=False)
+        self.assertEqual(batch.pass_count, 5)
+        self.assertPageWithinBudget('walkin_batch_receipt', args=[batch.id])
+
+    def test_kiosk_check_in(self):
+        url = reverse('kiosk_login')
+        with self.assertWithinQueryBudget('kiosk_login'):
+            response = self.client.post(url, {'kiosk_pin': self.member.kiosk_pin})
+        self.assertEqual(response.status_code, 302)
+
+    def test_kiosk_walkin_check_in(self):
+        from .models import WalkInPassCode
+        [pass_code] = WalkInPassCode.issue([WalkInPayment.objects.first()])
+        with self.assertWithinQueryBudget('kiosk_login'):
+            response = self.client.post(reverse('kiosk_login'), {'kiosk_pin': pass_code.code})
+        url = reverse('kiosk_walkin_success', args=['checkin', 0, pass_code.payment_id])
+        self.assertRedirects(response, url, fetch_redirect_response=False)
+        with self.assertWithinQueryBudget('kiosk_walkin_success'):
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_n_plus_one_is_detected(self):
+        with self.assertRaises(AssertionError):
+            with self.assertNoNPlusOne():
+                for payment in Payment.objects.all():
+                    payment.membership.plan.name
+
+    def test_normalize_sql(self):
+        self.assertEqual(
+            normalize_sql('SELECT * FROM "users" WHERE "id" IN (%s, %s, %s) LIMIT 21'),
+            'SELECT * FROM "users" WHERE "id" IN (...) LIMIT ?',
+        )
+
+
+class ProfilingTests(TestCase):
+    """Histogram accuracy and the metrics endpoints"""
+
+    def test_histogram_percentiles(self):
+        from .profiling import Histogram
+        histogram = Histogram()
+        for value in range(1, 10001):
+            histogram.record(value)
+        # Buckets are accurate to within ~6%
+        self.assertAlmostEqual(histogram.percentile(50), 5000, delta=5000 * 0.07)
+        self.assertAlmostEqual(histogram.percentile(99), 9900, delta=9900 * 0.07)
+        self.assertEqual(histogram.max, 10000)
+
+    def test_metrics_pages_require_admin(self):
+        member = User.objects.create_user('member', 'member@example.com', 'pw', role='member')
+        self.client.force_login(member)
+        self.assertRedirects(self.client.get(reverse('metrics')), reverse('dashboard'), fetch_redirect_response=False)
+        self.assertEqual(self.client.get(reverse('metrics_prometheus')).status_code, 403)
+
+    def test_requests_are_recorded(self):
+        from .profiling import registry
+        registry.reset()
+        admin = User.objects.create_user('admin', 'admin@example.com', 'pw', role='admin')
+        self.client.force_login(admin)
+        self.client.get(reverse('home'))
+
+        response = self.client.get(reverse('metrics'))
+        self.assertContains(response, 'home')
+        response = self.client.get(reverse('metrics_prometheus'))
+        self.assertContains(response, 'gym_request_latency_seconds{view="home",quantile="0.95"}')
+
+
+    def test_prometheus_token(self):
+        url = reverse('metrics_prometheus')
+        with self.settings(PROFILING_METRICS_TOKEN='s3cret'):
+            self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer s3cret').status_code, 200)
+            self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer s3cre').status_code, 403)
+            self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer sécret').status_code, 403)
+            self.assertEqual(self.client.get(url).status_code, 403)
+
+class SlowQueryLogTests(TestCase):
+    """Slow statements are logged with their view, origin and plan"""
+
+    def test_log_directory_is_created_on_first_write(self):
+        from .slowqueries import SlowQueryFileHandler
+        with tempfile.TemporaryDirectory() as log_dir:
+            filename = os.path.join(log_dir, 'logs', 'slow_queries.log')
+            handler = SlowQueryFileHandler(filename, delay=True)
+            self.assertFalse(os.path.exists(os.path.dirname(filename)))
+            handler.handle(logging.makeLogRecord({'msg': 'slow'}))
+            handler.close()
+            with open(filename, encoding='utf-8') as f:
+                self.assertEqual(f.read(), 'slow\n')
+
+    def test_slow_select_is_logged_with_plan(self):
+        import json
+        from .slowqueries import SlowQueryLogger
+
+        with self.assertLogs('gym_app.slow_queries', level='WARNING') as logs:
+            with connection.execute_wrapper(SlowQueryLogger(threshold_ms=0)):
+                list(AuditLog.objects.filter(description__icontains='login'))
+
+        entry = json.loads(logs.records[0].getMessage())
+        self.assertIn('audit_logs', entry['sql'])
+        self.assertTrue(entry['plan'])
+        self.assertIn('gym_app/tests.py', entry['origin'])
+
+    def test_grouping_and_admin_page(self):
+        from .slowqueries import group_slow_queries
+        entries = [
+            {'sql': 'SELECT * FROM "t" WHERE "id" = 1', 'duration_ms': 150.0, 'view': 'reports'},
+            {'sql': 'SELECT * FROM "t" WHERE "id" = 2', 'duration_ms': 250.0, 'view': 'audit_trail'},
+        ]
+        groups = group_slow_queries(entries)
+        self.assertEqual(len(groups), 1)
+        self.assertEqual(groups[0]['count'], 2)
+        self.assertEqual(groups[0]['max_ms'], 250.0)
+        self.assertEqual(groups[0]['views'], ['audit_trail', 'reports'])
+
+        admin = User.objects.create_user('admin', 'admin@example.com', 'pw', role='admin')
+        self.client.force_login(admin)
+        self.assertEqual(self.client.get(reverse('slow_queries')).status_code, 200)
+
+
+class CatalogCacheTests(TestCase):
+    """Catalog snapshots and catalog-versioned page caching"""
+
+    def setUp(self):
+        cache.clear()
+        self.plan = MembershipPlan.objects.create(name='Monthly', duration_days=30, price=Decimal('1500'))
+
+    def test_anonymous_home_is_cached(self):
+        self.client.get(reverse('home'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('home'))
+        self.assertContains(response, 'Monthly')
+
+    def test_plan_change_invalidates_cache(self):
+        self.client.get(reverse('home'))
+        self.plan.name = 'Monthly Plus'
+        self.plan.save()
+        self.assertContains(self.client.get(reverse('home')), 'Monthly Plus')
+
+        FlexibleAccess.objects.create(name='Day Pass', duration_days=1, price=Decimal('100'))
+        self.assertContains(self.client.get(reverse('home')), 'Day Pass')
+
+    def test_logged_in_users_are_not_served_the_anonymous_page(self):
+        self.client.get(reverse('home'))
+        member = User.objects.create_user('member', 'member@example.com', 'pw', role='member')
+        self.client.force_login(member)
+        self.assertContains(self.client.get(reverse('home')), 'Go to Dashboard')
+
+    def test_catalog_snapshots(self):
+        from .catalog import catalog
+        catalog.get_plan(self.plan.id)
+        with self.assertNumQueries(0):
+            plan = catalog.get_plan(str(self.plan.id))
+            self.assertEqual(plan.price, Decimal('1500'))
+            self.assertEqual(catalog.active_plans(), (plan,))
+        with self.assertRaises(AttributeError):
+            plan.price = Decimal('1')
+
+        self.plan.is_active = False
+        self.plan.save()
+        self.assertIsNone(catalog.get_plan(self.plan.id))
+        self.assertEqual(catalog.get_plan(self.plan.id, active_only=False).id, self.plan.id)
+
+    def test_subscribe_through_catalog(self):
+        member = User.objects.create_user('member', 'member@example.com', 'pw', role='member')
+        self.client.force_login(member)
+        response = self.client.post(
+            reverse('subscribe_plan', args=[self.plan.id]), {'payment_method': 'cash'},
+        )
+        self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+        membership = UserMembership.objects.get(user=member)
+        self.assertEqual(membership.end_date, membership.start_date + timedelta(days=30))
+        self.assertEqual(Payment.objects.get(membership=membership).amount, Decimal('1500'))
+
+
+class TemplateWarmupTests(TestCase):
+    """Every project template compiles"""
+
+    def test_all_templates_compile(self):
+        from .warmup import template_names, warm_templates
+        names = template_names()
+        self.assertIn('gym_app/base_sidebar.html', names)
+        loaded, errors, seconds = warm_templates(names)
+        self.assertEqual(errors, {})
+        self.assertEqual(len(loaded), len(names))
+
+
+class StaticAssetTests(TestCase):
+    """CSS bundles and the static file middleware"""
+
+    def test_minify_keeps_meaning(self):
+        from .assets import minify_css
+        css = '/* note */\n.a :hover ,\n.b > .c {\n  color : red;\n  width: calc(100% - 2px);\n}\n'
+        self.assertEqual(minify_css(css), '.a :hover,.b>.c{color :red;width:calc(100% - 2px)}')
+
+    def test_every_bundle_source_exists(self):
+        from django.contrib.staticfiles import finders
+        from .assets import CSS_BUNDLES
+        for name, paths in CSS_BUNDLES.items():
+            for path in paths:
+                self.assertIsNotNone(finders.find(path), f'{name}: {path}')
+
+    def test_page_links_bundle_when_enabled(self):
+        with self.settings(CSS_BUNDLES_ENABLED=True):
+            html = self.client.get(reverse('login')).content.decode()
+        self.assertIn('gym_app/dist/login.min.css', html)
+        self.assertNotIn('css/base/base.css', html)
+
+    def test_page_links_sources_when_disabled(self):
+        html = self.client.get(reverse('login')).content.decode()
+        self.assertIn('gym_app/css/base/base.css', html)
+        self.assertIn('gym_app/css/pages/login.css', html)
+
+    def test_middleware_serves_hashed_files_immutable(self):
+        import gzip
+        import os
+        import tempfile
+        from django.http import HttpResponse
+        from django.test import RequestFactory
+        from .static_files import StaticFilesMiddleware
+
+        with tempfile.TemporaryDirectory() as root:
+            body = b'.a{color:red}' * 50
+            with open(os.path.join(root, 'site.0123456789ab.css'), 'wb') as f:
+                f.write(body)
+            with open(os.path.join(root, 'site.0123456789ab.css.gz'), 'wb') as f:
+                f.write(gzip.compress(body))
+
+            with self.settings(SERVE_STATIC_FILES=True, STATIC_ROOT=root):
+                middleware = StaticFilesMiddleware(lambda request: HttpResponse(status=418))
+            factory = RequestFactory()
+
+            response = middleware(factory.get('/static/site.0123456789ab.css', HTTP_ACCEPT_ENCODING='gzip'))
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            self.assertIn('immutable', response['Cache-Control'])
+            self.assertEqual(response['Vary'], 'Accept-Encoding')
+            self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), body)
+            response.close()
+
+            response = middleware(factory.get('/static/site.0123456789ab.css'))
+            self.assertNotIn('Content-Encoding', response)
+            self.assertEqual(b''.join(response.streaming_content), body)
+            response.close()
+
+            for refused in ('gzip;q=0', 'br, gzip; q=0.0', 'identity'):
+                response = middleware(factory.get('/static/site.0123456789ab.css', HTTP_ACCEPT_ENCODING=refused))
+                self.assertNotIn('Content-Encoding', response, refused)
+                response.close()
+            response = middleware(factory.get('/static/site.0123456789ab.css', HTTP_ACCEPT_ENCODING='*;q=0.5'))
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            response.close()
+
+            self.assertEqual(middleware(factory.get('/static/../tests.py')).status_code, 418)
+            self.assertEqual(middleware(factory.get('/static/missing.css')).status_code, 418)
+            middleware(factory.get('/static/x/../site.0123456789ab.css')).close()
+            # Misses are not remembered, so random paths cannot grow the cache
+            self.assertEqual(list(middleware._files), ['site.0123456789ab.css'])
+
+
+class AsyncViewTests(TestCase):
+    """Kiosk and dashboard endpoints served through the ASGI handler"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', 'admin@example.com', 'pw', role='admin')
+        cls.staff = User.objects.create_user('staff', 'staff@example.com', 'pw', role='staff', is_staff=True)
+        cls.member = User.objects.create_user(
+            'member', 'member@example.com', 'pw', first_name='Ana', last_name='Cruz', role='member',
+        )
+        plan = MembershipPlan.objects.create(name='Monthly', duration_days=30, price=Decimal('1500'))
+        membership = UserMembership.objects.create(user=cls.member, plan=plan, start_date=date.today(), status='active')
+        pass_type = FlexibleAccess.objects.create(name='Day Pass', duration_days=1, price=Decimal('150'))
+        ledger.record([
+            Payment.objects.create(user=cls.member, membership=membership, amount=plan.price, method='cash'),
+            WalkInPayment.objects.create(pass_type=pass_type, amount=pass_type.price, method='cash'),
+        ])
+        cls.member.generate_kiosk_pin()
+
+    async def test_kiosk_check_in_and_out(self):
+        url = reverse('kiosk_login')
+        response = await self.async_client.post(url, {'kiosk_pin': self.member.kiosk_pin})
+        self.assertRedirects(
+            response, reverse('kiosk_success', args=['checkin', 0, self.member.id]), fetch_redirect_response=False,
+        )
+        self.assertTrue(await Attendance.objects.filter(user=self.member, check_out__isnull=True).aexists())
+
+        response = await self.async_client.post(url, {'kiosk_pin': self.member.kiosk_pin})
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('/kiosk/success/checkout/', response.url)
+        self.assertFalse(await Attendance.objects.filter(check_out__isnull=True).aexists())
+        self.assertEqual(await AuditLog.objects.filter(user=self.member).acount(), 2)
+
+        response = await self.async_client.get(response.url)
+        self.assertContains(response, 'Ana')
+
+    async def test_kiosk_rejects_unknown_pin(self):
+        response = await self.async_client.post(reverse('kiosk_login'), {'kiosk_pin': '000000'})
+        self.assertContains(response, 'Invalid PIN')
+        self.assertEqual(await AuditLog.objects.filter(action='login_failed').acount(), 1)
+
+    async def test_dashboard_summary(self):
+        await self.async_client.aforce_login(self.admin)
+        data = (await self.async_client.get(reverse('dashboard_summary'))).json()
+        self.assertEqual(data['today_payments'], 1)
+        self.assertEqual(data['today_walkins'], 1)
+        self.assertEqual(Decimal(data['today_revenue']), Decimal('1650'))
+        self.assertEqual(data['active_memberships'], 1)
+
+        await self.async_client.aforce_login(self.staff)
+        data = (await self.async_client.get(reverse('dashboard_summary'))).json()
+        self.assertEqual(Decimal(data['today_revenue']), Decimal('1650'))
+        self.assertNotIn('month_revenue', data)
+
+    async def test_dashboard_attendance(self):
+        await Attendance.objects.acreate(user=self.member)
+        await self.async_client.aforce_login(self.staff)
+        data = (await self.async_client.get(reverse('dashboard_attendance'))).json()
+        self.assertEqual(data['currently_checked_in'], 1)
+        self.assertEqual(data['today_checkins'], 1)
+        self.assertEqual(data['recent'][0]['member'], 'Ana Cruz')
+
+    async def test_dashboard_endpoints_require_staff(self):
+        self.assertEqual((await self.async_client.get(reverse('dashboard_summary'))).status_code, 403)
+        await self.async_client.aforce_login(self.member)
+        self.assertEqual((await self.async_client.get(reverse('dashboard_attendance'))).status_code, 403)
+
+    async def test_queries_are_recorded_for_async_requests(self):
+        from .profiling import registry
+        registry.reset()
+        await self.async_client.post(reverse('kiosk_login'), {'kiosk_pin': self.member.kiosk_pin})
+        row = next(row for row in registry.snapshot() if row[0] == 'kiosk_login')
+        self.assertGreaterEqual(row[1]['totals']['queries'], 4)
+
+
+class LiveEventTests(TestCase):
+    """Event bus and the server-sent event stream"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('staff', 'staff@example.com', 'pw', role='staff', is_staff=True)
+        cls.member = User.objects.create_user(
+            'member', 'member@example.com', 'pw', first_name='Ana', last_name='Cruz', role='member',
+        )
+        plan = MembershipPlan.objects.create(name='Monthly', duration_days=30, price=Decimal('1500'))
+        UserMembership.objects.create(user=cls.member, plan=plan, start_date=date.today(), status='active')
+        cls.member.generate_kiosk_pin()
+        cls.pass_type = FlexibleAccess.objects.create(name='Day Pass', duration_days=1, price=Decimal('150'))
+
+    def test_bus_replays_and_delivers(self):
+        from .events import EventBus
+        bus = EventBus(buffer_size=2)
+        first = bus.publish('checkin', member='A')
+        received = []
+        bus.subscribe(received.append)
+        second = bus.publish('checkin', member='B')
+        third = bus.publish('checkout', member='A')
+        self.assertEqual(received, [second, third])
+        self.assertEqual(bus.since(first.id), [second, third])
+        # Only the last two are buffered
+        self.assertEqual(bus.since(0), [second, third])
+        self.assertEqual(bus.last_id, third.id)
+        self.assertIn('event: checkout\n', third.encode())
+
+    def test_stream_sends_events_after_since(self):
+        from .events import bus
+        before = bus.publish('checkin', member='Before')
+        after = bus.publish('checkin', member='After')
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('events_stream'), {'since': before.id})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = iter(response.streaming_content)
+        self.assertEqual(next(chunks), b'retry: 3000\n\n')
+        chunk = next(chunks).decode()
+        self.assertIn(f'id: {after.id}\n', chunk)
+        self.assertIn('"member": "After"', chunk)
+        response.close()
+
+    async def test_async_stream_follows_the_bus(self):
+        from .events import bus
+        await self.async_client.aforce_login(self.staff)
+        response = await self.async_client.get(reverse('events_stream'), {'since': bus.last_id})
+        chunks = aiter(response.streaming_content)
+        self.assertEqual(await anext(chunks), b'retry: 3000\n\n')
+        pending = asyncio.ensure_future(anext(chunks))
+        await asyncio.sleep(0)
+        event = bus.publish('checkout', member='Live')
+        chunk = (await asyncio.wait_for(pending, 5)).decode()
+        self.assertIn(f'id: {event.id}\nevent: checkout\n', chunk)
+
+        # A client disconnect cancels the response task mid-wait
+        pending = asyncio.ensure_future(anext(chunks))
+        await asyncio.sleep(0)
+        pending.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await pending
+        self.assertEqual(bus.subscriber_count, 0)
+
+    def test_stream_requires_staff(self):
+        self.assertEqual(self.client.get(reverse('events_stream')).status_code, 403)
+        self.client.force_login(self.member)
+        self.assertEqual(self.client.get(reverse('events_stream')).status_code, 403)
+
+    async def test_kiosk_publishes_check_in(self):
+        from .events import bus
+        last_id = bus.last_id
+        await self.async_client.post(reverse('kiosk_login'), {'kiosk_pin': self.member.kiosk_pin})
+        [event] = bus.since(last_id)
+        self.assertEqual(event.type, 'checkin')
+        self.assertEqual(event.data['member'], 'Ana Cruz')
+
+    def test_walkin_sale_published_on_commit(self):
+        from .events import bus
+        self.client.force_login(self.staff)
+        session = self.client.session
+        session['pending_walkin'] = {
+            'pass_id': self.pass_type.id, 'customer_name': 'Guest', 'mobile_no': '',
+            'payment_method': 'cash', 'reference_no': '',
+        }
+        session.save()
+        last_id = bus.last_id
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            self.client.post(reverse('walkin_confirm'), {'action': 'confirm'})
+        self.assertEqual(bus.since(last_id), [])
+        for callback in callbacks:
+            callback()
+        [event] = bus.since(last_id)
+        self.assertEqual(event.data['kind'], 'walkin')
+        self.assertEqual(event.data['amount'], Decimal('150'))
+
+    def test_dashboard_renders_live_counters(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('dashboard'))
+        self.assertContains(response, 'data-live-events="/dashboard/events/?since=')
+        self.assertContains(response, 'data-live="today_revenue" data-value="0.00"')
+        self.assertContains(response, 'gym_app/js/live.js')
+
+
+class TaskQueueTests(TestCase):
+    """Background tasks: queued on commit, run by the worker, retried on failure"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.member = User.objects.create_user(
+            'member', 'member@example.com', 'pw', first_name='Ana', last_name='Cruz', role='member',
+        )
+        cls.plan = MembershipPlan.objects.create(name='Monthly', duration_days=30, price=Decimal('1500'))
+
+    def setUp(self):
+        from . import taskqueue
+        self.calls = []
+        self.failures = 0
+
+        def record(value):
+            if self.failures:
+                self.failures -= 1
+                raise ValueError('boom')
+            self.calls.append(value)
+
+        record.__module__, record.__name__ = 'gym_app.tests', 'record'
+        self.record = taskqueue.task(record)
+        self.addCleanup(taskqueue.registry.pop, self.record.task_name)
+
+    def test_enqueue_joins_the_transaction(self):
+        from django.db import transaction
+        from .models import Task
+        from .taskqueue import enqueue
+        with self.assertRaises(ValueError), transaction.atomic():
+            enqueue(self.record.defer(value=1))
+            raise ValueError
+        self.assertFalse(Task.objects.exists())
+        with self.assertNumQueries(1):
+            enqueue(self.record.defer(value=1), None, self.record.defer(value=2))
+        self.assertEqual(Task.objects.filter(status='pending').count(), 2)
+
+    def test_worker_runs_due_tasks(self):
+        from .models import Task
+        from .taskqueue import run_pending
+        Task.objects.bulk_create([self.record.defer(value=1), self.record.defer(delay=60, value=2)])
+        self.assertEqual(run_pending(), (1, 0))
+        self.assertEqual(self.calls, [1])
+        self.assertEqual(
+            list(Task.objects.order_by('id').values_list('status', 'attempts')),
+            [('done', 1), ('pending', 0)],
+        )
+
+    def test_failed_task_is_retried_with_backoff(self):
+        from .models import Task
+        from .taskqueue import run_pending
+        self.failures = 1
+        task = self.record.defer(value=1)
+        task.save()
+        with self.assertLogs('gym_app.tasks', 'WARNING'):
+            self.assertEqual(run_pending(), (0, 1))
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts), ('pending', 1))
+        self.assertIn('ValueError: boom', task.last_error)
+        self.assertGreater(task.run_after, timezone.now() + timedelta(seconds=20))
+
+        Task.objects.filter(id=task.id).update(run_after=timezone.now())
+        self.assertEqual(run_pending(), (1, 0))
+        self.assertEqual(self.calls, [1])
+
+    def test_task_fails_after_max_attempts(self):
+        from .models import Task
+        from .taskqueue import run_pending
+        self.failures = 5
+        task = self.record.defer(value=1)
+        task.max_attempts = 2
+        task.save()
+        with self.assertLogs('gym_app.tasks', 'WARNING') as logs:
+            run_pending()
+            Task.objects.filter(id=task.id).update(run_after=timezone.now())
+            run_pending()
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts), ('failed', 2))
+        self.assertIn('failed permanently', logs.output[-1])
+
+    def test_claim_is_exclusive(self):
+        from .models import Task
+        from .taskqueue import claim_next
+        self.record.defer(value=1).save()
+        claimed = claim_next()
+        self.assertEqual(claimed.status, 'running')
+        self.assertIsNone(claim_next())
+        self.assertEqual(Task.objects.filter(status='running').count(), 1)
+
+    def test_stale_tasks_are_requeued(self):
+        from .models import Task
+        from .taskqueue import claim_next, requeue_stale
+        self.record.defer(value=1).save()
+        task = claim_next()
+        self.assertEqual(requeue_stale(), 0)
+        Task.objects.filter(id=task.id).update(started_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(requeue_stale(), 1)
+        self.assertEqual(claim_next().id, task.id)
+
+    def test_subscribe_defers_side_effects(self):
+        from django.core import mail
+        from .models import Task
+        from .taskqueue import run_pending
+        self.client.force_login(self.member)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('subscribe_plan', args=[self.plan.id]), {'payment_method': 'cash'},
+            )
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(AuditLog.objects.exists())
+        self.assertEqual(Task.objects.filter(status='pending').count(), 4)
+
+        self.assertEqual(run_pending(), (4, 0))
+        self.assertEqual(
+            set(AuditLog.objects.values_list('action', flat=True)),
+            {'membership_created', 'payment_received'},
+        )
+        payment = Payment.objects.get()
+        self.assertEqual(AuditLog.objects.get(action='payment_received').object_id, str(payment.id))
+        self.member.refresh_from_db()
+        self.assertEqual(len(self.member.kiosk_pin), 6)
+        [receipt] = mail.outbox
+        self.assertEqual(receipt.to, ['member@example.com'])
+        self.assertIn('Monthly', receipt.body)
+        self.assertIn('₱1500.00', receipt.body)
+
+    def test_eager_failure_is_queued_for_the_worker(self):
+        from django.db import transaction
+        from .models import Task
+        from .taskqueue import enqueue, run_pending
+        self.failures = 1
+        with self.settings(TASKS_EAGER=True), self.assertLogs('gym_app.tasks', 'WARNING'):
+            with self.captureOnCommitCallbacks(execute=True), transaction.atomic():
+                enqueue(self.record.defer(value=1), self.record.defer(value=2))
+        # The failure did not escape and the next task still ran
+        self.assertEqual(self.calls, [2])
+        task = Task.objects.get()
+        self.assertEqual((task.status, task.attempts, task.kwargs), ('pending', 1, {'value': 1}))
+        self.assertIn('ValueError: boom', task.last_error)
+
+        Task.objects.filter(id=task.id).update(run_after=timezone.now())
+        self.assertEqual(run_pending(), (1, 0))
+        self.assertEqual(self.calls, [2, 1])
+
+    def test_pin_allocation_checks_candidates_only(self):
+        import random
+        User.objects.create_user('holder', 'holder@example.com', 'pw', role='member', kiosk_pin='000000')
+        # The count, then one kiosk_pin__in lookup of the candidates
+        with self.assertNumQueries(2):
+            [pin] = User.allocate_kiosk_pins(1, rng=random.Random(1))
+        self.assertRegex(pin, r'^\d{6}$')
+        self.assertEqual(len(set(User.allocate_kiosk_pins(1200))), 1200)
+
+    def test_pin_task_retries_a_pin_taken_meanwhile(self):
+        from unittest import mock
+        from .tasks import assign_kiosk_pin
+        User.objects.create_user('holder', 'holder@example.com', 'pw', role='member', kiosk_pin='111111')
+        with mock.patch.object(User, 'allocate_kiosk_pins', side_effect=[['111111'], ['222222']]):
+            assign_kiosk_pin(user_id=self.member.id)
+        self.member.refresh_from_db()
+        self.assertEqual(self.member.kiosk_pin, '222222')
+
+    def test_pin_waits_for_the_worker(self):
+        from .taskqueue import run_pending
+        self.client.force_login(self.member)
+        with self.settings(TASKS_EAGER=False), self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('subscribe_plan', args=[self.plan.id]), {'payment_method': 'cash'}, follow=True,
+            )
+        self.assertContains(response, 'Your kiosk PIN will appear on your dashboard shortly')
+        self.assertNotContains(response, 'Your Kiosk PIN')
+
+        run_pending()
+        self.member.refresh_from_db()
+        self.assertContains(self.client.get(reverse('dashboard')), self.member.kiosk_pin)
+
+    def test_eager_mode_runs_after_commit(self):
+        from .models import Task
+        self.client.force_login(self.member)
+        with self.settings(TASKS_EAGER=True), self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('subscribe_plan', args=[self.plan.id]), {'payment_method': 'cash'})
+        self.assertFalse(Task.objects.exists())
+        self.assertEqual(AuditLog.objects.count(), 2)
+        self.member.refresh_from_db()
+        self.assertEqual(len(self.member.kiosk_pin), 6)
+
+
+class SubscriptionTests(TestCase):
+    """subscribe_plan is one transaction and one active membership per member"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.member = User.objects.create_user('member', 'member@example.com', 'pw', role='member')
+        cls.plan = MembershipPlan.objects.create(name='Monthly', duration_days=30, price=Decimal('1500'))
+
+    def subscribe(self):
+        self.client.force_login(self.member)
+        return self.client.post(reverse('subscribe_plan', args=[self.plan.id]), {'payment_method': 'cash'})
+
+    def test_constraint_rejects_second_active_membership(self):
+        from django.db import IntegrityError
+        UserMembership.objects.create(user=self.member, plan=self.plan, start_date=date.today())
+        with self.assertRaises(IntegrityError):
+            UserMembership.objects.create(user=self.member, plan=self.plan, start_date=date.today())
+
+    def test_lost_race_is_reported_as_already_subscribed(self):
+        from unittest import mock
+        UserMembership.objects.create(user=self.member, plan=self.plan, start_date=date.today())
+        # Both requests passed the check before either inserted
+        coverage = MembershipCoverage.objects.get(user=self.member)
+        with mock.patch('gym_app.subscriptions.current_coverage', side_effect=[None, coverage]):
+            response = self.subscribe()
+        self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+        self.assertEqual(UserMembership.objects.count(), 1)
+        self.assertFalse(Payment.objects.exists())
+
+    def test_other_integrity_errors_are_not_reported_as_already_subscribed(self):
+        from unittest import mock
+        from django.db import IntegrityError
+        from .catalog import catalog
+        from .subscriptions import subscribe
+        UserMembership.objects.create(user=self.member, plan=self.plan, start_date=date.today())
+        starts_on = MembershipCoverage.objects.get(user=self.member).end_date
+        error = IntegrityError('NOT NULL constraint failed: gym_app_payment.amount')
+        with mock.patch.object(Payment.objects, 'create', side_effect=error):
+            with self.assertRaises(IntegrityError):
+                subscribe(self.member, catalog.plan_or_404(self.plan.id), 'cash', starts_on=starts_on)
+
+    def test_unknown_payment_method_is_rejected(self):
+        from .catalog import catalog
+        from .subscriptions import subscribe
+        with self.assertRaises(ValueError):
+            subscribe(self.member, catalog.plan_or_404(self.plan.id), 'bitcoin')
+
+        self.client.force_login(self.member)
+        url = reverse('subscribe_plan', args=[self.plan.id])
+        response = self.client.post(url, {'payment_method': 'bitcoin'})
+        self.assertRedirects(response, url, fetch_redirect_response=False)
+        self.assertFalse(UserMembership.objects.exists() or Payment.objects.exists())
+
+    def test_impossible_start_date_is_rejected(self):
+        self.client.force_login(self.member)
+        url = reverse('subscribe_plan', args=[self.plan.id])
+        response = self.client.post(url, {'payment_method': 'cash', 'starts_on': '2025-02-30'})
+        self.assertRedirects(response, url, fetch_redirect_response=False)
+        self.assertFalse(UserMembership.objects.exists() or Payment.objects.exists())
+
+    def test_failed_payment_rolls_back_membership(self):
+        from unittest import mock
+        from .models import Task
+        with mock.patch.object(Payment.objects, 'create', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.subscribe()
+        self.assertFalse(UserMembership.objects.exists())
+        self.assertFalse(Task.objects.exists())
+
+
+class ConcurrentSubscriptionTests(SimpleTestCase):
+    """
+    Parallel submissions of the subscribe form for the same member.
+
+    The in-memory test database fails concurrent writers instead of making
+    them wait, so this runs on a temporary database file, from worker
+    threads (each gets its own connection to it).
+    """
+
+    databases = {'default'}
+    SUBMISSIONS = 4
+
+    def test_parallel_submissions_create_one_membership(self):
+        from django.core.management import call_command
+        from django.db import connections
+        from .models import Task
+
+        def in_thread(func):
+            result = []
+            thread = threading.Thread(target=lambda: result.append(func()))
+            thread.start()
+            thread.join()
+            return result[0] if result else None
+
+        database = connections.settings['default']
+        old_name = database['NAME']
+        with tempfile.TemporaryDirectory() as directory:
+            database['NAME'] = os.path.join(directory, 'concurrency.sqlite3')
+            try:
+                def setup():
+                    try:
+                        call_command('migrate', verbosity=0)
+                        member = User.objects.create_user('member', 'member@example.com', 'pw', role='member')
+                        plan = MembershipPlan.objects.create(name='Monthly', duration_days=30, price=Decimal('1500'))
+                        return member, plan
+                    finally:
+                        connection.close()
+
+                cache.clear()
+                member, plan = in_thread(setup)
+                url = reverse('subscribe_plan', args=[plan.id])
+                barrier = threading.Barrier(self.SUBMISSIONS)
+                responses, errors = [], []
+
+                def submit():
+                    try:
+                        client = Client()
+                        client.force_login(member)
+                        barrier.wait()
+                        responses.append(client.post(url, {'payment_method': 'cash'}))
+                    except Exception as e:
+                        errors.append(e)
+                    finally:
+                        connection.close()
+
+                threads = [threading.Thread(target=submit) for _ in range(self.SUBMISSIONS)]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+
+                def counts():
+                    try:
+                        return (
+                            UserMembership.objects.filter(user=member, status='active').count(),
+                            Payment.objects.count(),
+                            Task.objects.filter(name='gym_app.tasks.send_payment_receipt').count(),
+                        )
+                    finally:
+                        connection.close()
+
+                self.assertEqual(errors, [])
+                self.assertEqual([r.status_code for r in responses], [302] * self.SUBMISSIONS)
+                self.assertEqual(in_thread(counts), (1, 1, 1))
+            finally:
+                database['NAME'] = old_name
+                cache.clear()
+
+
+class RenewalTests(TestCase):
+    """Renewals queue behind the current plan and coverage stays merged"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.member = User.objects.create_user(
+            'member', 'member@example.com', 'pw', first_name='Ana', role='member',
+        )
+        cls.member.generate_kiosk_pin()
+        cls.plan = MembershipPlan.objects.create(name='Monthly', duration_days=30, price=Decimal('1500'))
+        cls.today = date.today()
+        cls.current = UserMembership.objects.create(
+            user=cls.member, plan=cls.plan, start_date=cls.today - timedelta(days=20),
+        )
+
+    def renew(self, starts_on):
+        self.client.force_login(self.member)
+        return self.client.post(
+            reverse('subscribe_plan', args=[self.plan.id]),
+            {'payment_method': 'cash', 'starts_on': starts_on.isoformat()},
+        )
+
+    def test_renewal_starts_when_coverage_ends(self):
+        self.client.force_login(self.member)
+        response = self.client.get(reverse('subscribe_plan', args=[self.plan.id]))
+        self.assertContains(response, f'name="starts_on" value="{self.current.end_date.isoformat()}"')
+
+        self.renew(self.current.end_date)
+        renewal = UserMembership.objects.get(status='scheduled')
+        self.assertEqual(renewal.start_date, self.current.end_date)
+        coverage = MembershipCoverage.objects.get(user=self.member)
+        self.assertEqual(
+            (coverage.start_date, coverage.end_date, coverage.membership_id, coverage.queued),
+            (self.current.start_date, renewal.end_date, self.current.id, 1),
+        )
+
+        # A second renewal stacks behind the first
+        self.renew(renewal.end_date)
+        coverage.refresh_from_db()
+        self.assertEqual(coverage.queued, 2)
+        self.assertEqual(coverage.end_date, renewal.end_date + timedelta(days=30))
+
+    def test_resubmitted_renewal_is_not_charged_twice(self):
+        self.renew(self.current.end_date)
+        response = self.renew(self.current.end_date)
+        self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+        self.assertEqual(UserMembership.objects.filter(status='scheduled').count(), 1)
+        self.assertEqual(Payment.objects.count(), 1)
+
+    def test_roll_over_starts_due_renewal(self):
+        renewal = UserMembership.objects.create(
+            user=self.member, plan=self.plan, start_date=self.current.end_date, status='scheduled',
+        )
+        self.assertEqual(UserMembership.roll_over(self.current.end_date), (1, 1))
+        self.current.refresh_from_db()
+        renewal.refresh_from_db()
+        self.assertEqual((self.current.status, renewal.status), ('expired', 'active'))
+        coverage = MembershipCoverage.objects.get(user=self.member)
+        self.assertEqual((coverage.membership_id, coverage.queued), (renewal.id, 0))
+
+        # Once the renewal ends too, nothing covers the member
+        self.assertEqual(UserMembership.roll_over(renewal.end_date + timedelta(days=1)), (1, 0))
+        self.assertFalse(MembershipCoverage.objects.exists())
+
+    def test_kiosk_checks_coverage(self):
+        with self.assertNumQueries(4):
+            response = self.client.post(reverse('kiosk_login'), {'kiosk_pin': self.member.kiosk_pin})
+        self.assertEqual(response.status_code, 302)
+
+        UserMembership.objects.filter(id=self.current.id).update(end_date=self.today - timedelta(days=1))
+        MembershipCoverage.rebuild([self.member.id])
+        response = self.client.post(reverse('kiosk_login'), {'kiosk_pin': self.member.kiosk_pin})
+        self.assertContains(response, 'Your membership has expired')
+
+    def test_plans_page_offers_renewal(self):
+        self.client.force_login(self.member)
+        response = self.client.get(reverse('membership_plans'))
+        self.assertContains(response, 'Renew Plan')
+        self.assertContains(response, f'starts on <strong>{self.current.end_date:%b %d, %Y}</strong>')
+
+
+class WalkInBatchTests(TestCase):
+    """Group walk-in sales are one insert, one audit entry and one receipt"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('staff', 'staff@example.com', 'pw', role='staff')
+        cls.day = FlexibleAccess.objects.create(name='Day Pass', duration_days=1, price=Decimal('150'))
+        cls.week = FlexibleAccess.objects.create(name='Week Pass', duration_days=7, price=Decimal('700'))
+
+    def setUp(self):
+        self.client.force_login(self.staff)
+
+    def sell(self, pass_ids, **extra):
+        return self.client.post(reverse('walkin_batch'), {
+            'pass_id': pass_ids,
+            'customer_name': [f'Guest {i}' if pass_id else '' for i, pass_id in enumerate(pass_ids)],
+            'mobile_no': [''] * len(pass_ids),
+            'payment_method': 'cash',
+            'label': 'Acme team building',
+            **extra,
+        })
+
+    def test_batch_is_inserted_with_one_audit_task(self):
+        from .models import Task, WalkInBatch
+        # The last row was left blank
+        pass_ids = [self.day.id] * 9 + [self.week.id, '']
+        # 14 (one ledger summary UPDATE per pass sold), plus 3 per pass as the
+        # first cash sale of it today creates its summary row
+        with self.assertNumQueries(20):
+            response = self.sell(pass_ids)
+        batch = WalkInBatch.objects.get()
+        self.assertRedirects(response, reverse('walkin_batch_receipt', args=[batch.id]), fetch_redirect_response=False)
+        self.assertEqual((batch.pass_count, batch.total_amount), (10, Decimal('2050.00')))
+        self.assertEqual(WalkInPayment.objects.filter(batch=batch).count(), 10)
+
+        audit = Task.objects.get(name='gym_app.tasks.write_audit_logs')
+        [entry] = audit.kwargs['entries']
+        self.assertEqual(entry['object_id'], str(batch.id))
+        self.assertEqual(entry['extra_data']['passes'], {'Day Pass': 9, 'Week Pass': 1})
+
+    def test_unknown_pass_rolls_back_whole_batch(self):
+        response = self.sell([self.day.id, 999999])
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Row 2: select an available pass.')
+        self.assertFalse(WalkInPayment.objects.exists())
+
+    def test_combined_receipt(self):
+        from .models import WalkInBatch
+        self.sell([self.day.id, self.day.id, self.week.id])
+        batch = WalkInBatch.objects.get()
+        response = self.client.get(reverse('walkin_batch_receipt', args=[batch.id]))
+        self.assertContains(response, 'Acme team building')
+        self.assertContains(response, '₱300.00')
+        self.assertContains(response, '₱1000.00')
+        self.assertContains(response, 'Guest 2')
+
+    def test_members_cannot_sell(self):
+        member = User.objects.create_user('member', 'member@example.com', 'pw', role='member')
+        self.client.force_login(member)
+        response = self.client.post(reverse('walkin_batch'), {'pass_id': [self.day.id], 'payment_method': 'cash'})
+        self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+        self.assertFalse(WalkInPayment.objects.exists())
+
+
+class WalkInPassCodeTests(TestCase):
+    """Walk-in passes get a kiosk code valid for the pass's duration"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('staff', 'staff@example.com', 'pw', role='staff')
+        cls.day = FlexibleAccess.objects.create(name='Day Pass', duration_days=1, price=Decimal('150'))
+        cls.week = FlexibleAccess.objects.create(name='Week Pass', duration_days=7, price=Decimal('700'))
+
+    def sell(self, pass_type, customer_name='Ben'):
+        self.client.force_login(self.staff)
+        self.client.post(reverse('walkin_purchase'), {
+            'pass_id': pass_type.id, 'customer_name': customer_name, 'payment_method': 'cash',
+        })
+        self.client.post(reverse('walkin_confirm'), {'action': 'confirm'})
+        return WalkInPayment.objects.select_related('pass_code').latest('id')
+
+    def test_sale_issues_code_for_pass_duration(self):
+        from .models import WalkInPassCode
+        payment = self.sell(self.week)
+        code = payment.pass_code
+        self.assertEqual(len(code.code), WalkInPassCode.CODE_LENGTH)
+        self.assertEqual((code.valid_from, code.valid_until), (date.today(), date.today() + timedelta(days=6)))
+        self.assertContains(self.client.get(reverse('walkin_purchase')), code.code)
+
+        day_code = self.sell(self.day).pass_code
+        self.assertEqual(day_code.valid_until, day_code.valid_from)
+
+    def test_allocate_skips_taken_codes(self):
+        import random
+        from .models import WalkInPassCode
+        payment = self.sell(self.day)
+        # The same seed draws the taken code first
+        rng = random.Random(1)
+        first = f'{rng.randint(0, 10 ** WalkInPassCode.CODE_LENGTH - 1):0{WalkInPassCode.CODE_LENGTH}d}'
+        WalkInPassCode.objects.filter(pk=payment.pass_code.pk).update(code=first)
+        codes = WalkInPassCode.allocate(3, rng=random.Random(1))
+        self.assertEqual(len(set(codes)), 3)
+        self.assertNotIn(first, codes)
+
+    def test_batch_receipt_prints_codes(self):
+        from .models import WalkInBatch
+        self.client.force_login(self.staff)
+        self.client.post(reverse('walkin_batch'), {
+            'pass_id': [self.day.id, self.week.id], 'customer_name': ['A', 'B'], 'mobile_no': ['', ''],
+            'payment_method': 'cash',
+        })
+        batch = WalkInBatch.objects.get()
+        response = self.client.get(reverse('walkin_batch_receipt', args=[batch.id]))
+        for payment in batch.payments.select_related('pass_code'):
+            self.assertContains(response, payment.pass_code.code)
+
+    async def test_kiosk_checks_walk_in_in_and_out(self):
+        from asgiref.sync import sync_to_async
+        payment = await sync_to_async(self.sell)(self.day)
+        url = reverse('kiosk_login')
+        response = await self.async_client.post(url, {'kiosk_pin': payment.pass_code.code})
+        self.assertRedirects(
+            response, reverse('kiosk_walkin_success', args=['checkin', 0, payment.id]), fetch_redirect_response=False,
+        )
+        attendance = await Attendance.objects.aget(walk_in=payment)
+        self.assertIsNone(attendance.user_id)
+
+        response = await self.async_client.get(response.url)
+        self.assertContains(response, 'Ben')
+
+        response = await self.async_client.post(url, {'kiosk_pin': payment.pass_code.code})
+        self.assertIn('/kiosk/success/checkout/', response.url)
+        self.assertFalse(await Attendance.objects.filter(check_out__isnull=True).aexists())
+
+    async def test_kiosk_rejects_expired_pass(self):
+        from asgiref.sync import sync_to_async
+        from .models import WalkInPassCode
+        payment = await sync_to_async(self.sell)(self.day)
+        yesterday = date.today() - timedelta(days=1)
+        await WalkInPassCode.objects.filter(payment=payment).aupdate(valid_from=yesterday, valid_until=yesterday)
+        response = await self.async_client.post(reverse('kiosk_login'), {'kiosk_pin': payment.pass_code.code})
+        self.assertContains(response, 'This pass expired')
+        self.assertFalse(await Attendance.objects.aexists())
+
+    def test_walk_in_visits_count_in_attendance_report(self):
+        payment = self.sell(self.day, customer_name='')
+        Attendance.objects.create(walk_in=payment)
+        response = self.client.get(reverse('attendance_report'))
+        self.assertEqual((response.context['today_checkins'], response.context['today_walkin_checkins']), (1, 1))
+        self.assertContains(response, 'Walk-in Guest')
+
+
+class BusinessDateTests(TestCase):
+    """Sales are filed under their local (Asia/Manila) day in an indexed column"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.member = User.objects.create_user('member', 'member@example.com', 'pw', role='member')
+        cls.plan = MembershipPlan.objects.create(name='Monthly', duration_days=30, price=Decimal('1500'))
+        cls.membership = UserMembership.objects.create(user=cls.member, plan=cls.plan, start_date=date(2026, 10, 1))
+        cls.pass_type = FlexibleAccess.objects.create(name='Day Pass', duration_days=1, price=Decimal('150'))
+        # 17:30 UTC is already the next morning in Manila (UTC+8)
+        cls.late = datetime(2026, 10, 19, 17, 30, tzinfo=dt_timezone.utc)
+
+    def test_save_stores_local_day(self):
+        payment = Payment.objects.create(
+            user=self.member, membership=self.membership, amount=self.plan.price, method='cash', payment_date=self.late,
+        )
+        self.assertEqual(payment.business_date, date(2026, 10, 20))
+
+        payment.payment_date = self.late - timedelta(days=3)
+        payment.save(update_fields=['payment_date'])
+        payment.refresh_from_db()
+        self.assertEqual(payment.business_date, date(2026, 10, 17))
+
+    def test_daily_report_uses_local_day(self):
+        from .models import Analytics
+        ledger.record([WalkInPayment.objects.create(
+            pass_type=self.pass_type, amount=Decimal('150'), method='cash', payment_date=self.late,
+        )])
+        self.assertEqual(Analytics.generate_daily_report(date(2026, 10, 19)).total_passes, 0)
+        report = Analytics.generate_daily_report(date(2026, 10, 20))
+        self.assertEqual((report.total_passes, report.total_sales), (1, Decimal('150')))
+
+    def test_day_range_is_half_open_local_day(self):
+        from .models import day_range
+        start, end = day_range(date(2026, 10, 20))
+        self.assertEqual(start, datetime(2026, 10, 19, 16, 0, tzinfo=dt_timezone.utc))
+        self.assertEqual(end - start, timedelta(days=1))
+        self.assertTrue(start <= self.late < end)
+        self.assertEqual(day_range(date(2026, 10, 1), date(2026, 10, 31))[1], day_range(date(2026, 11, 1))[0])
+
+    def test_revenue_filters_use_the_indexed_column(self):
+        from django.test.utils import CaptureQueriesContext
+        staff = User.objects.create_user('staff', 'staff@example.com', 'pw', role='staff')
+        self.client.force_login(staff)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('dashboard'))
+        sales = [q['sql'] for q in queries if 'revenue_daily_summaries' in q['sql']]
+        self.assertEqual(len(sales), 1)
+        self.assertIn('business_date', sales[0])
+        self.assertNotIn('django_datetime_cast_date', sales[0])
+        self.assertFalse([q['sql'] for q in queries if 'SUM(' in q['sql'] and 'payment' in q['sql']])
+
+
+class IndexBenchmarkTests(TransactionTestCase):
+    """The index benchmark sees its indexes in the plans and puts them back"""
+
+    def setUp(self):
+        # The SQLite schema editor cannot run inside TestCase's transaction
+        member = User.objects.create_user('member', 'member@example.com', 'pw', role='member')
+        plan = MembershipPlan.objects.create(name='Monthly', duration_days=30, price=Decimal('1500'))
+        UserMembership.objects.create(user=member, plan=plan, start_date=date.today())
+
+    def index_names(self):
+        with connection.cursor() as cursor:
+            return {
+                name
+                for table in ('user_memberships', 'payments', 'walk_in_payments')
+                for name in connection.introspection.get_constraints(cursor, table)
+            }
+
+    def test_compare_reports_plans_and_recreates_indexes(self):
+        from .index_benchmark import QUERIES, compare, declared_indexes
+        declared = {index.name for model, index in declared_indexes()}
+        self.assertTrue(declared <= self.index_names())
+
+        results = compare(date.today(), repeat=1)
+
+        self.assertEqual(set(results), set(QUERIES))
+        for result in results.values():
+            self.assertTrue(set(result['uses']) <= declared)
+            self.assertFalse([name for name in declared if name in result['plan_without']])
+        self.assertTrue(declared <= self.index_names())
+
+
+class RevenueLedgerTests(TestCase):
+    """Sales append ledger lines and keep the daily summaries in step"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pw', role='admin')
+        cls.member = User.objects.create_user('member', 'member@example.com', 'pw', role='member')
+        cls.plan = MembershipPlan.objects.create(name='Monthly', duration_days=30, price=Decimal('1500'))
+        cls.pass_type = FlexibleAccess.objects.create(name='Day Pass', duration_days=1, price=Decimal('150'))
+
+    def summaries(self):
+        from .models import RevenueDailySummary
+        return {
+            (source, method): (count, total)
+            for day, method, source, count, total in RevenueDailySummary.objects.values_list(
+                'business_date', 'method', 'source', 'count', 'total'
+            )
+        }
+
+    def test_sales_are_posted_to_the_ledger(self):
+        from .models import RevenueEntry
+        from .subscriptions import subscribe
+        from .walkins import BatchLine, sell_batch
+        from .catalog import catalog
+        subscribe(self.member, catalog.plan_or_404(self.plan.id), 'gcash')
+        pass_type = catalog.pass_or_404(self.pass_type.id)
+        sell_batch([BatchLine(pass_type), BatchLine(pass_type)], 'cash', sold_by=self.admin)
+        sell_batch([BatchLine(pass_type)], 'cash', sold_by=self.admin)
+
+        self.assertEqual(self.summaries(), {
+            ('membership', 'gcash'): (1, Decimal('1500.00')),
+            ('walk_in', 'cash'): (3, Decimal('450.00')),
+        })
+        self.assertEqual(RevenueEntry.objects.filter(source='walk_in', staff=self.admin).count(), 3)
+        self.assertEqual(RevenueEntry.objects.get(source='membership').staff, None)
+
+    def test_admin_edit_and_delete_append_reversals(self):
+        from .models import RevenueEntry
+        sale = WalkInPayment.objects.create(pass_type=self.pass_type, amount=Decimal('150'), method='cash')
+        ledger.record([sale])
+        self.client.force_login(self.admin)
+        url = reverse('admin:gym_app_walkinpayment_change', args=[sale.id])
+        response = self.client.post(url, {
+            'customer_name': '', 'mobile_no': '', 'pass_type': self.pass_type.id, 'amount': '120.00',
+            'method': 'card', 'payment_date_0': timezone.localdate().isoformat(),
+            'payment_date_1': timezone.localtime().strftime('%H:%M:%S'), 'reference_no': '', 'notes': '',
+            'pass_code-TOTAL_FORMS': '0', 'pass_code-INITIAL_FORMS': '0',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.summaries(), {
+            ('walk_in', 'cash'): (0, Decimal('0.00')),
+            ('walk_in', 'card'): (1, Decimal('120.00')),
+        })
+
+        self.client.post(reverse('admin:gym_app_walkinpayment_delete', args=[sale.id]), {'post': 'yes'})
+        self.assertFalse(WalkInPayment.objects.exists())
+        self.assertEqual(self.summaries()['walk_in', 'card'], (0, Decimal('0.00')))
+        self.assertEqual(
+            list(RevenueEntry.objects.order_by('id').values_list('kind', 'amount')),
+            [('sale', Decimal('150.00')), ('reversal', Decimal('-150.00')),
+             ('sale', Decimal('120.00')), ('reversal', Decimal('-120.00'))],
+        )
+
+    def test_cascade_deletes_append_reversals(self):
+        from .subscriptions import subscribe
+        from .walkins import BatchLine, sell_batch
+        from .catalog import catalog
+        subscribe(self.member, catalog.plan_or_404(self.plan.id), 'gcash')
+        pass_type = catalog.pass_or_404(self.pass_type.id)
+        batch = sell_batch([BatchLine(pass_type), BatchLine(pass_type)], 'cash', sold_by=self.admin)
+
+        self.member.delete()
+        batch.delete()
+        self.assertFalse(Payment.objects.exists() or WalkInPayment.objects.exists())
+        self.assertEqual(self.summaries(), {
+            ('membership', 'gcash'): (0, Decimal('0.00')),
+            ('walk_in', 'cash'): (0, Decimal('0.00')),
+        })
+
+    def test_rebuild_matches_incremental_summaries(self):
+        membership = UserMembership.objects.create(user=self.member, plan=self.plan, start_date=date.today())
+        ledger.record([
+            Payment.objects.create(user=self.member, membership=membership, amount=self.plan.price, method='cash'),
+            WalkInPayment.objects.create(pass_type=self.pass_type, amount=Decimal('150'), method='cash'),
+            WalkInPayment.objects.create(pass_type=self.pass_type, amount=Decimal('150'), method='gcash'),
+        ])
+        incremental = self.summaries()
+        self.assertEqual(ledger.rebuild(), 3)
+        self.assertEqual(self.summaries(), incremental)
+
+
+class RevenueCubeTests(TestCase):
+    """The revenue cube rolls the daily summaries up and pivots them"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', 'admin@example.com', 'pw', role='admin')
+        member = User.objects.create_user('member', 'member@example.com', 'pw', role='member')
+        cls.plan = MembershipPlan.objects.create(name='Monthly', duration_days=30, price=Decimal('1500'))
+        cls.day_pass = FlexibleAccess.objects.create(name='Day Pass', duration_days=1, price=Decimal('150'))
+        membership = UserMembership.objects.create(user=member, plan=cls.plan, start_date=date(2026, 9, 28))
+        # Sunday Sep 27 and Monday Sep 28 fall in different weeks; Oct 1 in another month
+        at = lambda day: datetime.combine(day, datetime.min.time().replace(hour=10), tzinfo=timezone.get_current_timezone())
+        ledger.record([
+            Payment.objects.create(
+                user=member, membership=membership, amount=Decimal('1500'), method='gcash',
+                payment_date=at(date(2026, 9, 28)),
+            ),
+            WalkInPayment.objects.create(
+                pass_type=cls.day_pass, amount=Decimal('150'), method='cash', payment_date=at(date(2026, 9, 27)),
+            ),
+            WalkInPayment.objects.create(
+                pass_type=cls.day_pass, amount=Decimal('150'), method='cash', payment_date=at(date(2026, 10, 1)),
+            ),
+        ])
+
+    def test_cube_rolls_days_up(self):
+        from .revenue_cube import cube
+        first, last = date(2026, 9, 1), date(2026, 10, 31)
+        self.assertEqual(len(cube(first, last, 'day')), 3)
+        self.assertEqual(
+            sorted((cell.period, cell.count) for cell in cube(first, last, 'week')),
+            [(date(2026, 9, 21), 1), (date(2026, 9, 28), 1), (date(2026, 9, 28), 1)],
+        )
+        months = {(cell.period, cell.source): cell.total for cell in cube(first, last, 'month')}
+        self.assertEqual(months, {
+            (date(2026, 9, 1), 'membership'): Decimal('1500.00'),
+            (date(2026, 9, 1), 'walk_in'): Decimal('150.00'),
+            (date(2026, 10, 1), 'walk_in'): Decimal('150.00'),
+        })
+
+    def test_pivot_totals(self):
+        from .revenue_cube import Pivot, cube
+        pivot = Pivot(cube(date(2026, 9, 1), date(2026, 10, 31), 'month'), rows='item', columns='method')
+        self.assertEqual([row['label'] for row in pivot.table], ['Monthly', 'Day Pass'])
+        self.assertEqual(pivot.column_labels, ['GCash', 'Cash'])
+        self.assertEqual(pivot.table[1]['values'], [None, Decimal('300.00')])
+        self.assertEqual(pivot.grand_total, Decimal('1800.00'))
+
+        counts = Pivot(cube(date(2026, 9, 1), date(2026, 10, 31)), rows='period', columns='source', measure='count')
+        self.assertEqual([row['total'] for row in counts.table], [1, 1, 1])
+
+    def test_admin_item_change_moves_the_cube_row(self):
+        from .revenue_cube import cube
+        superuser = User.objects.create_superuser('root', 'root@example.com', 'pw', role='admin')
+        open_gym = FlexibleAccess.objects.create(name='Open Gym', duration_days=1, price=Decimal('150'))
+        annual = MembershipPlan.objects.create(name='Annual', duration_days=365, price=Decimal('1500'))
+        payment = Payment.objects.get()
+        renewal = UserMembership.objects.create(
+            user=payment.user, plan=annual, start_date=date(2026, 10, 28), status='scheduled',
+        )
+        sale = WalkInPayment.objects.get(business_date=date(2026, 10, 1))
+        self.client.force_login(superuser)
+
+        def change(model, obj, data):
+            at = timezone.localtime(obj.payment_date)
+            response = self.client.post(reverse(f'admin:gym_app_{model}_change', args=[obj.id]), {
+                'amount': obj.amount, 'method': obj.method, 'reference_no': '', 'notes': '',
+                'payment_date_0': at.date().isoformat(), 'payment_date_1': at.strftime('%H:%M:%S'),
+                # payment_date has a callable default, so the admin posts its initial value back
+                'initial-payment_date_0': at.date().isoformat(), 'initial-payment_date_1': at.strftime('%H:%M:%S'),
+                **data,
+            })
+            self.assertEqual(response.status_code, 302)
+
+        change('walkinpayment', sale, {
+            'customer_name': '', 'mobile_no': '', 'pass_type': open_gym.id,
+            'pass_code-TOTAL_FORMS': '0', 'pass_code-INITIAL_FORMS': '0',
+        })
+        change('payment', payment, {'user': payment.user_id, 'membership': renewal.id})
+
+        items = {
+            (cell.period, cell.item): cell.count
+            for cell in cube(date(2026, 9, 1), date(2026, 10, 31), 'month')
+        }
+        self.assertEqual(items, {
+            (date(2026, 9, 1), ('membership', self.plan.id)): 0,
+            (date(2026, 9, 1), ('membership', annual.id)): 1,
+            (date(2026, 9, 1), ('walk_in', self.day_pass.id)): 1,
+            (date(2026, 10, 1), ('walk_in', self.day_pass.id)): 0,
+            (date(2026, 10, 1), ('walk_in', open_gym.id)): 1,
+        })
+
+    def test_report_reads_only_the_cube(self):
+        from django.test.utils import CaptureQueriesContext
+        self.client.force_login(self.admin)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('revenue_report'), {
+                'start': '2026-09-01', 'end': '2026-10-31', 'grain': 'month', 'rows': 'item', 'columns': 'method',
+            })
+        self.assertContains(response, 'Day Pass')
+        self.assertContains(response, '₱1800.00')
+        self.assertFalse([q['sql'] for q in queries if 'FROM "payments"' in q['sql'] or 'FROM "walk_in_payments"' in q['sql']])
+
+    def test_report_rejects_invalid_ranges(self):
+        from django.contrib.messages import get_messages
+        self.client.force_login(self.admin)
+        today = date.today()
+        for params in ({'start': '2026-02-30', 'end': '2026-10-31'}, {'start': '2026-10-31', 'end': '2026-09-01'}):
+            response = self.client.get(reverse('revenue_report'), params)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual((response.context['start'], response.context['end']), (today - timedelta(days=29), today))
+            self.assertEqual([m.level_tag for m in get_messages(response.wsgi_request)], ['error'])
+
+
+class CohortRetentionTests(TestCase):
+    """Join cohorts, their retention curves and the incremental refresh"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', 'admin@example.com', 'pw', role='admin')
+        cls.plan = MembershipPlan.objects.create(name='Monthly', duration_days=30, price=Decimal('1500'))
+        cls.members = {}
+        for name, starts in {
+            'ana': [date(2026, 1, 10), date(2026, 2, 10)],  # renews once, lapses in March
+            'ben': [date(2026, 1, 20)],  # lapses in February
+            'cy': [date(2026, 2, 5), date(2026, 3, 7), date(2026, 4, 7)],  # still a member
+        }.items():
+            cls.members[name] = User.objects.create_user(name, f'{name}@example.com', 'pw', role='member')
+            for start in starts:
+                UserMembership.objects.create(user=cls.members[name], plan=cls.plan, start_date=start)
+
+    def curves(self):
+        return {
+            (point.cohort, point.offset): (point.members, point.retained, point.renewed, point.churned)
+            for point in CohortRetention.objects.all()
+        }
+
+    def test_curves(self):
+        self.assertEqual(cohorts.refresh(date(2026, 4, 15)), 2)
+        self.assertEqual(self.curves(), {
+            (date(2026, 1, 1), 0): (2, 2, 0, 0),
+            (date(2026, 1, 1), 1): (2, 2, 1, 1),
+            (date(2026, 1, 1), 2): (2, 1, 0, 1),
+            (date(2026, 1, 1), 3): (2, 0, 0, 0),
+            (date(2026, 2, 1), 0): (1, 1, 0, 0),
+            (date(2026, 2, 1), 1): (1, 1, 1, 0),
+            (date(2026, 2, 1), 2): (1, 1, 1, 0),
+        })
+
+    def test_without_numpy(self):
+        from unittest import mock
+        rows = list(cohorts.plans(date(2026, 4, 15)))
+        with mock.patch.object(cohorts, 'numpy', None):
+            python = cohorts.curves(rows, date(2026, 4, 15))
+        normalized = lambda result: {
+            cohort: (size, {offset: list(values) for offset, values in counts.items() if any(values)})
+            for cohort, (size, counts) in result.items()
+        }
+        if cohorts.numpy is not None:
+            self.assertEqual(normalized(python), normalized(cohorts.curves(rows, date(2026, 4, 15))))
+        self.assertEqual(normalized(python)[cohorts.month_index(date(2026, 1, 1))][1][2], [1, 0, 1])
+
+    def test_incremental_refresh_matches_full(self):
+        cohorts.refresh(date(2026, 4, 15))
+        # A saved plan (ben comes back) and the calendar alone (cy's plan ends)
+        UserMembership.objects.create(user=self.members['ben'], plan=self.plan, start_date=date(2026, 5, 1))
+        for today in [date(2026, 5, 2), date(2026, 5, 20), date(2026, 7, 1)]:
+            cohorts.refresh(today)
+            incremental = self.curves()
+            cohorts.refresh(today, full=True)
+            self.assertEqual(incremental, self.curves(), today)
+        self.assertEqual(self.curves()[date(2026, 1, 1), 4], (2, 1, 1, 1))
+
+    def test_deleted_and_moved_plans_leave_their_cohort(self):
+        from .models import StaleCohort
+        cohorts.refresh(date(2026, 4, 15))
+        UserMembership.objects.get(user=self.members['ben']).delete()
+        cohorts.refresh(date(2026, 4, 16))
+        self.assertEqual(self.curves()[date(2026, 1, 1), 0], (1, 1, 0, 0))
+
+        # ana's first plan moves to February, out of the January cohort
+        first = UserMembership.objects.get(user=self.members['ana'], start_date=date(2026, 1, 10))
+        first.start_date, first.end_date = date(2026, 2, 1), None
+        first.save()
+        cohorts.refresh(date(2026, 4, 17))
+        incremental = self.curves()
+        self.assertFalse(StaleCohort.objects.exists())
+        self.assertNotIn((date(2026, 1, 1), 0), incremental)
+        self.assertEqual(incremental[date(2026, 2, 1), 0], (2, 2, 1, 0))
+        cohorts.refresh(date(2026, 4, 17), full=True)
+        self.assertEqual(incremental, self.curves())
+
+    def test_nightly_job_refreshes_cohorts(self):
+        from django.core.management import call_command
+        call_command('expire_memberships', stdout=io.StringIO())
+        self.assertEqual(CohortRetention.objects.filter(offset=0).count(), 2)
+
+    def test_report_reads_only_the_cache(self):
+        from django.test.utils import CaptureQueriesContext
+        cohorts.refresh(date(2026, 4, 15))
+        self.client.force_login(self.admin)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('retention_report'), {'curve': 'churned'})
+        self.assertContains(response, 'Jan 2026')
+        self.assertContains(response, '50.0%')
+        self.assertFalse([q['sql'] for q in queries if 'FROM "user_memberships"' in q['sql']])
+
+
+@override_settings(NOTIFICATION_OUTBOX_BACKEND='gym_app.notifications.MemoryOutbox', EXPIRY_NOTICE_DAYS=7)
+class ExpiryNotificationTests(TestCase):
+    """Members expiring soon are reminded once per channel and end date"""
+
+    @classmethod
+    def setUpTestData(cls):
+        plan = MembershipPlan.objects.create(name='Monthly', duration_days=30, price=Decimal('1500'))
+        today = date.today()
+        cls.members = {}
+        for name, email, mobile, ends_in in [
+            ('ana', 'ana@example.com', '09171234567', 3),
+            ('ben', 'ben@example.com', '', 10),  # outside the window
+            ('cy', '', None, 2),  # no way to reach
+        ]:
+            user = User.objects.create_user(name, email, 'pw', role='member', mobile_no=mobile)
+            UserMembership.objects.create(user=user, plan=plan, start_date=today + timedelta(days=ends_in - 30))
+            cls.members[name] = user
+
+    def setUp(self):
+        notifications.outbox.clear()
+
+    def test_reminds_each_member_once(self):
+        result = notifications.notify_expiring()
+        self.assertEqual(result.sent, {'email': 1, 'sms': 1})
+        self.assertEqual((result.members, result.unreachable), (2, 1))
+        self.assertEqual({(m.channel, m.recipient) for m in notifications.outbox},
+                         {('email', 'ana@example.com'), ('sms', '09171234567')})
+        self.assertIn('in 3 days', next(m.body for m in notifications.outbox if m.channel == 'email'))
+
+        result = notifications.notify_expiring()
+        self.assertEqual((sum(result.sent.values()), result.already_sent), (0, 2))
+        self.assertEqual(len(notifications.outbox), 2)
+        self.assertEqual(ExpiryNotice.objects.count(), 2)
+        # One audit entry for the run that sent something
+        self.assertEqual(AuditLog.objects.filter(action='reminders_sent').count(), 1)
+
+    def test_failed_send_is_retried(self):
+        from unittest import mock
+        with mock.patch.object(notifications.MemoryOutbox, 'send_messages', side_effect=OSError):
+            with self.assertRaises(OSError):
+                notifications.notify_expiring()
+        self.assertFalse(ExpiryNotice.objects.exists())
+        self.assertEqual(sum(notifications.notify_expiring().sent.values()), 2)
+
+    def test_overlapping_run_sends_only_its_own_reminders(self):
+        from unittest import mock
+        recipients = notifications.recipients
+
+        def racing(user):
+            # Another run records the e-mail after this one read the notices
+            if user.email:
+                ExpiryNotice.objects.get_or_create(user=user, end_date=user.coverage.end_date, channel='email')
+            yield from recipients(user)
+
+        with mock.patch.object(notifications, 'recipients', racing):
+            result = notifications.notify_expiring()
+        self.assertEqual(result.sent, {'email': 0, 'sms': 1})
+        self.assertEqual(result.already_sent, 1)
+        self.assertEqual([m.channel for m in notifications.outbox], ['sms'])
+        self.assertEqual(ExpiryNotice.objects.count(), 2)
+
+    def test_dry_run_records_nothing(self):
+        result = notifications.notify_expiring(days=14, dry_run=True)
+        self.assertEqual(sum(result.sent.values()), 3)
+        self.assertFalse(notifications.outbox)
+        self.assertFalse(ExpiryNotice.objects.exists())
+
+    def test_scans_the_end_date_index(self):
+        plan = notifications.expiring(date.today(), 7).explain()
+        self.assertIn('membership_coverage_end_date', plan)
+
+    def test_command_with_file_outbox(self):
+        import json
+        from django.core.management import call_command
+        with tempfile.TemporaryDirectory() as outbox_dir:
+            with override_settings(NOTIFICATION_OUTBOX_DIR=outbox_dir):
+                call_command('notify_expiring', backend='gym_app.notifications.FileOutbox', stdout=io.StringIO())
+            [filename] = os.listdir(outbox_dir)
+            with open(os.path.join(outbox_dir, filename), encoding='utf-8') as f:
+                lines = [json.loads(line) for line in f]
+        self.assertEqual(sorted(line['channel'] for line in lines), ['email', 'sms'])
+
+
+class MemberImportTests(TestCase):
+    """CSV import: valid rows, duplicates within the file and against existing accounts"""
+
+    HEADER = 'username,email,first_name,last_name,password,plan,payment_method\n'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.plan = MembershipPlan.objects.create(name='Monthly', duration_days=30, price=Decimal('1500'))
+        User.objects.create_user('Bob', 'Bob@Example.com', 'pw', role='member')
+
+    def run_import(self, rows, **kwargs):
+        from .importers import import_members_csv
+        return import_members_csv(io.StringIO(self.HEADER + rows), hash_workers=0, **kwargs)
+
+    def test_valid_rows(self):
+        result = self.run_import(
+            'ana,ana@example.com,Ana,Cruz,secret123,Monthly,cash\n'
+            'cy,cy@example.com,Cy,Reyes,,,\n'
+        )
+        self.assertEqual((result.rows, result.users, result.memberships, result.payments), (2, 2, 1, 1))
+        self.assertFalse(result.errors)
+        ana = User.objects.get(username='ana')
+        self.assertTrue(ana.check_password('secret123'))
+        self.assertTrue(ana.kiosk_pin)
+        self.assertFalse(User.objects.get(username='cy').has_usable_password())
+        self.assertEqual(Payment.objects.get(user=ana).amount, Decimal('1500'))
+
+    def test_duplicates_in_file(self):
+        result = self.run_import(
+            'ana,ana@example.com,,,,,\n'
+            'ANA,other@example.com,,,,,\n'
+            'dee,Ana@Example.com,,,,,\n'
+        )
+        self.assertEqual(result.users, 1)
+        self.assertEqual([line_no for line_no, message in result.errors], [3, 4])
+
+    def test_case_variant_clashes_with_existing_users(self):
+        result = self.run_import(
+            'bob,new@example.com,,,,,\n'
+            'robert,bob@example.com,,,,,\n'
+        )
+        self.assertEqual(result.users, 0)
+        self.assertEqual([message for line_no, message in result.errors], [
+            'Username already exists: bob', 'Email already registered: bob@example.com',
+        ])
+        self.assertEqual(User.objects.filter(role='member').count(), 1)
+
+    def test_bad_rows(self):
+        result = self.run_import(
+            ',nobody@example.com,,,,,\n'
+            'eve,not-an-email,,,,,\n'
+            'fay,fay@example.com,,,,Yearly,\n'
+            'gus,gus@example.com,,,,,cash\n'
+            'hal,hal@example.com,,,,Monthly,cheque\n'
+        )
+        self.assertEqual((result.rows, result.users), (5, 0))
+        self.assertEqual(len(result.errors), 5)
+
+    def test_dry_run_writes_nothing(self):
+        result = self.run_import('ana,ana@example.com,,,,Monthly,cash\n', dry_run=True)
+        self.assertEqual((result.users, result.payments), (1, 1))
+        self.assertFalse(User.objects.filter(username='ana').exists())
+
+    def test_admin_reports_integrity_errors(self):
+        from unittest import mock
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from django.db import IntegrityError
+        admin_user = User.objects.create_superuser('root', 'root@example.com', 'pw')
+        self.client.force_login(admin_user)
+        upload = SimpleUploadedFile('members.csv', (self.HEADER + 'ana,ana@example.com,,,,,\n').encode())
+        with mock.patch('gym_app.admin.import_members_csv', side_effect=IntegrityError('UNIQUE constraint failed')):
+            response = self.client.post(reverse('admin:gym_app_user_import_csv'), {
+                'csv_file': upload, 'batch_size': 500,
+            })
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Import stopped by a conflicting record')
+
+
+class PasswordHasherPoolTests(SimpleTestCase):
+    """Pooled hashing gives the same usable hashes as make_password"""
+
+    def test_in_process(self):
+        from django.contrib.auth.hashers import check_password, is_password_usable
+        from .hashing import PasswordHasherPool
+        with PasswordHasherPool(workers=0) as pool:
+            hashes = pool.hash_many(['one', None, 'three'])
+        self.assertTrue(check_password('one', hashes[0]))
+        self.assertFalse(is_password_usable(hashes[1]))
+        self.assertTrue(check_password('three', hashes[2]))
+
+    def test_worker_processes_keep_order(self):
+        from django.contrib.auth.hashers import check_password
+        from .hashing import MIN_PARALLEL_BATCH, hash_passwords
+        passwords = [f'secret-{n}' for n in range(MIN_PARALLEL_BATCH * 2)]
+        hashes = hash_passwords(passwords, workers=2)
+        self.assertEqual(len(hashes), len(passwords))
+        self.assertTrue(all(check_password(password, encoded) for password, encoded in zip(passwords, hashes)))
+        self.assertEqual(len(set(hashes)), len(hashes))
+
+
+class SettingsProfileTests(SimpleTestCase):
+    """The production profile refuses unsafe configuration"""
+
+    def test_prod_requires_a_secret_key(self):
+        import subprocess
+        import sys
+        env = {key: value for key, value in os.environ.items() if key != 'DJANGO_SECRET_KEY'}
+        env.update(DJANGO_SETTINGS_MODULE='gym_project.settings', GYM_ENV='prod')
+        check = [sys.executable, '-c', 'from django.conf import settings; settings.SECRET_KEY']
+        cwd = str(settings.BASE_DIR)
+        result = subprocess.run(check, env=env, cwd=cwd, capture_output=True, text=True)
+        self.assertNotEqual(result.returncode, 0)
+        self.assertIn('Set DJANGO_SECRET_KEY', result.stderr)
+
+        env['DJANGO_SECRET_KEY'] = 'from-the-environment'
+        subprocess.run(check, env=env, cwd=cwd, capture_output=True, check=True)
@@ -15,6 +15,9 @@ urlpatterns = [
     
     # Dashboard (role-based)
     path('dashboard/', views.dashboard, name='dashboard'),
+    path('dashboard/summary/', views.dashboard_summary, name='dashboard_summary'),
+    path('dashboard/attendance/', views.dashboard_attendance, name='dashboard_attendance'),
+    path('dashboard/events/', views.events_stream, name='events_stream'),
     
     # Membership management
     path('plans/', views.membership_plans_view, name='membership_plans'),
@@ -23,9 +26,13 @@ urlpatterns = [
     # Walk-in management (staff/admin)
     path('walkin/', views.walkin_purchase, name='walkin_purchase'),
     path('walkin/confirm/', views.walkin_confirm, name='walkin_confirm'),
+    path('walkin/batch/', views.walkin_batch, name='walkin_batch'),
+    path('walkin/batch/<int:batch_id>/receipt/', views.walkin_batch_receipt, name='walkin_batch_receipt'),
     
     # Reports & Analytics (admin)
     path('reports/', views.reports_view, name='reports'),
+    path('reports/revenue/', views.revenue_report, name='revenue_report'),
+    path('reports/retention/', views.retention_report, name='retention_report'),
     path('audit-trail/', views.audit_trail_view, name='audit_trail'),
     path('manage-plans/', views.manage_plans_view, name='manage_plans'),
     
@@ -37,7 +44,13 @@ urlpatterns = [
     # Kiosk (no authentication required)
     path('kiosk/', views.kiosk_login, name='kiosk_login'),
     path('kiosk/success/<str:action>/<int:duration>/<int:user_id>/', views.kiosk_success, name='kiosk_success'),
+    path('kiosk/success/<str:action>/<int:duration>/walkin/<int:walkin_id>/', views.kiosk_walkin_success, name='kiosk_walkin_success'),
     
     # Attendance reports (staff/admin)
     path('attendance/', views.attendance_report, name='attendance_report'),
+    
+    # Performance metrics (admin)
+    path('metrics/', views.metrics_view, name='metrics'),
+    path('metrics/prometheus/', views.metrics_prometheus, name='metrics_prometheus'),
+    path('slow-queries/', views.slow_queries_view, name='slow_queries'),
 ]
\ No newline at end of file
@@ -1,29 +1,44 @@
-from django.shortcuts import render, redirect, get_object_or_404
+from django.shortcuts import render, redirect, get_object_or_404, aget_object_or_404
+from django.conf import settings
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Sum, Count, Q
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.db.models import Count, Q
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.utils import timezone
+from django.utils.dateparse import parse_date
+import hmac
 from datetime import date, timedelta
 from decimal import Decimal
 
 from .models import (
     User, MembershipPlan, FlexibleAccess, 
-    UserMembership, Payment, WalkInPayment, Analytics, AuditLog
+    UserMembership, MembershipCoverage, Payment, WalkInBatch, WalkInPayment, WalkInPassCode, Analytics, AuditLog,
+    RevenueDailySummary, Attendance, day_range
 )
+from .catalog import catalog, get_catalog_version, catalog_cache_timeout
+from .decoraters import cache_anonymous_page
+from .profiling import registry as metrics_registry, prometheus_text
+from . import cohorts, events, ledger, revenue_cube, subscriptions, tasks, walkins
+from .taskqueue import enqueue
 
 
 # ==================== Public Views ====================
 
+@cache_anonymous_page('home')
 def home(request):
     """Homepage - displays available plans and walk-in options"""
     # Get only ACTIVE plans and passes
-    membership_plans = MembershipPlan.objects.filter(is_active=True).order_by('price')
-    walk_in_passes = FlexibleAccess.objects.filter(is_active=True).order_by('duration_days')
+    membership_plans = catalog.active_plans()
+    walk_in_passes = catalog.active_passes()
     
     context = {
         'membership_plans': membership_plans,
         'walk_in_passes': walk_in_passes,
+        'catalog_version': get_catalog_version(),
+        'catalog_cache_timeout': catalog_cache_timeout(),
     }
     return render(request, 'gym_app/home.html', context)
 
@@ -186,46 +201,28 @@ def admin_dashboard(request):
     # Get today's stats
     today = date.today()
     
-    # Active memberships
-    active_memberships = UserMembership.objects.filter(
-        status='active',
+    # Members covered today
+    active_memberships = MembershipCoverage.objects.filter(
+        start_date__lte=today,
         end_date__gte=today
     ).count()
     
     # Total members
     total_members = User.objects.filter(role='member').count()
     
-    # Today's revenue
-    today_member_sales = Payment.objects.filter(
-        payment_date__date=today
-    ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-    
-    today_walkin_sales = WalkInPayment.objects.filter(
-        payment_date__date=today
-    ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-    
-    today_revenue = today_member_sales + today_walkin_sales
-    
-    # This month's revenue
-    month_start = today.replace(day=1)
-    month_member_sales = Payment.objects.filter(
-        payment_date__date__gte=month_start
-    ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-    
-    month_walkin_sales = WalkInPayment.objects.filter(
-        payment_date__date__gte=month_start
-    ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-    
-    month_revenue = month_member_sales + month_walkin_sales
+    # Today's and this month's revenue, from the ledger's daily summaries
+    revenue_rows = list(RevenueDailySummary.rows(today.replace(day=1), today))
+    today_revenue = sum(RevenueDailySummary.tally(revenue_rows, today)[1].values())
+    month_revenue = sum(RevenueDailySummary.tally(revenue_rows)[1].values())
     
     # Recent payments
     recent_payments = Payment.objects.select_related('user', 'membership__plan')[:10]
     recent_walkins = WalkInPayment.objects.select_related('pass_type')[:10]
     
-    # Expiring soon (next 7 days)
+    # Expiring soon (next 7 days, not renewed)
     expiring_soon = UserMembership.objects.filter(
         status='active',
-        end_date__range=[today, today + timedelta(days=7)]
+        user__coverage__end_date__range=[today, today + timedelta(days=7)]
     ).select_related('user', 'plan')[:10]
     
     context = {
@@ -236,6 +233,7 @@ def admin_dashboard(request):
         'recent_payments': recent_payments,
         'recent_walkins': recent_walkins,
         'expiring_soon': expiring_soon,
+        'live_event_id': events.bus.last_id,
     }
     
     return render(request, 'gym_app/dashboard_admin.html', context)
@@ -250,38 +248,24 @@ def staff_dashboard(request):
     
     today = date.today()
     
-    # Today's transactions
-    today_payments = Payment.objects.filter(
-        payment_date__date=today
-    ).count()
-    
-    today_walkins = WalkInPayment.objects.filter(
-        payment_date__date=today
-    ).count()
-    
-    # Today's revenue
-    today_member_sales = Payment.objects.filter(
-        payment_date__date=today
-    ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-    
-    today_walkin_sales = WalkInPayment.objects.filter(
-        payment_date__date=today
-    ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-    
-    today_revenue = today_member_sales + today_walkin_sales
+    # Today's transactions and revenue, from the ledger's daily summaries
+    counts, totals = RevenueDailySummary.tally(RevenueDailySummary.rows(today, today))
+    today_payments = counts['membership']
+    today_walkins = counts['walk_in']
+    today_revenue = sum(totals.values())
     
     # Recent activity
     recent_payments = Payment.objects.select_related('user', 'membership__plan')[:10]
     recent_walkins = WalkInPayment.objects.select_related('pass_type')[:10]
     
-    # Expiring soon
+    # Expiring soon (not renewed)
     expiring_soon = UserMembership.objects.filter(
         status='active',
-        end_date__range=[today, today + timedelta(days=7)]
+        user__coverage__end_date__range=[today, today + timedelta(days=7)]
     ).select_related('user', 'plan')[:10]
     
     # Available membership plans
-    membership_plans = MembershipPlan.objects.filter(is_active=True)
+    membership_plans = catalog.active_plans()
     
     context = {
         'today_payments': today_payments,
@@ -291,6 +275,7 @@ def staff_dashboard(request):
         'recent_walkins': recent_walkins,
         'expiring_soon': expiring_soon,
         'membership_plans': membership_plans,
+        'live_event_id': events.bus.last_id,
     }
     
     return render(request, 'gym_app/dashboard_staff.html', context)
@@ -312,13 +297,17 @@ def member_dashboard(request):
         user=user
     ).select_related('membership__plan').order_by('-payment_date')[:10]
     
-    # All memberships (history)
+    # All memberships (history and queued renewals)
     all_memberships = UserMembership.objects.filter(
         user=user
     ).select_related('plan').order_by('-start_date')
     
+    # Covered-until date including queued renewals
+    coverage = MembershipCoverage.objects.filter(user=user).first()
+    
     context = {
         'current_membership': current_membership,
+        'coverage': coverage,
         'payment_history': payment_history,
         'all_memberships': all_memberships,
     }
@@ -326,13 +315,110 @@ def member_dashboard(request):
     return render(request, 'gym_app/dashboard_member.html', context)
 
 
+# ==================== Dashboard Metric Endpoints ====================
+# Polled by the front-desk and office terminals, or pushed to them as they
+# happen (events_stream). Async so one ASGI worker can keep many terminals
+# updated while kiosks check members in.
+
+
+async def _terminal_user(request):
+    """Logged-in staff/admin user for a metric endpoint, else None"""
+    user = await request.auser()
+    if user.is_authenticated and user.is_staff_or_admin():
+        return user
+    return None
+
+
+async def dashboard_summary(request):
+    """Today's sales for dashboard terminals, plus month and membership totals for admins (JSON)"""
+    user = await _terminal_user(request)
+    if user is None:
+        return JsonResponse({'error': 'Access denied.'}, status=403)
+    
+    today = date.today()
+    since = today.replace(day=1) if user.is_admin() else today
+    # One range read of the ledger's daily summaries
+    revenue_rows = [row async for row in RevenueDailySummary.rows(since, today)]
+    counts, totals = RevenueDailySummary.tally(revenue_rows, today)
+    
+    data = {
+        'date': today.isoformat(),
+        'today_payments': counts['membership'],
+        'today_walkins': counts['walk_in'],
+        'today_revenue': sum(totals.values()),
+    }
+    
+    if user.is_admin():
+        data['month_revenue'] = sum(RevenueDailySummary.tally(revenue_rows)[1].values())
+        data['active_memberships'] = await MembershipCoverage.objects.filter(
+            start_date__lte=today,
+            end_date__gte=today
+        ).acount()
+        data['total_members'] = await User.objects.filter(role='member').acount()
+    
+    return JsonResponse(data)
+
+
+async def dashboard_attendance(request):
+    """Members on the floor, today's check-ins and the latest kiosk activity (JSON)"""
+    if await _terminal_user(request) is None:
+        return JsonResponse({'error': 'Access denied.'}, status=403)
+    
+    today = date.today()
+    start, end = day_range(today)
+    inside = Q(check_out__isnull=True)
+    checked_in_today = Q(check_in__gte=start, check_in__lt=end)
+    counts = await Attendance.objects.filter(inside | checked_in_today).aaggregate(
+        currently_checked_in=Count('id', filter=inside),
+        today_checkins=Count('id', filter=checked_in_today),
+        today_walkin_checkins=Count('id', filter=checked_in_today & Q(walk_in__isnull=False)),
+    )
+    
+    recent = [
+        {
+            'member': attendance.visitor_name,
+            'walk_in': attendance.walk_in_id is not None,
+            'check_in': attendance.check_in,
+            'check_out': attendance.check_out,
+            'duration': attendance.get_duration_display(),
+        }
+        async for attendance in Attendance.objects.select_related('user', 'walk_in')[:10]
+    ]
+    
+    return JsonResponse({'date': today.isoformat(), **counts, 'recent': recent})
+
+
+async def events_stream(request):
+    """
+    Server-sent events for the live dashboards (staff/admin).
+    
+    Resumes after ``Last-Event-ID`` on reconnect, or after ``?since=`` (the
+    id the page was rendered with) on first connect.
+    """
+    if await _terminal_user(request) is None:
+        return HttpResponse('Forbidden\n', status=403, content_type='text/plain')
+    
+    last_id = request.headers.get('Last-Event-ID') or request.GET.get('since') or '0'
+    last_id = int(last_id) if last_id.isdigit() else 0
+    
+    if isinstance(request, ASGIRequest):
+        content = events.stream(last_id)
+    else:
+        content = events.stream_sync(last_id)
+    response = StreamingHttpResponse(content, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Tell nginx not to buffer the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 # ==================== Membership Management ====================
 
 @login_required
 def membership_plans_view(request):
     """View all available membership plans"""
     # Get only ACTIVE plans
-    plans = MembershipPlan.objects.filter(is_active=True).order_by('price')
+    plans = catalog.active_plans()
     
     # If member, show if they have active membership
     current_membership = None
@@ -340,11 +426,13 @@ def membership_plans_view(request):
         current_membership = UserMembership.objects.filter(
             user=request.user,
             status='active'
-        ).first()
+        ).select_related('plan', 'user__coverage').first()
     
     context = {
         'plans': plans,
         'current_membership': current_membership,
+        'catalog_version': get_catalog_version(),
+        'catalog_cache_timeout': catalog_cache_timeout(),
     }
     
     return render(request, 'gym_app/membership_plans.html', context)
@@ -360,89 +448,58 @@ def subscribe_plan(request, plan_id):
         messages.error(request, 'Only members can subscribe to plans.')
         return redirect('membership_plans')
     
-    plan = get_object_or_404(MembershipPlan, id=plan_id, is_active=True)
-    
-    # Check if user already has active membership
-    active_membership = UserMembership.objects.filter(
-        user=request.user,
-        status='active'
-    ).first()
-    
-    if active_membership:
-        messages.warning(request, 'You already have an active membership.')
-        return redirect('dashboard')
+    plan = catalog.plan_or_404(plan_id)
     
     if request.method == 'POST':
         payment_method = request.POST.get('payment_method')
         reference_no = request.POST.get('reference_no', '')
+        pin_pending = not request.user.kiosk_pin
         
-        # Create membership
-        membership = UserMembership.objects.create(
-            user=request.user,
-            plan=plan,
-            start_date=date.today(),
-            status='active'
-        )
-        
-        # Create payment record
-        payment = Payment.objects.create(
-            user=request.user,
-            membership=membership,
-            amount=plan.price,
-            method=payment_method,
-            reference_no=reference_no,
-            payment_date=timezone.now()
-        )
-        
-        # Generate kiosk PIN if user doesn't have one
-        pin_generated = False
-        if not request.user.kiosk_pin:
-            pin = request.user.generate_kiosk_pin()
-            pin_generated = True
-        
-        # Log subscription
-        AuditLog.log(
-            action='membership_created',
-            user=request.user,
-            description=f'Subscribed to {plan.name} - ₱{plan.price}',
-            severity='info',
-            request=request,
-            model_name='UserMembership',
-            object_id=membership.id,
-            object_repr=str(membership),
-            plan_name=plan.name,
-            amount=float(plan.price)
-        )
+        if payment_method not in subscriptions.PAYMENT_METHODS:
+            messages.error(request, 'Select a payment method.')
+            return redirect('subscribe_plan', plan_id=plan_id)
+        try:
+            starts_on = parse_date(request.POST.get('starts_on', ''))
+        except ValueError:
+            messages.error(request, 'Invalid start date. Please try again.')
+            return redirect('subscribe_plan', plan_id=plan_id)
         
-        # Log payment
-        AuditLog.log(
-            action='payment_received',
-            user=request.user,
-            description=f'Payment received: ₱{plan.price} via {payment_method}',
-            severity='info',
-            request=request,
-            model_name='Payment',
-            object_id=payment.id,
-            object_repr=str(payment),
-            amount=float(plan.price),
-            payment_method=payment_method
-        )
+        # One transaction: a double-submitted form cannot buy twice
+        try:
+            payment = subscriptions.subscribe(
+                request.user, plan, payment_method, reference_no, request=request, starts_on=starts_on,
+            )
+        except subscriptions.AlreadySubscribed:
+            messages.warning(
+                request, 'Your membership has already been updated. Please check it before buying again.'
+            )
+            return redirect('dashboard')
         
-        # Show success message with PIN if generated
-        if pin_generated:
+        if payment.membership.status == 'scheduled':
+            messages.success(
+                request,
+                f'Renewal confirmed! {plan.name} starts on '
+                f'{payment.membership.start_date:%b %d, %Y}, right after your current plan.'
+            )
+        elif pin_pending:
             messages.success(
                 request, 
                 f'Successfully subscribed to {plan.name}! '
-                f'Your kiosk PIN is: {request.user.kiosk_pin}. '
-                f'Please save this PIN to use at the attendance kiosk.'
+                f'Your kiosk PIN will appear on your dashboard shortly. '
+                f'Please save it to use at the attendance kiosk.'
             )
         else:
             messages.success(request, f'Successfully subscribed to {plan.name}!')
         
         return redirect('dashboard')
     
+    # Members who are still covered renew: the plan starts when coverage ends
+    coverage = subscriptions.current_coverage(request.user)
+    
     context = {
         'plan': plan,
+        'coverage': coverage,
+        'starts_on': subscriptions.renewal_start(coverage),
     }
     
     return render(request, 'gym_app/subscribe_plan.html', context)
@@ -464,7 +521,7 @@ def walkin_purchase(request):
         payment_method = request.POST.get('payment_method')
         reference_no = request.POST.get('reference_no', '')
         
-        pass_type = get_object_or_404(FlexibleAccess, id=pass_id, is_active=True)
+        pass_type = catalog.pass_or_404(pass_id)
         
         # Store in session for confirmation
         request.session['pending_walkin'] = {
@@ -480,8 +537,8 @@ def walkin_purchase(request):
         return redirect('walkin_confirm')
     
     # Get only ACTIVE passes
-    passes = FlexibleAccess.objects.filter(is_active=True).order_by('duration_days')
-    recent_walkins = WalkInPayment.objects.select_related('pass_type')[:10]
+    passes = catalog.active_passes()
+    recent_walkins = WalkInPayment.objects.select_related('pass_type', 'pass_code')[:10]
     
     context = {
         'passes': passes,
@@ -507,39 +564,52 @@ def walkin_confirm(request):
         action = request.POST.get('action')
         
         if action == 'confirm':
-            pass_type = get_object_or_404(FlexibleAccess, id=pending['pass_id'], is_active=True)
+            pass_type = catalog.pass_or_404(pending['pass_id'])
             
-            # Create walk-in payment
-            walkin_payment = WalkInPayment.objects.create(
-                pass_type=pass_type,
-                customer_name=pending['customer_name'],
-                mobile_no=pending['mobile_no'],
-                amount=pass_type.price,
-                method=pending['payment_method'],
-                reference_no=pending['reference_no'],
-                payment_date=timezone.now()
-            )
-            
-            # Log walk-in sale
-            AuditLog.log(
-                action='walkin_sale',
-                user=request.user,
-                description=f'Walk-in sale: {pass_type.name} - ₱{pass_type.price} to {pending["customer_name"] or "Anonymous"}',
-                severity='info',
-                request=request,
-                model_name='WalkInPayment',
-                object_id=walkin_payment.id,
-                object_repr=str(walkin_payment),
-                pass_name=pass_type.name,
-                amount=float(pass_type.price),
-                customer=pending['customer_name'] or 'Anonymous',
-                payment_method=pending['payment_method']
-            )
+            with transaction.atomic():
+                walkin_payment = WalkInPayment.objects.create(
+                    pass_type=pass_type.as_model(),
+                    customer_name=pending['customer_name'],
+                    mobile_no=pending['mobile_no'],
+                    amount=pass_type.price,
+                    method=pending['payment_method'],
+                    reference_no=pending['reference_no'],
+                    payment_date=timezone.now()
+                )
+                [pass_code] = WalkInPassCode.issue([walkin_payment])
+                ledger.record([walkin_payment], staff=request.user)
+                
+                enqueue(
+                    tasks.write_audit_logs.defer(entries=[tasks.audit_entry(
+                        action='walkin_sale',
+                        user=request.user,
+                        description=f'Walk-in sale: {pass_type.name} - ₱{pass_type.price} to {pending["customer_name"] or "Anonymous"}',
+                        severity='info',
+                        request=request,
+                        model_name='WalkInPayment',
+                        object_id=walkin_payment.id,
+                        object_repr=str(walkin_payment),
+                        pass_name=pass_type.name,
+                        amount=float(pass_type.price),
+                        customer=pending['customer_name'] or 'Anonymous',
+                        payment_method=pending['payment_method']
+                    )]),
+                    tasks.refresh_daily_analytics.defer(day=date.today().isoformat()),
+                )
+                
+                events.publish_on_commit(
+                    'sale', kind='walkin', item=pass_type.name, amount=pass_type.price,
+                    method=pending['payment_method'],
+                )
             
             # Clear session
             del request.session['pending_walkin']
             
-            messages.success(request, f'Walk-in pass sold successfully! (₱{pass_type.price})')
+            messages.success(
+                request,
+                f'Walk-in pass sold successfully! (₱{pass_type.price}) '
+                f'Kiosk code: {pass_code.code}, valid until {pass_code.valid_until:%b %d, %Y}'
+            )
             return redirect('walkin_purchase')
         else:
             # Cancel
@@ -554,6 +624,99 @@ def walkin_confirm(request):
     return render(request, 'gym_app/walkin_confirm.html', context)
 
 
+@login_required
+def walkin_batch(request):
+    """Sell walk-in passes to a group in one transaction (staff/admin only)"""
+    if not request.user.is_staff_or_admin():
+        messages.error(request, 'Access denied.')
+        return redirect('dashboard')
+
+    passes = catalog.active_passes()
+    rows = []
+    errors = []
+
+    if request.method == 'POST':
+        payment_method = request.POST.get('payment_method')
+        reference_no = request.POST.get('reference_no', '')
+        label = request.POST.get('label', '')
+
+        active = {str(p.id): p for p in passes}
+        lines = []
+        for number, (pass_id, customer_name, mobile_no) in enumerate(zip(
+            request.POST.getlist('pass_id'),
+            request.POST.getlist('customer_name'),
+            request.POST.getlist('mobile_no'),
+        ), start=1):
+            if not pass_id and not customer_name.strip() and not mobile_no.strip():
+                continue
+            rows.append({'pass_id': pass_id, 'customer_name': customer_name, 'mobile_no': mobile_no})
+            pass_type = active.get(pass_id)
+            if pass_type is None:
+                errors.append(f'Row {number}: select an available pass.')
+                continue
+            lines.append(walkins.BatchLine(pass_type, customer_name, mobile_no))
+
+        if payment_method not in dict(WalkInBatch.PAYMENT_METHOD_CHOICES):
+            errors.append('Select a payment method.')
+        if not rows:
+            errors.append('Add at least one pass.')
+        elif len(rows) > walkins.max_batch_size():
+            errors.append(f'A group sale can have at most {walkins.max_batch_size()} passes.')
+
+        if not errors:
+            batch = walkins.sell_batch(
+                lines, payment_method,
+                reference_no=reference_no,
+                label=label,
+                sold_by=request.user,
+                request=request,
+            )
+            messages.success(request, f'{batch.pass_count} walk-in passes sold! (₱{batch.total_amount})')
+            return redirect('walkin_batch_receipt', batch_id=batch.id)
+
+        for error in errors:
+            messages.error(request, error)
+
+    context = {
+        'passes': passes,
+        'rows': rows or [{}] * 5,
+        'max_passes': walkins.max_batch_size(),
+        'form': request.POST if errors else {},
+    }
+
+    return render(request, 'gym_app/walkin_batch.html', context)
+
+
+@login_required
+def walkin_batch_receipt(request, batch_id):
+    """Printable combined receipt for a group sale (staff/admin only)"""
+    if not request.user.is_staff_or_admin():
+        messages.error(request, 'Access denied.')
+        return redirect('dashboard')
+
+    batch = get_object_or_404(WalkInBatch.objects.select_related('sold_by'), id=batch_id)
+    payments = list(batch.payments.select_related('pass_type', 'pass_code').order_by('id'))
+
+    summary = {}
+    for payment in payments:
+        line = summary.setdefault(payment.pass_type_id, {
+            'name': payment.pass_type.name,
+            'price': payment.amount,
+            'count': 0,
+            'subtotal': Decimal('0.00'),
+        })
+        line['count'] += 1
+        line['subtotal'] += payment.amount
+
+    context = {
+        'batch': batch,
+        'payments': payments,
+        'summary': summary.values(),
+    }
+
+    return render(request, 'gym_app/walkin_batch_receipt.html', context)
+
+
 # ==================== Reports & Analytics ====================
 
 @login_required
@@ -563,21 +726,18 @@ def reports_view(request):
         messages.error(request, 'Access denied.')
         return redirect('dashboard')
     
-    # Generate today's analytics if not exists
-    Analytics.generate_daily_report()
+    # Generate today's analytics if not exists (sales refresh it through
+    # the task queue after that)
+    if not Analytics.objects.filter(date=date.today()).exists():
+        Analytics.generate_daily_report()
     
     # Get recent analytics
     recent_analytics = Analytics.objects.all()[:30]
     
-    # Summary stats
-    total_revenue = Payment.objects.aggregate(
-        total=Sum('amount')
-    )['total'] or Decimal('0.00')
-    
-    total_walkin_revenue = WalkInPayment.objects.aggregate(
-        total=Sum('amount')
-    )['total'] or Decimal('0.00')
-    
+    # Summary stats, from the ledger's daily summaries
+    totals = RevenueDailySummary.tally(RevenueDailySummary.rows())[1]
+    total_revenue = totals['membership']
+    total_walkin_revenue = totals['walk_in']
     grand_total = total_revenue + total_walkin_revenue
     
     context = {
@@ -590,6 +750,92 @@ def reports_view(request):
     return render(request, 'gym_app/reports.html', context)
 
 
+@login_required
+def revenue_report(request):
+    """Revenue pivot by period, payment method, source and plan/pass (admin only)"""
+    if not request.user.is_admin():
+        messages.error(request, 'Access denied.')
+        return redirect('dashboard')
+    
+    today = date.today()
+    default_first = today - timedelta(days=29)
+    try:
+        first = parse_date(request.GET.get('start', '')) or default_first
+        last = parse_date(request.GET.get('end', '')) or today
+    except ValueError:
+        messages.error(request, 'Invalid date. Showing the last 30 days.')
+        first, last = default_first, today
+    if first > last:
+        messages.error(request, 'The start date must be on or before the end date. Showing the last 30 days.')
+        first, last = default_first, today
+    
+    grain = request.GET.get('grain', 'day')
+    if grain not in revenue_cube.GRAINS:
+        grain = 'day'
+    measure = request.GET.get('measure', 'total')
+    if measure not in revenue_cube.MEASURES:
+        measure = 'total'
+    rows = request.GET.get('rows', 'period')
+    if rows not in revenue_cube.DIMENSIONS:
+        rows = 'period'
+    columns = request.GET.get('columns', 'method')
+    if columns not in revenue_cube.DIMENSIONS or columns == rows:
+        columns = 'method' if rows != 'method' else 'item'
+    
+    pivot = revenue_cube.Pivot(
+        revenue_cube.cube(first, last, grain), rows, columns, measure, revenue_cube.Labels(grain),
+    )
+    
+    context = {
+        'pivot': pivot,
+        'start': first,
+        'end': last,
+        'grain': grain,
+        'measure': measure,
+        'rows': rows,
+        'columns': columns,
+        'measure_label': revenue_cube.MEASURES[measure],
+        'rows_label': revenue_cube.DIMENSIONS[rows],
+        'columns_label': revenue_cube.DIMENSIONS[columns],
+        'grains': revenue_cube.GRAINS,
+        'measures': revenue_cube.MEASURES,
+        'dimensions': revenue_cube.DIMENSIONS,
+    }
+    
+    return render(request, 'gym_app/revenue_report.html', context)
+
+
+
+@login_required
+def retention_report(request):
+    """Renewal and churn curves of the monthly join cohorts (admin only)"""
+    if not request.user.is_admin():
+        messages.error(request, 'Access denied.')
+        return redirect('dashboard')
+    
+    curve = request.GET.get('curve', 'retained')
+    if curve not in cohorts.CURVES:
+        curve = 'retained'
+    try:
+        months = min(max(int(request.GET.get('months', 12)), 1), 60)
+    except ValueError:
+        months = 12
+    
+    # Read from the cache refreshed nightly by expire_memberships
+    rows, offsets, as_of = cohorts.retention_table(date.today(), curve, months)
+    
+    context = {
+        'rows': rows,
+        'offsets': offsets,
+        'as_of': as_of,
+        'curve': curve,
+        'curve_label': cohorts.CURVES[curve],
+        'curves': cohorts.CURVES,
+        'months': months,
+    }
+    
+    return render(request, 'gym_app/retention_report.html', context)
+
 # ==================== Member Management (Admin/Staff) ====================
 
 @login_required
@@ -930,8 +1176,8 @@ def manage_plans_view(request):
         return redirect('manage_plans')
     
     context = {
-        'membership_plans': MembershipPlan.objects.all().order_by('-duration_days'),
-        'walkin_passes': FlexibleAccess.objects.all().order_by('duration_days'),
+        'membership_plans': catalog.all_plans(),
+        'walkin_passes': catalog.all_passes(),
     }
     
     return render(request, 'gym_app/manage_plans.html', context)
@@ -939,34 +1185,39 @@ def manage_plans_view(request):
 
 # Add these views to gym_app/views.py
 
-from .models import Attendance
-from django.db.models import Q
-
 # ==================== Kiosk Views ====================
 
 
-def kiosk_login(request):
-    """Kiosk login page - PIN-based authentication"""
+async def kiosk_login(request):
+    """
+    Kiosk login page - PIN-based authentication
+    
+    Async so that many kiosks and terminals can be served by one ASGI worker
+    (see gym_project/asgi.py). Under WSGI it still works, one request per thread.
+    """
     if request.method == 'POST':
         kiosk_pin = request.POST.get('kiosk_pin', '').strip()
         
         # Validate PIN format
-        if not kiosk_pin or len(kiosk_pin) != 6 or not kiosk_pin.isdigit():
-            AuditLog.log(
+        if not kiosk_pin or len(kiosk_pin) not in (6, WalkInPassCode.CODE_LENGTH) or not kiosk_pin.isdigit():
+            await AuditLog.alog(
                 action='login_failed',
                 description=f'Invalid PIN format attempted: {kiosk_pin}',
                 severity='warning',
                 request=request
             )
-            messages.error(request, 'Invalid PIN. Please enter a 6-digit PIN.')
+            messages.error(request, 'Invalid PIN. Please enter a 6-digit PIN or an 8-digit walk-in pass code.')
             return render(request, 'gym_app/kiosk_login.html')
         
+        if len(kiosk_pin) == WalkInPassCode.CODE_LENGTH:
+            return await kiosk_walkin(request, kiosk_pin)
+        
         # Find user by PIN
         try:
-            user = User.objects.get(kiosk_pin=kiosk_pin, role='member')
+            user = await User.objects.select_related('coverage').aget(kiosk_pin=kiosk_pin, role='member')
         except User.DoesNotExist:
             # Log failed attempt
-            AuditLog.log(
+            await AuditLog.alog(
                 action='login_failed',
                 description=f'Kiosk access denied - Invalid PIN: {kiosk_pin}',
                 severity='warning',
@@ -975,16 +1226,12 @@ def kiosk_login(request):
             messages.error(request, 'Invalid PIN. Please check your PIN and try again.')
             return render(request, 'gym_app/kiosk_login.html')
         
-        # Check if user has active membership
-        active_membership = UserMembership.objects.filter(
-            user=user,
-            status='active',
-            end_date__gte=date.today()
-        ).first()
+        # Check if user is covered today (current plan or a renewal that took over)
+        coverage = getattr(user, 'coverage', None)
         
-        if not active_membership:
+        if coverage is None or not coverage.covers():
             # Log failed check-in attempt
-            AuditLog.log(
+            await AuditLog.alog(
                 action='permission_denied',
                 user=user,
                 description=f'Check-in denied - No active membership (PIN: {kiosk_pin})',
@@ -998,18 +1245,18 @@ def kiosk_login(request):
             return render(request, 'gym_app/kiosk_login.html')
         
         # Check if user is already checked in
-        current_checkin = Attendance.objects.filter(
+        current_checkin = await Attendance.objects.filter(
             user=user,
             check_out__isnull=True
-        ).first()
+        ).afirst()
         
         if current_checkin:
             # User is checking out
             current_checkin.check_out = timezone.now()
-            current_checkin.save()
+            await current_checkin.asave()
             
             # Log check-out
-            AuditLog.log(
+            await AuditLog.alog(
                 action='user_updated',
                 user=user,
                 description=f'Checked out via PIN - Duration: {current_checkin.get_duration_display()}',
@@ -1020,16 +1267,23 @@ def kiosk_login(request):
                 duration=current_checkin.duration_minutes
             )
             
+            events.bus.publish(
+                'checkout',
+                member=user.get_full_name() or user.username,
+                attendance_id=current_checkin.id,
+                duration=current_checkin.duration_minutes,
+            )
+            
             return redirect('kiosk_success', 
                           action='checkout', 
                           duration=current_checkin.duration_minutes,
                           user_id=user.id)
         else:
             # User is checking in
-            attendance = Attendance.objects.create(user=user)
+            attendance = await Attendance.objects.acreate(user=user)
             
             # Log check-in
-            AuditLog.log(
+            await AuditLog.alog(
                 action='user_updated',
                 user=user,
                 description=f'Checked in via PIN to gym',
@@ -1039,6 +1293,12 @@ def kiosk_login(request):
                 object_id=attendance.id
             )
             
+            events.bus.publish(
+                'checkin',
+                member=user.get_full_name() or user.username,
+                attendance_id=attendance.id,
+            )
+            
             return redirect('kiosk_success', 
                           action='checkin', 
                           duration=0,
@@ -1047,9 +1307,112 @@ def kiosk_login(request):
     return render(request, 'gym_app/kiosk_login.html')
 
 
-def kiosk_success(request, action, duration, user_id):
+async def kiosk_walkin(request, code):
+    """Check a walk-in pass in or out by its code (same flow as a member PIN)"""
+    try:
+        pass_code = await WalkInPassCode.objects.select_related('payment__pass_type').aget(code=code)
+    except WalkInPassCode.DoesNotExist:
+        await AuditLog.alog(
+            action='login_failed',
+            description=f'Kiosk access denied - Invalid walk-in code: {code}',
+            severity='warning',
+            request=request
+        )
+        messages.error(request, 'Invalid pass code. Please check your receipt and try again.')
+        return render(request, 'gym_app/kiosk_login.html')
+    
+    walk_in = pass_code.payment
+    guest = walk_in.customer_name or 'Walk-in Guest'
+    
+    if not pass_code.covers():
+        await AuditLog.alog(
+            action='permission_denied',
+            description=f'Check-in denied - {walk_in.pass_type.name} not valid today (code: {code})',
+            severity='warning',
+            request=request,
+            model_name='WalkInPayment',
+            object_id=walk_in.id
+        )
+        if pass_code.valid_from > date.today():
+            messages.error(request, f'This pass is valid from {pass_code.valid_from:%b %d, %Y}.')
+        else:
+            messages.error(request, f'This pass expired on {pass_code.valid_until:%b %d, %Y}. Please buy a new pass at the front desk.')
+        return render(request, 'gym_app/kiosk_login.html')
+    
+    current_checkin = await Attendance.objects.filter(
+        walk_in=walk_in,
+        check_out__isnull=True
+    ).afirst()
+    
+    if current_checkin:
+        current_checkin.check_out = timezone.now()
+        await current_checkin.asave()
+        
+        await AuditLog.alog(
+            action='user_updated',
+            description=f'Walk-in checked out via pass code - {guest} - Duration: {current_checkin.get_duration_display()}',
+            severity='info',
+            request=request,
+            model_name='Attendance',
+            object_id=current_checkin.id,
+            duration=current_checkin.duration_minutes
+        )
+        
+        events.bus.publish(
+            'checkout',
+            member=guest,
+            attendance_id=current_checkin.id,
+            duration=current_checkin.duration_minutes,
+        )
+        
+        return redirect('kiosk_walkin_success',
+                        action='checkout',
+                        duration=current_checkin.duration_minutes,
+                        walkin_id=walk_in.id)
+    
+    attendance = await Attendance.objects.acreate(walk_in=walk_in)
+    
+    await AuditLog.alog(
+        action='user_updated',
+        description=f'Walk-in checked in via pass code - {guest} ({walk_in.pass_type.name})',
+        severity='info',
+        request=request,
+        model_name='Attendance',
+        object_id=attendance.id
+    )
+    
+    events.bus.publish(
+        'checkin',
+        member=guest,
+        attendance_id=attendance.id,
+        walk_in=True,
+    )
+    
+    return redirect('kiosk_walkin_success',
+                    action='checkin',
+                    duration=0,
+                    walkin_id=walk_in.id)
+
+
+async def kiosk_walkin_success(request, action, duration, walkin_id):
+    """Success page after a walk-in check-in/check-out"""
+    pass_code = await aget_object_or_404(
+        WalkInPassCode.objects.select_related('payment__pass_type'), payment_id=walkin_id
+    )
+    
+    context = {
+        'action': action,
+        'duration': duration,
+        'walk_in': pass_code.payment,
+        'pass_code': pass_code,
+        'now': timezone.now(),
+    }
+    return render(request, 'gym_app/kiosk_success.html', context)
+
+
+async def kiosk_success(request, action, duration, user_id):
     """Success page after check-in/check-out"""
-    user = get_object_or_404(User, id=user_id)
+    user = await aget_object_or_404(User, id=user_id)
     
     context = {
         'action': action,
@@ -1071,14 +1434,15 @@ def attendance_report(request):
     status_filter = request.GET.get('status', '')
     
     # Base query
-    attendances = Attendance.objects.select_related('user').all()
+    attendances = Attendance.objects.select_related('user', 'walk_in__pass_type').all()
     
     # Apply filters
     if date_filter:
         try:
             from datetime import datetime
             filter_date = datetime.strptime(date_filter, '%Y-%m-%d').date()
-            attendances = attendances.filter(check_in__date=filter_date)
+            start, end = day_range(filter_date)
+            attendances = attendances.filter(check_in__gte=start, check_in__lt=end)
         except ValueError:
             pass
     
@@ -1086,7 +1450,8 @@ def attendance_report(request):
         attendances = attendances.filter(
             Q(user__username__icontains=user_filter) |
             Q(user__first_name__icontains=user_filter) |
-            Q(user__last_name__icontains=user_filter)
+            Q(user__last_name__icontains=user_filter) |
+            Q(walk_in__customer_name__icontains=user_filter)
         )
     
     if status_filter == 'in':
@@ -1099,10 +1464,12 @@ def attendance_report(request):
         check_out__isnull=True
     ).select_related('user').count()
     
-    # Today's total check-ins
-    today_checkins = Attendance.objects.filter(
-        check_in__date=date.today()
-    ).count()
+    # Today's check-ins, members and walk-ins
+    start, end = day_range(date.today())
+    today_counts = Attendance.objects.filter(check_in__gte=start, check_in__lt=end).aggregate(
+        total=Count('id'),
+        walk_ins=Count('id', filter=Q(walk_in__isnull=False)),
+    )
     
     # Pagination
     from django.core.paginator import Paginator
@@ -1116,7 +1483,67 @@ def attendance_report(request):
         'user_filter': user_filter,
         'status_filter': status_filter,
         'currently_checked_in': currently_checked_in,
-        'today_checkins': today_checkins,
+        'today_checkins': today_counts['total'],
+        'today_walkin_checkins': today_counts['walk_ins'],
+        'live_event_id': events.bus.last_id,
+    }
+    
+    return render(request, 'gym_app/attendance_report.html', context)
+
+# ==================== Performance Metrics Views ====================
+
+
+@login_required
+def metrics_view(request):
+    """Per-view latency percentiles from the profiling middleware (admin only)"""
+    if not request.user.is_admin():
+        messages.error(request, 'Access denied.')
+        return redirect('dashboard')
+    
+    if request.method == 'POST' and request.POST.get('action') == 'reset':
+        metrics_registry.reset()
+        messages.success(request, 'Performance metrics have been reset.')
+        return redirect('metrics')
+    
+    context = {
+        'view_metrics': metrics_registry.snapshot(),
+        'started_at': metrics_registry.started_at,
+        'profile_dumps': metrics_registry.profiles.dumps() if metrics_registry.profiles else [],
+    }
+    
+    return render(request, 'gym_app/metrics.html', context)
+
+
+def metrics_prometheus(request):
+    """Prometheus text endpoint (admins, or a scraper with the metrics token)"""
+    token = settings.PROFILING_METRICS_TOKEN
+    authorized = request.user.is_authenticated and request.user.is_admin()
+    if not authorized and token:
+        # Constant-time, so the token cannot be guessed from response times
+        authorized = hmac.compare_digest(
+            request.headers.get('Authorization', '').encode(), f'Bearer {token}'.encode()
+        )
+    
+    if not authorized:
+        return HttpResponse('Forbidden\n', status=403, content_type='text/plain')
+    
+    return HttpResponse(prometheus_text(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@login_required
+def slow_queries_view(request):
+    """Slow statements from the slow-query log, grouped by shape (admin only)"""
+    if not request.user.is_admin():
+        messages.error(request, 'Access denied.')
+        return redirect('dashboard')
+    
+    from .slowqueries import read_slow_queries, group_slow_queries
+    
+    entries = read_slow_queries()
+    context = {
+        'groups': group_slow_queries(entries),
+        'total_entries': len(entries),
+        'threshold_ms': settings.SLOW_QUERY_THRESHOLD_MS,
     }
     
-    return render(request, 'gym_app/attendance_report.html', context)
\ No newline at end of file
+    return render(request, 'gym_app/slow_queries.html', context)
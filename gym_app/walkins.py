@@ -0,0 +1,98 @@
+"""
+Group walk-in sales.
+
+For corporate groups and event days: ``sell_batch`` records any number of
+walk-in passes paid together as one ``WalkInBatch``. The passes are written
+with a single ``bulk_create`` in one transaction, with one aggregated audit
+entry and one live sale event, and the batch prints as a combined receipt
+(``views.walkin_batch_receipt``) listing each guest's kiosk code.
+"""
+
+from collections import Counter
+from datetime import date
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import events, ledger, tasks
+from .models import WalkInBatch, WalkInPayment, WalkInPassCode
+from .taskqueue import enqueue
+
+
+def max_batch_size():
+    return getattr(settings, 'WALKIN_BATCH_MAX_PASSES', 200)
+
+
+class BatchLine:
+    """One pass in a group sale: a catalog pass and who it is for"""
+
+    __slots__ = ('pass_type', 'customer_name', 'mobile_no')
+
+    def __init__(self, pass_type, customer_name='', mobile_no=''):
+        self.pass_type = pass_type
+        self.customer_name = customer_name.strip()
+        self.mobile_no = mobile_no.strip()
+
+
+def sell_batch(lines, payment_method, reference_no='', label='', sold_by=None, request=None):
+    """Record a group sale of ``lines`` (``BatchLine``) and return the ``WalkInBatch``"""
+    if not lines:
+        raise ValueError('A group sale needs at least one pass')
+
+    now = timezone.now()
+    total = sum((line.pass_type.price for line in lines), Decimal('0.00'))
+    passes = Counter(line.pass_type.name for line in lines)
+
+    with transaction.atomic():
+        batch = WalkInBatch.objects.create(
+            label=label.strip(),
+            method=payment_method,
+            reference_no=reference_no,
+            total_amount=total,
+            pass_count=len(lines),
+            sold_by=sold_by,
+            created_at=now,
+        )
+        payments = WalkInPayment.objects.bulk_create([
+            WalkInPayment(
+                batch=batch,
+                pass_type=line.pass_type.as_model(),
+                customer_name=line.customer_name,
+                mobile_no=line.mobile_no,
+                amount=line.pass_type.price,
+                method=payment_method,
+                reference_no=reference_no,
+                payment_date=now,
+                # Mirrors WalkInPayment.save, which bulk_create skips
+                business_date=timezone.localdate(now),
+            )
+            for line in lines
+        ])
+        WalkInPassCode.issue(payments)
+        ledger.record(payments, staff=sold_by)
+
+        enqueue(
+            tasks.write_audit_logs.defer(entries=[tasks.audit_entry(
+                action='walkin_sale',
+                user=sold_by,
+                description=f'Group walk-in sale: {len(lines)} passes - ₱{total} ({batch.label or "no label"})',
+                severity='info',
+                request=request,
+                model_name='WalkInBatch',
+                object_id=batch.id,
+                object_repr=str(batch),
+                passes=dict(passes),
+                amount=float(total),
+                payment_method=payment_method
+            )]),
+            tasks.refresh_daily_analytics.defer(day=date.today().isoformat()),
+        )
+
+        events.publish_on_commit(
+            'sale', kind='walkin', item=f'{len(lines)} walk-in passes', amount=total,
+            method=payment_method, count=len(lines),
+        )
+
+    return batch
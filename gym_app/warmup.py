@@ -0,0 +1,94 @@
+"""
+Template warm-up.
+
+With the cached template loader every template is read and parsed once per
+process, on the first request that needs it. ``warm_templates`` does that
+work up front for every project template (the ``DIRS`` entries and the
+template directories of apps inside ``BASE_DIR``; Django's own admin
+templates are left to load on demand), so the first kiosk tap or dashboard
+view after a deploy does not pay for it.
+
+The first ``{% url %}`` or ``reverse()`` in a process also builds the URL
+resolver's reverse map, which costs more than compiling the templates, so
+``warm_urls`` does that as part of the same warm-up.
+
+``wsgi.py`` and ``asgi.py`` call ``warm_on_startup`` which runs both when
+``TEMPLATE_WARMUP_ON_STARTUP`` is set (the production profile does).
+"""
+
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.template import engines, TemplateDoesNotExist, TemplateSyntaxError
+from django.template.utils import get_app_template_dirs
+from django.urls import reverse
+
+
+logger = logging.getLogger('gym_app.warmup')
+
+
+def project_template_dirs():
+    """Template directories that belong to this project"""
+    base_dir = str(settings.BASE_DIR)
+    dirs = []
+    for engine in engines.all():
+        dirs.extend(str(d) for d in getattr(engine, 'dirs', []))
+    dirs.extend(str(d) for d in get_app_template_dirs('templates') if str(d).startswith(base_dir))
+    # Keep the order (DIRS first, like the loaders) but drop duplicates
+    return list(dict.fromkeys(os.path.abspath(d) for d in dirs if os.path.isdir(d)))
+
+
+def template_names(dirs=None):
+    """Every ``.html``/``.txt`` template name under the given directories"""
+    names = []
+    for directory in dirs if dirs is not None else project_template_dirs():
+        for root, subdirs, files in os.walk(directory):
+            subdirs.sort()
+            for filename in sorted(files):
+                if filename.endswith(('.html', '.txt')):
+                    path = os.path.join(root, filename)
+                    names.append(os.path.relpath(path, directory).replace(os.sep, '/'))
+    return list(dict.fromkeys(names))
+
+
+def warm_templates(names=None):
+    """
+    Load (and so compile and cache) each template.
+
+    Returns ``(loaded, errors, seconds)`` where ``errors`` maps template name
+    to the error message.
+    """
+    names = template_names() if names is None else names
+    started = time.perf_counter()
+    loaded = []
+    errors = {}
+    for engine in engines.all():
+        for name in names:
+            try:
+                engine.get_template(name)
+            except (TemplateDoesNotExist, TemplateSyntaxError) as e:
+                errors[name] = f'{type(e).__name__}: {e}'
+            else:
+                loaded.append(name)
+    return loaded, errors, time.perf_counter() - started
+
+
+def warm_urls():
+    """Build the URL resolver's reverse lookup tables"""
+    started = time.perf_counter()
+    reverse('home')
+    return time.perf_counter() - started
+
+
+def warm_on_startup():
+    """Warm templates and URLs if ``TEMPLATE_WARMUP_ON_STARTUP`` is set"""
+    if not getattr(settings, 'TEMPLATE_WARMUP_ON_STARTUP', False):
+        return None
+    warm_urls()
+    loaded, errors, seconds = warm_templates()
+    for name, error in errors.items():
+        logger.error('Template %s failed to compile: %s', name, error)
+    logger.info('Warmed %d templates in %.0f ms', len(loaded), seconds * 1000)
+    return loaded, errors, seconds
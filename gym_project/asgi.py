@@ -3,6 +3,16 @@ ASGI config for gym_project project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+The kiosk check-in views, the dashboard metric endpoints and the live
+event stream are async, so under an ASGI server one worker process serves
+many kiosks and terminals concurrently, e.g.:
+
+    GYM_ENV=prod DJANGO_SECRET_KEY=... uvicorn gym_project.asgi:application --workers 2
+    GYM_ENV=prod DJANGO_SECRET_KEY=... daphne gym_project.asgi:application
+
+All other views are synchronous and run in a thread pool as usual.
+``python manage.py benchmark_concurrency`` compares this with WSGI.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -14,3 +24,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gym_project.settings')
 
 application = get_asgi_application()
+
+# Compile templates now instead of on the first requests (production profile)
+from gym_app.warmup import warm_on_startup  # noqa: E402
+
+warm_on_startup()
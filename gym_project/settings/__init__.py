@@ -0,0 +1,34 @@
+"""
+Settings profiles.
+
+    base.py   everything shared
+    dev.py    local development (DEBUG, query budgets, tasks run inline)
+    prod.py   production (caching, persistent connections, hashed static
+              files, cached sessions, quieter logging)
+    test.py   the test suite (dev plus fast hashers and a private cache)
+
+DJANGO_SETTINGS_MODULE stays ``gym_project.settings``; the profile is picked
+with the GYM_ENV environment variable (``dev`` when unset, ``test`` for
+``manage.py test``). A profile can
+also be selected directly, e.g. DJANGO_SETTINGS_MODULE=gym_project.settings.prod.
+"""
+
+import os
+
+
+GYM_ENV = os.environ.get('GYM_ENV', 'dev')
+
+if GYM_ENV == 'prod':
+    from .prod import *  # noqa: F401,F403
+elif GYM_ENV == 'dev':
+    from .dev import *  # noqa: F401,F403
+elif GYM_ENV == 'test':
+    from .test import *  # noqa: F401,F403
+else:
+    from django.core.exceptions import ImproperlyConfigured
+    raise ImproperlyConfigured(f'Unknown GYM_ENV "{GYM_ENV}" (expected "dev", "prod" or "test")')
+
+# Outside DEBUG the weak test hasher must never become the preferred one
+if PASSWORD_HASHER_PROFILE == 'fast' and not DEBUG:
+    from django.core.exceptions import ImproperlyConfigured
+    raise ImproperlyConfigured('GYM_PASSWORD_HASHER_PROFILE=fast needs DEBUG (dev or test settings)')
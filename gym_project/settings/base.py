@@ -0,0 +1,269 @@
+"""
+Django settings for gym_project project.
+
+Shared by every profile; dev.py and prod.py override what differs (see
+__init__.py for how the profile is chosen).
+
+Generated by 'django-admin startproject' using Django 5.2.7.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/5.2/topics/settings/
+
+For the full list of settings and their values, see
+https://docs.djangoproject.com/en/5.2/ref/settings/
+"""
+
+from pathlib import Path
+import os
+
+# Build paths inside the project like this: BASE_DIR / 'subdir'.
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+
+
+# Security
+# The key below is for development and tests only: prod.py requires
+# DJANGO_SECRET_KEY. DEBUG is off unless a profile turns it on (dev.py).
+# See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
+SECRET_KEY = 'django-insecure-4yj)609$72ppy!&e527=wsgm9+_sasg^3^)r263)ykovwj_c(r'
+
+DEBUG = False
+
+ALLOWED_HOSTS = ['192.168.0.156', '127.0.0.1', 'localhost']
+
+
+# Application definition
+
+INSTALLED_APPS = [
+    'django.contrib.admin',
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    'gym_app',  # Added gym_app
+]
+
+MIDDLEWARE = [
+    'django.middleware.security.SecurityMiddleware',
+    'gym_app.profiling.ProfilingMiddleware',
+    'gym_app.querybudget.QueryBudgetMiddleware',
+    'gym_app.slowqueries.SlowQueryMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+ROOT_URLCONF = 'gym_project.urls'
+
+TEMPLATES = [
+    {
+        # Django's backend plus render timing for the profiling middleware
+        'BACKEND': 'gym_app.profiling.ProfilingDjangoTemplates',
+        'DIRS': [BASE_DIR / 'templates'],  # Added templates directory
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'context_processors': [
+                'django.template.context_processors.debug',
+                'django.template.context_processors.request',
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+            ],
+        },
+    },
+]
+
+WSGI_APPLICATION = 'gym_project.wsgi.application'
+
+
+# Database
+# https://docs.djangoproject.com/en/5.2/ref/settings/#databases
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get('GYM_DATABASE_PATH', BASE_DIR / 'db.sqlite3'),
+        'OPTIONS': {
+            # Take the write lock when a transaction begins, so concurrent
+            # writers queue up instead of failing with "database is locked"
+            'transaction_mode': 'IMMEDIATE',
+        },
+    }
+}
+
+
+# Custom User Model
+AUTH_USER_MODEL = 'gym_app.User'
+
+
+# Password validation
+# https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
+
+AUTH_PASSWORD_VALIDATORS = [
+    {
+        'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
+    },
+]
+
+
+# Cache
+# File-based so every server process sees the same catalog version (see
+# gym_app/catalog.py); test.py swaps in a private in-memory cache.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+    }
+}
+
+# Seconds that catalog-keyed pages and template fragments are kept
+CATALOG_CACHE_TIMEOUT = 60 * 60
+
+
+# Query budgets (see gym_app/querybudget.py)
+# Requests over their URL's budget, or repeating one statement, are logged.
+QUERY_BUDGET_ENABLED = False
+QUERY_BUDGETS = {}
+
+
+# Request profiling (see gym_app/profiling.py)
+# Per-view latency/DB/template histograms are shown at /metrics/ (admins) and
+# /metrics/prometheus/ (admins, or a scraper sending PROFILING_METRICS_TOKEN).
+PROFILING_ENABLED = True
+PROFILING_CPROFILE_RATE = float(os.environ.get('GYM_PROFILING_CPROFILE_RATE', '0'))
+PROFILING_CPROFILE_KEEP = 20
+PROFILING_DUMP_DIR = BASE_DIR / 'profiles'
+PROFILING_METRICS_TOKEN = os.environ.get('GYM_PROFILING_METRICS_TOKEN', '')
+
+
+# Slow-query log (see gym_app/slowqueries.py)
+# Statements slower than the threshold are logged with their view, calling
+# code and EXPLAIN QUERY PLAN output, and grouped on the /slow-queries/ page.
+# The handler creates LOG_DIR when it first writes.
+LOG_DIR = BASE_DIR / 'logs'
+
+SLOW_QUERY_LOG_ENABLED = True
+SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('GYM_SLOW_QUERY_THRESHOLD_MS', '100'))
+SLOW_QUERY_EXPLAIN = True
+SLOW_QUERY_LOG_FILE = LOG_DIR / 'slow_queries.log'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message_only': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'slow_query_file': {
+            'class': 'gym_app.slowqueries.SlowQueryFileHandler',
+            'filename': SLOW_QUERY_LOG_FILE,
+            'maxBytes': 5 * 1024 * 1024,
+            'backupCount': 5,
+            'formatter': 'message_only',
+            'encoding': 'utf-8',
+            'delay': True,
+        },
+    },
+    'loggers': {
+        'gym_app.slow_queries': {
+            'handlers': ['slow_query_file'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
+
+# Background tasks (see gym_app/taskqueue.py)
+# Side effects of a sale are queued as Task rows and run by `run_tasks`.
+# With TASKS_EAGER they run in-process right after the commit instead.
+TASKS_EAGER = False
+TASK_MAX_ATTEMPTS = 5
+TASK_RETRY_DELAY = 30        # seconds, doubled per attempt
+TASK_STALE_AFTER = 600       # requeue tasks running longer than this
+TASK_RETENTION_DAYS = 7      # finished tasks kept for the admin
+
+# E-mail (payment receipts)
+EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+DEFAULT_FROM_EMAIL = os.environ.get('GYM_FROM_EMAIL', 'Gym <no-reply@gym.local>')
+
+# Expiring-membership reminders (see gym_app/notifications.py)
+# `notify_expiring` runs daily and hands e-mail and SMS reminders to the outbox
+# backend: ConsoleOutbox prints them, FileOutbox appends them to a file per day
+# under NOTIFICATION_OUTBOX_DIR.
+NOTIFICATION_OUTBOX_BACKEND = os.environ.get(
+    'GYM_NOTIFICATION_OUTBOX_BACKEND', 'gym_app.notifications.ConsoleOutbox'
+)
+NOTIFICATION_OUTBOX_DIR = BASE_DIR / 'outbox'
+EXPIRY_NOTICE_DAYS = 7       # remind members this many days before their plan ends
+
+# Password hashing profile
+# 'default' keeps Django's PBKDF2 hasher. 'fast' puts a cheap hasher first so test
+# runs and sample-data seeding are not CPU-bound. It is refused without DEBUG
+# and in prod.py.
+# Existing PBKDF2 hashes keep verifying under either profile. test.py
+# defaults to 'fast'.
+PASSWORD_HASHER_PROFILE = os.environ.get('GYM_PASSWORD_HASHER_PROFILE', 'default')
+
+FAST_PASSWORD_HASHERS = [
+    'django.contrib.auth.hashers.MD5PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+if PASSWORD_HASHER_PROFILE == 'fast':
+    PASSWORD_HASHERS = FAST_PASSWORD_HASHERS
+
+
+# Internationalization
+# https://docs.djangoproject.com/en/5.2/topics/i18n/
+
+LANGUAGE_CODE = 'en-us'
+
+TIME_ZONE = 'Asia/Manila'  # Changed to Philippines timezone
+
+USE_I18N = True
+
+USE_TZ = True
+
+
+# Static files (CSS, JavaScript, Images)
+# https://docs.djangoproject.com/en/5.2/howto/static-files/
+
+STATIC_URL = 'static/'
+STATICFILES_DIRS = [BASE_DIR / 'static']
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# CSS bundles (see gym_app/assets.py). `build_css` writes them into
+# CSS_BUNDLE_ROOT, which is on STATICFILES_DIRS; with bundles disabled
+# {% css_bundle %} links the source files instead.
+CSS_BUNDLE_ROOT = BASE_DIR / 'static'
+CSS_BUNDLES_ENABLED = False
+
+# Media files (uploaded content)
+MEDIA_URL = 'media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
+# Default primary key field type
+# https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
+
+DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Login/Logout URLs
+LOGIN_URL = '/login/'
+LOGIN_REDIRECT_URL = '/dashboard/'
+LOGOUT_REDIRECT_URL = '/'
\ No newline at end of file
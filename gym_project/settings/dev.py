@@ -0,0 +1,16 @@
+"""
+Development settings for gym_project (the default profile).
+"""
+
+from .base import *  # noqa: F401,F403
+
+
+DEBUG = True
+
+# Flag views that go over their query budget or repeat a statement
+QUERY_BUDGET_ENABLED = True
+
+# Run background tasks in-process after the commit, so kiosk PINs, receipts
+# and audit entries appear without a run_tasks worker. GYM_TASKS_EAGER=0
+# queues them for the worker as in production.
+TASKS_EAGER = os.environ.get('GYM_TASKS_EAGER', '1') == '1'
@@ -0,0 +1,137 @@
+"""
+Production settings for gym_project.
+
+Select with GYM_ENV=prod (or DJANGO_SETTINGS_MODULE=gym_project.settings.prod).
+Builds on base.py and only changes what production needs to differ.
+"""
+
+import copy
+
+from .base import *  # noqa: F401,F403
+
+
+DEBUG = False
+
+# The fast profile stores MD5 hashes, and logging in under it would rehash
+# existing PBKDF2 passwords down to MD5
+if PASSWORD_HASHER_PROFILE == 'fast':
+    from django.core.exceptions import ImproperlyConfigured
+    raise ImproperlyConfigured('GYM_PASSWORD_HASHER_PROFILE=fast is not allowed in production')
+
+# Never fall back to the development key checked in to base.py
+SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY')
+if not SECRET_KEY:
+    from django.core.exceptions import ImproperlyConfigured
+    raise ImproperlyConfigured('Set DJANGO_SECRET_KEY for the production settings')
+
+ALLOWED_HOSTS = os.environ.get('DJANGO_ALLOWED_HOSTS', ','.join(ALLOWED_HOSTS)).split(',')
+
+
+# Database
+# Keep connections open between requests instead of reconnecting every time.
+# WAL lets the kiosk write check-ins while dashboards and reports read, and
+# IMMEDIATE transactions take the write lock up front so concurrent writers
+# queue on the busy timeout instead of failing with "database is locked".
+DATABASES = copy.deepcopy(DATABASES)
+DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('GYM_CONN_MAX_AGE', '600'))
+DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    DATABASES['default']['OPTIONS'] = {
+        'init_command': (
+            'PRAGMA journal_mode=WAL;'
+            'PRAGMA synchronous=NORMAL;'
+            'PRAGMA temp_store=MEMORY;'
+            'PRAGMA mmap_size=134217728;'
+        ),
+        'transaction_mode': 'IMMEDIATE',
+        'timeout': 20,
+    }
+
+
+# Background tasks
+# Queued for the worker, which must run next to the web server:
+#   GYM_ENV=prod python manage.py run_tasks
+# Without it members never get a kiosk PIN and receipts are never sent.
+TASKS_EAGER = False
+
+
+# Cache
+# Redis when GYM_REDIS_URL is set (needs the redis package), otherwise the
+# shared file-based cache from base.py.
+if os.environ.get('GYM_REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['GYM_REDIS_URL'],
+        }
+    }
+
+
+# Sessions
+# Read from the cache, written through to the database
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
+
+# Static files
+# One minified stylesheet per page, content-hashed names and gzip/brotli
+# copies, served with a one-year immutable lifetime by StaticFilesMiddleware.
+# Every deploy needs `build_css` then `collectstatic`: {% static %} fails
+# without the manifest.
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'gym_app.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+
+CSS_BUNDLES_ENABLED = True
+
+SERVE_STATIC_FILES = os.environ.get('GYM_SERVE_STATIC', '1') == '1'
+MIDDLEWARE = list(MIDDLEWARE)
+MIDDLEWARE.insert(MIDDLEWARE.index('django.middleware.security.SecurityMiddleware') + 1,
+                  'gym_app.static_files.StaticFilesMiddleware')
+
+
+# Templates
+# Explicit cached loader: each template is read and compiled once per process
+# and never checked for changes on disk. The cache is filled at startup by
+# gym_app.warmup (see wsgi.py / asgi.py) rather than by the first requests.
+TEMPLATES = copy.deepcopy(TEMPLATES)
+TEMPLATES[0]['APP_DIRS'] = False
+TEMPLATES[0]['OPTIONS']['loaders'] = [
+    ('django.template.loaders.cached.Loader', [
+        'django.template.loaders.filesystem.Loader',
+        'django.template.loaders.app_directories.Loader',
+    ]),
+]
+TEMPLATES[0]['OPTIONS']['debug'] = False
+
+TEMPLATE_WARMUP_ON_STARTUP = os.environ.get('GYM_TEMPLATE_WARMUP', '1') == '1'
+
+
+# E-mail
+# SMTP when GYM_EMAIL_HOST is set, otherwise the console backend from base.py
+if os.environ.get('GYM_EMAIL_HOST'):
+    EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+    EMAIL_HOST = os.environ['GYM_EMAIL_HOST']
+    EMAIL_PORT = int(os.environ.get('GYM_EMAIL_PORT', '587'))
+    EMAIL_HOST_USER = os.environ.get('GYM_EMAIL_USER', '')
+    EMAIL_HOST_PASSWORD = os.environ.get('GYM_EMAIL_PASSWORD', '')
+    EMAIL_USE_TLS = os.environ.get('GYM_EMAIL_TLS', '1') == '1'
+
+# Logging
+# Warnings and errors only, to the console (the process manager collects
+# it); the slow-query file log from base.py is kept.
+LOGGING = copy.deepcopy(LOGGING)
+LOGGING['formatters']['console'] = {
+    'format': '%(asctime)s %(levelname)s %(name)s %(message)s',
+}
+LOGGING['handlers']['console'] = {
+    'class': 'logging.StreamHandler',
+    'formatter': 'console',
+    'level': 'WARNING',
+}
+LOGGING['root'] = {'handlers': ['console'], 'level': 'WARNING'}
+LOGGING['loggers']['django'] = {'handlers': ['console'], 'level': 'WARNING', 'propagate': False}
@@ -0,0 +1,22 @@
+"""
+Test settings for gym_project (``manage.py test`` picks them by default).
+"""
+
+from .dev import *  # noqa: F401,F403
+
+
+# Cheap hashing so creating users in setUp does not dominate the run
+PASSWORD_HASHER_PROFILE = os.environ.get('GYM_PASSWORD_HASHER_PROFILE', 'fast')
+
+if PASSWORD_HASHER_PROFILE == 'fast':
+    PASSWORD_HASHERS = FAST_PASSWORD_HASHERS
+
+# Tasks are queued; tests run them with taskqueue.run_pending()
+TASKS_EAGER = False
+
+# A private cache, so runs do not share the catalog version with a dev server
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gym_project.settings')
 
 application = get_wsgi_application()
+
+# Compile templates now instead of on the first requests (production profile)
+from gym_app.warmup import warm_on_startup  # noqa: E402
+
+warm_on_startup()